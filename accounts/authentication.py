@@ -0,0 +1,133 @@
+# backend/accounts/authentication.py
+"""
+Autenticación JWT sin consulta por petición (opt-in con JWT_SIN_ESTADO).
+
+login_view firma en el token de acceso el username, is_staff e
+is_superuser. Con JWT_SIN_ESTADO activo, request.user es un UsuarioToken
+armado con esos claims y el Usuario completo solo se carga (desde una
+cache de vida corta) cuando una vista lo pide con obtener_usuario().
+
+Cada cambio de un usuario guarda su hora en la cache; los tokens emitidos
+antes vuelven a cargar el usuario de la base y a comprobar is_active. Por
+eso la cache tiene que ser compartida entre workers (CACHE_URL).
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.routers import principal
+
+Usuario = get_user_model()
+
+CLAIMS = ('username', 'is_staff', 'is_superuser')
+# Hora de emisión con decimales: iat va en segundos enteros
+EMITIDO = 'emitido'
+
+
+def _clave_usuario(usuario_id):
+    return f'usuario:{usuario_id}'
+
+
+def _clave_cambio(usuario_id):
+    return f'usuario:cambio:{usuario_id}'
+
+
+def tokens_para(usuario):
+    """(refresh, access) con los claims que usa UsuarioToken."""
+    refresh = RefreshToken.for_user(usuario)
+    access = refresh.access_token
+    for claim in CLAIMS:
+        access[claim] = getattr(usuario, claim)
+    access[EMITIDO] = time.time()
+    return refresh, access
+
+
+def usuario_cacheado(usuario_id):
+    usuario = cache.get(_clave_usuario(usuario_id))
+    if usuario is None:
+        try:
+            # De la principal: una réplica atrasada quedaría en la cache
+            with principal():
+                usuario = Usuario.objects.get(pk=usuario_id)
+        except Usuario.DoesNotExist:
+            raise AuthenticationFailed('Usuario no encontrado', code='user_not_found')
+        cache.set(_clave_usuario(usuario_id), usuario,
+                  settings.JWT_USUARIO_CACHE_TTL)
+    return usuario
+
+
+def invalidar_usuario(usuario_id):
+    # Vive lo mismo que un token de acceso: después no queda ninguno anterior
+    vida = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.set(_clave_cambio(usuario_id), time.time(), int(vida) + 1)
+    cache.delete(_clave_usuario(usuario_id))
+
+
+class UsuarioToken(TokenUser):
+    """Usuario armado con los claims del token; .usuario trae el completo."""
+
+    def __str__(self):
+        return self.username
+
+    @cached_property
+    def id(self):
+        # simplejwt guarda el id como texto; acceso y los filtros esperan el pk
+        return Usuario._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def usuario(self):
+        return usuario_cacheado(self.id)
+
+
+def obtener_usuario(request):
+    """Instancia de Usuario del request, para FKs y datos fuera del token."""
+    usuario = request.user
+    if isinstance(usuario, UsuarioToken):
+        return usuario.usuario
+    return usuario
+
+
+class JWTSinEstadoAuthentication(JWTAuthentication):
+    """
+    Igual que JWTAuthentication si JWT_SIN_ESTADO está desactivado o el
+    token no trae los claims de login_view.
+    """
+
+    def get_user(self, validated_token):
+        if (not settings.JWT_SIN_ESTADO
+                or api_settings.USER_ID_CLAIM not in validated_token
+                or any(claim not in validated_token for claim in (*CLAIMS, EMITIDO))):
+            return super().get_user(validated_token)
+
+        usuario_id = validated_token[api_settings.USER_ID_CLAIM]
+        cambio = cache.get(_clave_cambio(usuario_id))
+        if cambio is not None and validated_token[EMITIDO] <= cambio:
+            # Token anterior al último cambio: sus claims pueden estar viejos
+            with principal():
+                usuario = super().get_user(validated_token)
+            cache.set(_clave_usuario(usuario_id), usuario,
+                      settings.JWT_USUARIO_CACHE_TTL)
+            return usuario
+        return UsuarioToken(validated_token)
+
+
+async def autenticar_async(request):
+    """
+    La autenticación de las vistas DRF para vistas async: devuelve el
+    usuario o lanza NotAuthenticated / AuthenticationFailed / InvalidToken.
+    """
+    autenticacion = JWTSinEstadoAuthentication()
+    resultado = await sync_to_async(autenticacion.authenticate)(request)
+    if resultado is None:
+        raise NotAuthenticated()
+    return resultado[0]
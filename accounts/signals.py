@@ -0,0 +1,13 @@
+# backend/accounts/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidar_usuario
+from .models import Usuario
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuario_modificado(sender, instance, **kwargs):
+    # Los tokens emitidos antes dejan de confiar en sus claims
+    invalidar_usuario(instance.pk)
@@ -1,3 +1,94 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from core.checks import cache_para_jwt_sin_estado
+from tienda import acceso
+from tienda.models import PYME
+from .authentication import tokens_para
+from .models import Usuario
+
+
+class ListarUsuariosTests(APITestCase):
+    def test_paginacion_por_cursor(self):
+        admin = Usuario.objects.create_superuser(username='admin')
+        for i in range(4):
+            Usuario.objects.create_user(username=f'usuario{i}')
+        self.client.force_authenticate(admin)
+
+        primera = self.client.get(reverse('listar_usuarios'), {'limite': 3})
+        segunda = self.client.get(reverse('listar_usuarios'), {
+            'limite': 3, 'cursor': primera.data['siguiente']})
+
+        ids = [u['id'] for u in primera.data['resultados'] + segunda.data['resultados']]
+        self.assertEqual(ids, list(Usuario.objects.order_by('id').values_list('id', flat=True)))
+        self.assertIsNone(segunda.data['siguiente'])
+
+
+@override_settings(JWT_SIN_ESTADO=True)
+class JWTSinEstadoTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        acceso.limpiar_cache_local()
+        self.usuario = Usuario.objects.create_user(
+            username='ana', email='ana@example.com')
+        self.autenticar()
+
+    def autenticar(self):
+        _, access = tokens_para(self.usuario)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_me_sin_consultas_con_cache_caliente(self):
+        self.client.get(reverse('me'))
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(reverse('me'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['email'], 'ana@example.com')
+
+    def test_usuario_desactivado_pierde_acceso(self):
+        self.client.get(reverse('me'))
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.client.get(reverse('me')).status_code, 401)
+
+    def test_cambio_de_usuario_recarga_desde_la_base(self):
+        self.client.get(reverse('me'))
+        Usuario.objects.filter(pk=self.usuario.pk).update(username='ana2')
+        self.usuario.refresh_from_db()
+        self.usuario.save()
+        self.assertEqual(self.client.get(reverse('me')).data['username'], 'ana2')
+
+    def test_vistas_que_guardan_el_usuario(self):
+        respuesta = self.client.post(reverse('crear_pyme'), {
+            'nombre': 'Bodega', 'direccion': 'Calle 1'}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        pyme = PYME.objects.get()
+        self.assertEqual(pyme.propietario, self.usuario)
+
+        respuesta = self.client.post(reverse('abrir_turno'), {
+            'pyme': pyme.id, 'empleados': []}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['abierto_por_nombre'], 'ana')
+
+    def test_token_sin_claims_carga_el_usuario(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(reverse('me'))
+        self.assertEqual(respuesta.data['username'], 'ana')
+
+    async def test_me_async(self):
+        _, access = tokens_para(self.usuario)
+        cabeceras = {'Authorization': f'Bearer {access}'}
+        sincrona = await self.async_client.get(reverse('me'), headers=cabeceras)
+        asincrona = await self.async_client.get(reverse('me_async'), headers=cabeceras)
+        self.assertEqual(asincrona.status_code, 200)
+        self.assertEqual(asincrona.content, sincrona.content)
+
+    def test_requiere_cache_compartida(self):
+        with override_settings(CACHE_COMPARTIDA=False):
+            self.assertEqual(
+                [e.id for e in cache_para_jwt_sin_estado(None)], ['core.E001'])
+        with override_settings(CACHE_COMPARTIDA=True):
+            self.assertEqual(cache_para_jwt_sin_estado(None), [])
@@ -0,0 +1,7 @@
+# backend/accounts/urls_async.py
+from django.urls import path
+from . import views_async
+
+urlpatterns = [
+    path('me/', views_async.me_view, name='me_async'),
+]
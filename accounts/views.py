@@ -3,8 +3,9 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from core.paginacion import PaginacionInvalida, paginar
+from .authentication import obtener_usuario, tokens_para
 from .serializers import RegistroSerializer, LoginSerializer, UsuarioSerializer
 from django.contrib.auth import get_user_model
 from django.db.models import Q
@@ -44,10 +45,10 @@ def login_view(request):
             password=serializer.validated_data['password']
         )
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh, access = tokens_para(user)
             return Response({
                 'refresh': str(refresh),
-                'access': str(refresh.access_token),
+                'access': str(access),
                 'user': UsuarioSerializer(user).data
             })
         return Response({'error': 'Credenciales inválidas'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -57,29 +58,33 @@ def login_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def me_view(request):
-    serializer = UsuarioSerializer(request.user)
+    serializer = UsuarioSerializer(obtener_usuario(request))
     return Response(serializer.data)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_usuarios_view(request):
-    if request.user.is_superuser or request.user.pymes_propias.exists():
+    from tienda import acceso
+    roles = acceso.roles_usuario(request.user)
+    if request.user.is_superuser or acceso.PROPIETARIO in roles.values():
         # Propietarios y superusuarios ven todos los usuarios
         usuarios = Usuario.objects.all()
     else:
         # Empleados/admins ven solo usuarios de sus PYMEs
-        from tienda.models import PYME
-        pymes = PYME.objects.filter(
-            Q(propietario=request.user) |
-            Q(administrador=request.user) |
-            Q(empleados=request.user)
-        )
+        pymes = list(roles)
         usuarios = Usuario.objects.filter(
             Q(pymes_propias__in=pymes) |
             Q(pymes_administradas__in=pymes) |
             Q(pymes_empleado__in=pymes)
         ).distinct()
 
+    try:
+        pagina = paginar(usuarios, request, ('id',))
+    except PaginacionInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if pagina is not None:
+        return pagina.respuesta(UsuarioSerializer(pagina.filas, many=True).data)
+
     serializer = UsuarioSerializer(usuarios, many=True)
     return Response(serializer.data)
@@ -0,0 +1,12 @@
+# backend/accounts/views_async.py
+from asgiref.sync import sync_to_async
+
+from core.asincrono import api_async, respuesta_json
+from .authentication import obtener_usuario
+from .serializers import UsuarioSerializer
+
+
+@api_async(['GET'])
+async def me_view(request):
+    usuario = await sync_to_async(obtener_usuario)(request)
+    return respuesta_json(UsuarioSerializer(usuario).data)
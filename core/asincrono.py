@@ -0,0 +1,71 @@
+# backend/core/asincrono.py
+"""
+Soporte para vistas async (ASGI). DRF no tiene vistas async, así que
+api_async() hace lo que @api_view + IsAuthenticated en las síncronas:
+métodos permitidos, autenticación JWT y errores con el mismo cuerpo.
+"""
+import functools
+
+from asgiref.sync import SyncToAsync, sync_to_async
+from django.db import connections
+from django.http import HttpResponse
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated)
+
+from accounts.authentication import JWTSinEstadoAuthentication, autenticar_async
+from .renderers import JSONRapidoRenderer
+
+_renderer = JSONRapidoRenderer()
+
+
+def respuesta_json(datos, status=200, headers=None):
+    return HttpResponse(
+        _renderer.render(datos), status=status, headers=headers,
+        content_type='application/json')
+
+
+def _respuesta_error(request, error):
+    # Mismo cuerpo que el manejador de excepciones de DRF
+    datos = error.detail if isinstance(error.detail, (list, dict)) else {'detail': error.detail}
+    headers = None
+    if isinstance(error, (NotAuthenticated, AuthenticationFailed)):
+        headers = {'WWW-Authenticate': JWTSinEstadoAuthentication().authenticate_header(request)}
+    return respuesta_json(datos, error.status_code, headers)
+
+
+def _cerrar_conexiones():
+    for conexion in connections.all(initialized_only=True):
+        # Una transacción abierta no es de esta petición (la de TestCase)
+        if not conexion.in_atomic_block:
+            conexion.close()
+
+
+async def liberar_hilo():
+    """
+    Cierra las conexiones del hilo síncrono de la petición y lo termina.
+    Django lo mantiene hasta el final de la respuesta: en un flujo largo
+    (SSE) sería un hilo y una conexión ocupados por cada cliente. Si algo
+    vuelve a llamar código síncrono, asgiref crea otro hilo. Usa atributos
+    internos de SyncToAsync: asgiref está fijado en requirements.txt.
+    """
+    await sync_to_async(_cerrar_conexiones)()
+    contexto = SyncToAsync.thread_sensitive_context.get(None)
+    if contexto is not None:
+        executor = SyncToAsync.context_to_thread_executor.pop(contexto, None)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def api_async(metodos):
+    def decorador(vista):
+        @functools.wraps(vista)
+        async def envoltura(request, *args, **kwargs):
+            try:
+                if request.method not in metodos:
+                    raise MethodNotAllowed(request.method)
+                request.user = await autenticar_async(request)
+                return await vista(request, *args, **kwargs)
+            except APIException as e:
+                return _respuesta_error(request, e)
+        return envoltura
+    return decorador
@@ -0,0 +1,34 @@
+# backend/core/checks.py
+"""
+Comprobaciones de la configuración (manage.py check, migrate, runserver).
+core no es una app instalada: accounts las registra en su ready().
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches)
+def cache_para_jwt_sin_estado(app_configs, **kwargs):
+    # La marca de cambio de un usuario vive en la cache; si es de un solo
+    # proceso, los demás workers siguen aceptando sus tokens viejos
+    if settings.JWT_SIN_ESTADO and not settings.CACHE_COMPARTIDA:
+        return [Error(
+            'JWT_SIN_ESTADO requiere una cache compartida entre procesos.',
+            hint='Configure CACHE_URL (redis:// o memcached://).',
+            id='core.E001',
+        )]
+    return []
+
+
+@register(Tags.caches, Tags.database)
+def cache_para_replicas(app_configs, **kwargs):
+    # Tras una escritura, fijar_principal deja la marca en la cache; si la
+    # siguiente lectura cae en otro worker, sin cache compartida no la ve y
+    # lee de una réplica atrasada
+    if settings.DATABASE_REPLICAS and not settings.CACHE_COMPARTIDA:
+        return [Error(
+            'DATABASE_REPLICA_URLS requiere una cache compartida entre procesos.',
+            hint='Configure CACHE_URL (redis:// o memcached://).',
+            id='core.E002',
+        )]
+    return []
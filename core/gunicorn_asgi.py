@@ -0,0 +1,28 @@
+# backend/core/gunicorn_asgi.py
+"""
+Perfil de despliegue ASGI:
+
+    gunicorn core.asgi:application -c python:core.gunicorn_asgi
+
+Cada worker de uvicorn atiende muchas conexiones a la vez en un solo
+proceso, de modo que un cliente lento no ocupa un worker entero como con
+los workers síncronos. Las vistas de api/async/ corren en el bucle de
+eventos; las síncronas de api/ siguen funcionando, en un hilo por petición.
+"""
+import multiprocessing
+
+# Cada nombre global de este archivo es un ajuste de gunicorn; `config`
+# también, por eso se usa el módulo completo
+import decouple
+
+bind = decouple.config('GUNICORN_BIND', default='0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+# Un proceso por CPU basta: la concurrencia la da el bucle de eventos
+workers = decouple.config('GUNICORN_WORKERS', default=multiprocessing.cpu_count(), cast=int)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=30, cast=int)
+graceful_timeout = 30
+keepalive = 5
+# Reciclar workers de vez en cuando acota el crecimiento de memoria
+max_requests = decouple.config('GUNICORN_MAX_REQUESTS', default=2000, cast=int)
+max_requests_jitter = max_requests // 10
+accesslog = '-'
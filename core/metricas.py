@@ -0,0 +1,194 @@
+# backend/core/metricas.py
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+
+# Límites (en segundos) de los buckets del histograma de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Serie:
+    __slots__ = ('buckets', 'cantidad', 'latencia', 'consultas',
+                 'tiempo_consultas', 'bytes')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.cantidad = 0
+        self.latencia = 0.0
+        self.consultas = 0
+        self.tiempo_consultas = 0.0
+        self.bytes = 0
+
+
+class Registro:
+    """Métricas por endpoint guardadas en memoria del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observar(self, endpoint, metodo, latencia, consultas, tiempo_consultas, tamano):
+        posicion = bisect.bisect_left(BUCKETS, latencia)
+        with self._lock:
+            serie = self._series.get((endpoint, metodo))
+            if serie is None:
+                serie = self._series[(endpoint, metodo)] = _Serie()
+            serie.buckets[posicion] += 1
+            serie.cantidad += 1
+            serie.latencia += latencia
+            serie.consultas += consultas
+            serie.tiempo_consultas += tiempo_consultas
+            serie.bytes += tamano
+
+    def limpiar(self):
+        with self._lock:
+            self._series.clear()
+
+    def prometheus(self):
+        """Las métricas en el formato de texto de Prometheus."""
+        with self._lock:
+            series = sorted(
+                (clave, list(s.buckets), s.cantidad, s.latencia, s.consultas,
+                 s.tiempo_consultas, s.bytes)
+                for clave, s in self._series.items()
+            )
+
+        lineas = [
+            '# HELP http_request_duration_seconds Latencia de las peticiones por endpoint.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (endpoint, metodo), buckets, cantidad, latencia, *_ in series:
+            etiquetas = f'endpoint="{endpoint}",metodo="{metodo}"'
+            acumulado = 0
+            for limite, valor in zip(BUCKETS + ('+Inf',), buckets):
+                acumulado += valor
+                lineas.append(
+                    f'http_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'http_request_duration_seconds_sum{{{etiquetas}}} {latencia}')
+            lineas.append(f'http_request_duration_seconds_count{{{etiquetas}}} {cantidad}')
+
+        contadores = (
+            ('http_request_db_queries_total', 'Consultas SQL ejecutadas por endpoint.', 4),
+            ('http_request_db_query_seconds_total', 'Tiempo total en consultas SQL por endpoint.', 5),
+            ('http_response_size_bytes_total', 'Bytes de respuesta enviados por endpoint.', 6),
+        )
+        for nombre, ayuda, indice in contadores:
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} counter')
+            for serie in series:
+                endpoint, metodo = serie[0]
+                lineas.append(
+                    f'{nombre}{{endpoint="{endpoint}",metodo="{metodo}"}} {serie[indice]}')
+        return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+
+class _ContadorConsultas:
+    __slots__ = ('consultas', 'tiempo')
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.tiempo += time.perf_counter() - inicio
+
+
+# Contador de la petición en curso. Es una variable de contexto y no un
+# execute_wrapper por petición: el ORM async ejecuta las consultas en otro
+# hilo, con otra conexión, pero sync_to_async copia el contexto.
+_contador_actual = ContextVar('metricas_contador', default=None)
+
+
+def _contar(execute, sql, params, many, context):
+    contador = _contador_actual.get()
+    if contador is None:
+        return execute(sql, params, many, context)
+    return contador(execute, sql, params, many, context)
+
+
+def _instalar(conexion):
+    # Primero de la lista: los execute_wrapper() temporales sacan el último
+    if _contar not in conexion.execute_wrappers:
+        conexion.execute_wrappers.insert(0, _contar)
+
+
+@receiver(connection_created)
+def _conexion_creada(sender, connection, **kwargs):
+    _instalar(connection)
+
+
+class MetricasMiddleware:
+    """
+    Mide latencia, consultas SQL y tamaño de respuesta por nombre de ruta,
+    en vistas síncronas y async.
+
+    En respuestas streaming solo cuenta lo ocurrido hasta devolver la
+    respuesta; las consultas hechas al enviar el contenido no se incluyen.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        # Conexiones abiertas antes de cargar este módulo
+        for conexion in connections.all(initialized_only=True):
+            _instalar(conexion)
+        contador = _ContadorConsultas()
+        token = _contador_actual.set(contador)
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _contador_actual.reset(token)
+        self._observar(request, respuesta, time.perf_counter() - inicio, contador)
+        return respuesta
+
+    async def __acall__(self, request):
+        contador = _ContadorConsultas()
+        token = _contador_actual.set(contador)
+        inicio = time.perf_counter()
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _contador_actual.reset(token)
+        self._observar(request, respuesta, time.perf_counter() - inicio, contador)
+        return respuesta
+
+    def _observar(self, request, respuesta, latencia, contador):
+        match = request.resolver_match
+        # Las rutas inexistentes se agrupan para no crear una serie por URL
+        endpoint = (match.url_name or match.view_name) if match else 'sin_ruta'
+        tamano = 0 if respuesta.streaming else len(respuesta.content)
+        registro.observar(endpoint, request.method, latencia,
+                          contador.consultas, contador.tiempo, tamano)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def metricas_view(request):
+    return HttpResponse(
+        registro.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
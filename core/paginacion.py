@@ -0,0 +1,143 @@
+# backend/core/paginacion.py
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.response import Response
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+
+class PaginacionInvalida(Exception):
+    pass
+
+
+class Pagina:
+    def __init__(self, filas, siguiente):
+        self.filas = filas
+        self.siguiente = siguiente
+
+    def respuesta(self, datos, headers=None):
+        return Response(
+            {'resultados': datos, 'siguiente': self.siguiente}, headers=headers)
+
+
+def _a_json(valor):
+    # isoformat() conserva los microsegundos; DjangoJSONEncoder los recorta
+    # y el cursor dejaría de coincidir con la fila
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, (decimal.Decimal, uuid.UUID)):
+        return str(valor)
+    return valor
+
+
+def _codificar(valores):
+    crudo = json.dumps([_a_json(v) for v in valores]).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def _decodificar(cursor, campos):
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        valores = json.loads(crudo)
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            raise ValueError
+        # Solo escalares: una lista o un objeto no llegan a to_python, y
+        # None no se puede comparar en el filtro
+        if not all(isinstance(valor, (str, int, float)) for valor in valores):
+            raise ValueError
+        convertidos = [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+        for campo, valor in zip(campos, convertidos):
+            if valor is None:
+                raise ValueError
+            # Los validadores de los enteros traen el rango de la base
+            campo.run_validators(valor)
+        return convertidos
+    except (binascii.Error, TypeError, ValueError, ValidationError):
+        raise PaginacionInvalida('Cursor inválido')
+
+
+def _valor(fila, nombre):
+    return fila[nombre] if isinstance(fila, dict) else getattr(fila, nombre)
+
+
+def _despues_de(orden, valores):
+    """
+    Condición "fila posterior al cursor" para un orden con varias claves:
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    condicion = Q()
+    iguales = {}
+    for clave, valor in zip(orden, valores):
+        nombre = clave.lstrip('-')
+        operador = 'lt' if clave.startswith('-') else 'gt'
+        condicion |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+        iguales[nombre] = valor
+    return condicion
+
+
+def _preparar(queryset, request, orden):
+    """(consulta de la página, límite, nombres de las claves) o None."""
+    params = getattr(request, 'query_params', request.GET)
+    if 'limite' not in params and 'cursor' not in params:
+        return None
+
+    try:
+        limite = int(params.get('limite', LIMITE_POR_DEFECTO))
+    except ValueError:
+        raise PaginacionInvalida('El límite debe ser un número')
+    if limite < 1:
+        raise PaginacionInvalida('El límite debe ser mayor que cero')
+    limite = min(limite, LIMITE_MAXIMO)
+
+    nombres = [clave.lstrip('-') for clave in orden]
+    queryset = queryset.order_by(*orden)
+    cursor = params.get('cursor')
+    if cursor:
+        campos = [queryset.model._meta.get_field(n) for n in nombres]
+        valores = _decodificar(cursor, campos)
+        try:
+            queryset = queryset.filter(_despues_de(orden, valores))
+        except (TypeError, ValueError, ValidationError):
+            raise PaginacionInvalida('Cursor inválido')
+    return queryset[:limite + 1], limite, nombres
+
+
+def _pagina(filas, limite, nombres):
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = _codificar([_valor(filas[-1], n) for n in nombres])
+    return Pagina(filas, siguiente)
+
+
+def paginar(queryset, request, orden):
+    """
+    Paginación por cursor (keyset) sobre `orden`, cuya última clave debe ser
+    única. Cada página cuesta lo mismo sin importar su profundidad y no se
+    ejecuta COUNT(*).
+
+    Solo se pagina si el cliente envía `limite` o `cursor`; si no, devuelve
+    None y la vista responde la lista completa como hasta ahora.
+    """
+    preparada = _preparar(queryset, request, orden)
+    if preparada is None:
+        return None
+    consulta, limite, nombres = preparada
+    return _pagina(list(consulta), limite, nombres)
+
+
+async def apaginar(queryset, request, orden):
+    """paginar() para vistas async."""
+    preparada = _preparar(queryset, request, orden)
+    if preparada is None:
+        return None
+    consulta, limite, nombres = preparada
+    return _pagina([fila async for fila in consulta], limite, nombres)
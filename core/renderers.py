@@ -0,0 +1,39 @@
+# backend/core/renderers.py
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """
+    JSONRenderer que serializa con orjson cuando está instalado y produce
+    los mismos bytes que el de DRF: salida compacta sin escapar Unicode,
+    U+2028/U+2029 escapados y fechas, Decimal y demás tipos resueltos por el
+    mismo encoder. Si orjson falta, se pide indentación o la configuración
+    de DRF no es la de por defecto, o orjson no puede con los datos (enteros
+    de más de 64 bits, etc.), delega en JSONRenderer.
+
+    Única diferencia conocida: los float con exponente ('1e16' frente a
+    '1e+16'); la API no devuelve float.
+    """
+    OPCIONES = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii
+                or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            salida = orjson.dumps(
+                data, default=self.encoder_class().default, option=self.OPCIONES)
+        except (orjson.JSONEncodeError, ValueError):
+            return super().render(data, accepted_media_type, renderer_context)
+        return salida.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
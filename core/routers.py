@@ -0,0 +1,143 @@
+# backend/core/routers.py
+"""
+Réplicas de lectura (DATABASE_REPLICA_URLS).
+
+ReplicaMiddleware elige una réplica al empezar cada petición GET/HEAD y
+ReplicaRouter manda allí las lecturas de esa petición. Todo lo demás
+(escrituras, POST/PUT/PATCH/DELETE con sus transacciones, comandos,
+señales, tareas fuera de una petición) usa la base principal.
+
+Después de que un usuario escribe, sus lecturas van a la principal durante
+REPLICA_FIJAR_SEGUNDOS: ve sus propios cambios aunque la réplica atrase.
+La marca se guarda en la cache, que debe ser compartida entre workers
+(CACHE_URL) para que la vea el que atienda la lectura siguiente.
+Una petición usa siempre la misma réplica, así las versiones del ETag y el
+cuerpo salen de la misma copia.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+METODOS_LECTURA = ('GET', 'HEAD')
+
+# Réplica de la petición en curso; None lee de la principal
+_replica = ContextVar('replica_lectura', default=None)
+
+
+def _clave_fijada(usuario_id):
+    return f'replica:fijar:{usuario_id}'
+
+
+def fijar_principal(usuario_id):
+    """Las próximas lecturas de este usuario van a la principal."""
+    if settings.DATABASE_REPLICAS and usuario_id is not None:
+        cache.set(_clave_fijada(usuario_id), 1, settings.REPLICA_FIJAR_SEGUNDOS)
+
+
+def alias_lectura():
+    """Alias de donde lee la petición en curso, para usarlo con .using()."""
+    return _replica.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def principal():
+    """Lee de la principal dentro del bloque aunque la petición sea GET."""
+    token = _replica.set(None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def _usuario_del_token(request):
+    # Solo el id, sin consultar la base; un token inválido lee de réplica y
+    # la vista lo rechaza igual
+    autenticacion = JWTAuthentication()
+    cabecera = autenticacion.get_header(request)
+    crudo = cabecera and autenticacion.get_raw_token(cabecera)
+    if not crudo:
+        return None
+    try:
+        token = autenticacion.get_validated_token(crudo)
+    except (InvalidToken, TokenError):
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+def elegir_replica(request):
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas or request.method not in METODOS_LECTURA:
+        return None
+    usuario_id = _usuario_del_token(request)
+    if usuario_id is not None and cache.get(_clave_fijada(usuario_id)):
+        return None
+    return random.choice(replicas)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # None deja que Django use la base de la instancia o la principal
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    """Fija la réplica de la petición y, tras una escritura, la principal."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        token = _replica.set(elegir_replica(request))
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _replica.reset(token)
+        self._despues(request)
+        return respuesta
+
+    async def __acall__(self, request):
+        token = _replica.set(elegir_replica(request))
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _replica.reset(token)
+        if request.method not in METODOS_LECTURA:
+            # request.user puede ser todavía el usuario de sesión perezoso
+            await sync_to_async(self._despues)(request)
+        return respuesta
+
+    def _despues(self, request):
+        if request.method in METODOS_LECTURA:
+            return
+        # DRF y api_async dejan en request.user el usuario autenticado
+        usuario = getattr(request, 'user', None)
+        if usuario is not None and usuario.is_authenticated:
+            fijar_principal(usuario.id)
@@ -12,8 +12,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from datetime import timedelta
 import os
+import tempfile
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +57,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'core.metricas.MetricasMiddleware',
+    'core.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,6 +101,72 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+# Con SQLite las pruebas usan una base en archivo: la de memoria no admite
+# escrituras desde varios hilos y la prueba de concurrencia del inventario
+# se saltaría. Django la crea y la borra en cada corrida
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': config(
+        'DATABASE_TEST_NAME', default=os.path.join(tempfile.gettempdir(), 'test_admin_web.sqlite3'))}
+elif config('DATABASE_TEST_NAME', default=''):
+    DATABASES['default']['TEST'] = {'NAME': config('DATABASE_TEST_NAME')}
+
+# Réplicas de lectura (core.routers): URLs separadas por comas. Las
+# peticiones GET leen de una réplica; en las pruebas son espejo de default
+DATABASE_REPLICAS = []
+for numero, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), 1):
+    DATABASES[f'replica_{numero}'] = {
+        **dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica_{numero}')
+
+# SQLite en producción: WAL deja leer mientras otro escribe y BEGIN
+# IMMEDIATE toma el bloqueo de escritura al abrir la transacción. Sin él,
+# dos ventas que ya leyeron no pueden pasar a escribir a la vez y una falla
+# con "database is locked" sin esperar; así esperan su turno hasta
+# SQLITE_TIMEOUT segundos (busy_timeout).
+SQLITE_OPTIMIZADO = config('SQLITE_OPTIMIZADO', default=True, cast=bool)
+SQLITE_OPCIONES = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': config('SQLITE_TIMEOUT', default=20, cast=int),
+    'init_command': ';'.join((
+        'PRAGMA journal_mode=WAL',
+        # Con WAL, una caída del proceso no pierde nada; un corte de luz puede
+        # perder las últimas transacciones, sin corromper la base
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA mmap_size=134217728',
+        # En KiB (negativo): hasta 32 MB de páginas en memoria por conexión
+        'PRAGMA cache_size=-32768',
+        'PRAGMA temp_store=MEMORY',
+    )),
+}
+if SQLITE_OPTIMIZADO:
+    for base in DATABASES.values():
+        if base['ENGINE'] == 'django.db.backends.sqlite3':
+            base['OPTIONS'] = {**SQLITE_OPCIONES, **base.get('OPTIONS', {})}
+
+# Cache de Django. Sin CACHE_URL es LocMem: una copia por proceso, y con
+# varios workers una invalidación (permisos, usuarios de JWT_SIN_ESTADO,
+# lecturas fijadas a la principal) solo llega al worker que la hizo. En
+# producción, CACHE_URL=redis://host:6379/0 o memcached://host:11211
+CACHE_URL = config('CACHE_URL', default='')
+CACHE_BACKENDS = {
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+}
+if CACHE_URL:
+    esquema, _, direccion = CACHE_URL.partition('://')
+    CACHES = {'default': {
+        'BACKEND': CACHE_BACKENDS[esquema],
+        'LOCATION': direccion if esquema == 'memcached' else CACHE_URL,
+    }}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+CACHE_COMPARTIDA = bool(CACHE_URL)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Segundos que las lecturas de un usuario van a la principal tras escribir.
+# La marca vive en la cache: con réplicas hace falta CACHE_URL (core.checks)
+REPLICA_FIJAR_SEGUNDOS = config('REPLICA_FIJAR_SEGUNDOS', default=5, cast=int)
 
 AUTH_USER_MODEL = 'accounts.Usuario'
 
@@ -141,11 +210,17 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # DRF
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication, o sin consulta por petición con JWT_SIN_ESTADO
+        'accounts.authentication.JWTSinEstadoAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # Usa orjson si está instalado; si no, se comporta como JSONRenderer
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -153,6 +228,36 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 }
 
+# Autenticación con los claims del token, sin cargar el usuario en cada
+# petición (accounts.authentication); el usuario completo se cachea en segundos.
+# Requiere CACHE_URL: la revocación de tokens (usuario desactivado, cambio
+# de rol o contraseña) se avisa por la cache y una LocMem no llega a los
+# demás workers. manage.py check falla si falta (core.checks)
+JWT_SIN_ESTADO = config('JWT_SIN_ESTADO', default=False, cast=bool)
+JWT_USUARIO_CACHE_TTL = config('JWT_USUARIO_CACHE_TTL', default=60, cast=int)
+
+# Eventos en vivo de los turnos (tienda.eventos). BrokerLocal solo reparte
+# dentro de un proceso; con varios workers, configurar un broker compartido
+EVENTOS_BROKER = config('EVENTOS_BROKER', default='tienda.eventos.BrokerLocal')
+# Segundos entre comentarios de keep-alive en las conexiones SSE
+EVENTOS_HEARTBEAT = config('EVENTOS_HEARTBEAT', default=15, cast=int)
+
+# Cache de permisos por usuario (tienda.acceso), en segundos. Quitar a
+# alguien de una PYME borra su entrada solo en las caches que ve este
+# proceso: sin CACHE_URL los demás workers lo siguen dejando pasar hasta
+# que vence, por eso entonces dura lo mismo que la copia local
+ACCESO_CACHE_LOCAL_TTL = config('ACCESO_CACHE_LOCAL_TTL', default=5, cast=int)
+ACCESO_CACHE_TTL = config(
+    'ACCESO_CACHE_TTL', default=300 if CACHE_COMPARTIDA else ACCESO_CACHE_LOCAL_TTL, cast=int)
+# PYMEs ya formateadas (tienda.lectura); la clave cambia con cada versión
+PYMES_CACHE_TTL = config('PYMES_CACHE_TTL', default=86400, cast=int)
+
+# Agregados de ventas por hora y día (tienda.analitica): el comando
+# agregar_ventas solo suma ventas con al menos estos segundos
+ANALITICA_MARGEN_SEGUNDOS = config('ANALITICA_MARGEN_SEGUNDOS', default=60, cast=int)
+# Días desde el cierre tras los que archivar_ventas saca las ventas de un turno
+ARCHIVO_HORIZONTE_DIAS = config('ARCHIVO_HORIZONTE_DIAS', default=365, cast=int)
+
 # CORS (importante para frontend separado)
 # INSTALLED_APPS += ['corsheaders']
 MIDDLEWARE = ['corsheaders.middleware.CorsMiddleware'] + MIDDLEWARE
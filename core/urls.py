@@ -17,8 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.metricas import metricas_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metricas_view, name='metricas'),
     path('api/auth/', include('accounts.urls')),
     path('api/', include('tienda.urls')),
+    # Variantes async de los listados, para despliegues ASGI
+    path('api/async/auth/', include('accounts.urls_async')),
+    path('api/async/', include('tienda.urls_async')),
 ]
@@ -0,0 +1,125 @@
+# backend/tienda/acceso.py
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from core.routers import principal
+from .models import PYME
+
+PROPIETARIO = 'propietario'
+ADMINISTRADOR = 'administrador'
+EMPLEADO = 'empleado'
+ROLES_GESTION = (PROPIETARIO, ADMINISTRADOR)
+
+# Primer nivel: copia por proceso con vida corta. Segundo nivel: el cache de
+# Django, invalidado por las señales de tienda; solo es compartido entre
+# procesos con CACHE_URL (ver ACCESO_CACHE_TTL en settings).
+_local = {}
+_lock = threading.Lock()
+
+
+def _clave(usuario_id):
+    return f'acceso:roles:{usuario_id}'
+
+
+def _normalizar_id(pyme_id):
+    try:
+        return int(pyme_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _calcular_roles(usuario_id):
+    empleado_en = PYME.empleados.through.objects.filter(
+        usuario_id=usuario_id).values('pyme_id')
+    filas = PYME.objects.filter(
+        Q(propietario_id=usuario_id) |
+        Q(administrador_id=usuario_id) |
+        Q(id__in=empleado_en)
+    ).values_list('id', 'propietario_id', 'administrador_id')
+
+    roles = {}
+    for pyme_id, propietario_id, administrador_id in filas:
+        if propietario_id == usuario_id:
+            roles[pyme_id] = PROPIETARIO
+        elif administrador_id == usuario_id:
+            roles[pyme_id] = ADMINISTRADOR
+        else:
+            roles[pyme_id] = EMPLEADO
+    return roles
+
+
+def roles_usuario(usuario):
+    """Devuelve el mapa {pyme_id: rol} del usuario, desde cache si es posible."""
+    usuario_id = usuario.id
+    ahora = time.monotonic()
+    entrada = _local.get(usuario_id)
+    if entrada is not None and entrada[0] > ahora:
+        return entrada[1]
+
+    roles = cache.get(_clave(usuario_id))
+    if roles is None:
+        # De la principal: una réplica atrasada devolvería un acceso ya
+        # revocado y quedaría en la cache hasta ACCESO_CACHE_TTL
+        with principal():
+            roles = _calcular_roles(usuario_id)
+        cache.set(_clave(usuario_id), roles, settings.ACCESO_CACHE_TTL)
+    with _lock:
+        _local[usuario_id] = (ahora + settings.ACCESO_CACHE_LOCAL_TTL, roles)
+    return roles
+
+
+async def aroles_usuario(usuario):
+    """roles_usuario() para vistas async; la copia local no salta de hilo."""
+    entrada = _local.get(usuario.id)
+    if entrada is not None and entrada[0] > time.monotonic():
+        return entrada[1]
+    return await sync_to_async(roles_usuario)(usuario)
+
+
+def invalidar(*usuario_ids):
+    usuario_ids = {uid for uid in usuario_ids if uid is not None}
+    if not usuario_ids:
+        return
+
+    def borrar():
+        cache.delete_many([_clave(uid) for uid in usuario_ids])
+        with _lock:
+            for uid in usuario_ids:
+                _local.pop(uid, None)
+
+    # Después del commit: antes, otra petición todavía lee los roles viejos
+    # y los volvería a guardar
+    transaction.on_commit(borrar)
+
+
+def limpiar_cache_local():
+    with _lock:
+        _local.clear()
+
+
+def rol_en(usuario, pyme_id):
+    return roles_usuario(usuario).get(_normalizar_id(pyme_id))
+
+
+def puede_gestionar(usuario, pyme_id):
+    """Propietario o administrador de la PYME."""
+    return rol_en(usuario, pyme_id) in ROLES_GESTION
+
+
+def pymes_ids(usuario, roles=None):
+    """IDs de las PYMEs del usuario, opcionalmente solo con ciertos roles."""
+    return [
+        pyme_id for pyme_id, rol in roles_usuario(usuario).items()
+        if roles is None or rol in roles
+    ]
+
+
+def pyme_existe(pyme_id):
+    pyme_id = _normalizar_id(pyme_id)
+    return pyme_id is not None and PYME.objects.filter(id=pyme_id).exists()
@@ -1,6 +1,17 @@
 from django.contrib import admin
-from .models import Turno, Venta, DetalleVenta
+from .models import (DetalleVenta, MovimientoInventario, ResumenPagoTurno,
+                     ResumenProductoTurno, Turno, Venta, VentaArchivada)
+
+
+@admin.register(Turno)
+class TurnoAdmin(admin.ModelAdmin):
+    # Turno.__str__ usa el nombre de la PYME
+    list_select_related = ['pyme']
+
 
-admin.site.register(Turno)
 admin.site.register(Venta)
 admin.site.register(DetalleVenta)
+admin.site.register(MovimientoInventario)
+admin.site.register(ResumenProductoTurno)
+admin.site.register(ResumenPagoTurno)
+admin.site.register(VentaArchivada)
@@ -0,0 +1,45 @@
+# backend/tienda/agregados.py
+from decimal import Decimal
+
+from django.db.models import (DecimalField, ExpressionWrapper, F, OuterRef,
+                              Subquery, Sum, Value)
+from django.db.models.functions import Coalesce
+
+from .models import DetalleVenta, Venta
+
+IMPORTE = DecimalField(max_digits=12, decimal_places=2)
+
+
+def ganancia_detalle():
+    return ExpressionWrapper(
+        (F('precio_unitario') - F('costo_unitario')) * F('cantidad'),
+        output_field=IMPORTE
+    )
+
+
+def total_ventas_turno():
+    """Subconsulta con la suma de Venta.total del turno de la fila externa."""
+    return Coalesce(
+        Subquery(
+            Venta.objects.filter(turno=OuterRef('pk'))
+            .order_by().values('turno')
+            .annotate(suma=Sum('total')).values('suma'),
+            output_field=IMPORTE
+        ),
+        Value(Decimal('0')),
+        output_field=IMPORTE
+    )
+
+
+def ganancia_bruta_turno():
+    """Subconsulta con la ganancia de todos los detalles del turno externo."""
+    return Coalesce(
+        Subquery(
+            DetalleVenta.objects.filter(venta__turno=OuterRef('pk'))
+            .order_by().values('venta__turno')
+            .annotate(suma=Sum(ganancia_detalle())).values('suma'),
+            output_field=IMPORTE
+        ),
+        Value(Decimal('0')),
+        output_field=IMPORTE
+    )
@@ -0,0 +1,191 @@
+# backend/tienda/analitica.py
+"""
+Ventas por hora y por día de cada PYME (AgregadoVentas) para los gráficos.
+
+El comando agregar_ventas suma las ventas nuevas en lotes por id y guarda
+en MarcaAgregados la última incluida; la venta en sí no escribe nada más.
+Solo se suman ventas con más de ANALITICA_MARGEN_SEGUNDOS: una transacción
+todavía abierta con un id menor no queda atrás de la marca.
+
+serie() lee los agregados y suma en el momento las ventas posteriores a la
+marca, así la respuesta está al día aunque el comando vaya atrasado.
+
+Las ventas archivadas (tienda.archivo) ya no están en DetalleVenta:
+reconstruir() las vuelve a sumar desde VentaArchivada.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, Max, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+from rest_framework import serializers
+
+from .agregados import IMPORTE, ganancia_detalle
+from .models import AgregadoVentas, DetalleVenta, MarcaAgregados, Venta, VentaArchivada
+
+CLAVE_MARCA = 'ventas'
+# Ids de venta por transacción del comando
+LOTE = 5000
+CAMPOS = ('ingresos', 'ganancia', 'ventas', 'articulos')
+DURACION = {
+    AgregadoVentas.HORA: timedelta(hours=1),
+    AgregadoVentas.DIA: timedelta(days=1),
+}
+
+
+def _por_hora(detalles):
+    """(pyme_id, hora, ingresos, ganancia, ventas, artículos) en una consulta agrupada."""
+    return (detalles.order_by()
+            .values('venta__pyme_id', hora=TruncHour(
+                'venta__fecha', tzinfo=timezone.get_current_timezone()))
+            .annotate(
+                ingresos=Sum(ExpressionWrapper(
+                    F('precio_unitario') * F('cantidad'), output_field=IMPORTE)),
+                ganancia=Sum(ganancia_detalle()),
+                ventas=Count('venta', distinct=True),
+                articulos=Sum('cantidad'))
+            .values_list('venta__pyme_id', 'hora', *CAMPOS))
+
+
+def _por_hora_archivadas():
+    """Las filas de _por_hora() para las ventas archivadas, una por venta."""
+    zona = timezone.get_current_timezone()
+    archivadas = VentaArchivada.objects.order_by().values_list(
+        'pyme_id', 'fecha', 'total', 'ganancia', 'detalles')
+    for pyme_id, fecha, total, ganancia, detalles in archivadas.iterator(chunk_size=LOTE):
+        # Igual que TruncHour en la zona actual
+        hora = timezone.localtime(fecha, zona).replace(minute=0, second=0, microsecond=0)
+        yield pyme_id, hora, total, ganancia, 1, sum(detalle[1] for detalle in detalles)
+
+
+def _inicio_dia(hora):
+    zona = timezone.get_current_timezone()
+    return timezone.make_aware(
+        datetime.combine(timezone.localtime(hora, zona).date(), time.min), zona)
+
+
+def _cubetas(filas):
+    """{(pyme_id, granularidad, inicio): [ingresos, ganancia, ventas, artículos]}"""
+    cubetas = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0, 0])
+    for pyme_id, hora, *valores in filas:
+        for clave in ((pyme_id, AgregadoVentas.HORA, hora),
+                      (pyme_id, AgregadoVentas.DIA, _inicio_dia(hora))):
+            acumulado = cubetas[clave]
+            for i, valor in enumerate(valores):
+                acumulado[i] += valor
+    return cubetas
+
+
+def _sumar(cubetas):
+    # Solo escribe el comando, serializado por el bloqueo de la marca
+    inicios = [inicio for _, _, inicio in cubetas]
+    existentes = {
+        (a.pyme_id, a.granularidad, a.inicio): a
+        for a in AgregadoVentas.objects.filter(
+            pyme_id__in={pyme_id for pyme_id, _, _ in cubetas},
+            inicio__gte=min(inicios), inicio__lte=max(inicios))
+    }
+    actualizar, crear = [], []
+    for (pyme_id, granularidad, inicio), valores in cubetas.items():
+        agregado = existentes.get((pyme_id, granularidad, inicio))
+        if agregado is None:
+            agregado = AgregadoVentas(pyme_id=pyme_id, granularidad=granularidad, inicio=inicio)
+            crear.append(agregado)
+        else:
+            actualizar.append(agregado)
+        for campo, valor in zip(CAMPOS, valores):
+            setattr(agregado, campo, getattr(agregado, campo) + valor)
+    AgregadoVentas.objects.bulk_update(actualizar, CAMPOS, batch_size=500)
+    AgregadoVentas.objects.bulk_create(crear, batch_size=500)
+
+
+def ponerse_al_dia(margen=None):
+    """Suma a los agregados las ventas posteriores a la marca. Devuelve cuántas."""
+    if margen is None:
+        margen = settings.ANALITICA_MARGEN_SEGUNDOS
+    corte = timezone.now() - timedelta(seconds=margen)
+    sumadas = 0
+    while True:
+        with transaction.atomic():
+            marca, _ = MarcaAgregados.objects.select_for_update().get_or_create(
+                clave=CLAVE_MARCA)
+            hasta = Venta.objects.filter(
+                id__gt=marca.venta_id, fecha__lt=corte).aggregate(maximo=Max('id'))['maximo']
+            if hasta is None:
+                return sumadas
+            tope = min(hasta, marca.venta_id + LOTE)
+            cubetas = _cubetas(_por_hora(DetalleVenta.objects.filter(
+                venta_id__gt=marca.venta_id, venta_id__lte=tope)))
+            if cubetas:
+                _sumar(cubetas)
+                sumadas += sum(
+                    valores[2] for (_, granularidad, _), valores in cubetas.items()
+                    if granularidad == AgregadoVentas.HORA)
+            marca.venta_id = tope
+            marca.save(update_fields=['venta_id', 'actualizado_en'])
+
+
+def reconstruir():
+    """
+    Rehace los agregados con las ventas archivadas y vuelve la marca a cero;
+    después, ponerse_al_dia() suma las de Venta.
+    """
+    with transaction.atomic():
+        # archivar_turno toma el mismo bloqueo: no se archiva nada a medio leer
+        marca, _ = MarcaAgregados.objects.select_for_update().get_or_create(
+            clave=CLAVE_MARCA)
+        AgregadoVentas.objects.all().delete()
+        cubetas = _cubetas(_por_hora_archivadas())
+        if cubetas:
+            _sumar(cubetas)
+        marca.venta_id = 0
+        marca.save(update_fields=['venta_id', 'actualizado_en'])
+
+
+def serie(pyme_id, granularidad, inicio=None, fin=None):
+    """
+    [(inicio, [ingresos, ganancia, ventas, artículos])] de las horas o días
+    que empiezan en [inicio, fin), en orden.
+    """
+    marca = MarcaAgregados.objects.filter(clave=CLAVE_MARCA).values_list(
+        'venta_id', flat=True).first() or 0
+
+    agregados = AgregadoVentas.objects.filter(pyme_id=pyme_id, granularidad=granularidad)
+    if inicio:
+        agregados = agregados.filter(inicio__gte=inicio)
+    if fin:
+        agregados = agregados.filter(inicio__lt=fin)
+    cubetas = {fila[0]: list(fila[1:]) for fila in agregados.values_list('inicio', *CAMPOS)}
+
+    # Ventas que el comando todavía no sumó; una cubeta que empieza antes de
+    # `fin` puede tener ventas hasta una hora o un día después
+    pendientes = DetalleVenta.objects.filter(venta__pyme_id=pyme_id, venta_id__gt=marca)
+    if inicio:
+        pendientes = pendientes.filter(venta__fecha__gte=inicio)
+    if fin:
+        pendientes = pendientes.filter(venta__fecha__lt=fin + DURACION[granularidad])
+    for (_, g, cubeta), valores in _cubetas(_por_hora(pendientes)).items():
+        if g != granularidad or (inicio and cubeta < inicio) or (fin and cubeta >= fin):
+            continue
+        acumulado = cubetas.setdefault(cubeta, [Decimal('0'), Decimal('0'), 0, 0])
+        for i, valor in enumerate(valores):
+            acumulado[i] += valor
+    return sorted(cubetas.items())
+
+
+def formatear(serie):
+    fecha = serializers.DateTimeField().to_representation
+    return [
+        {
+            'inicio': fecha(cubeta),
+            'ingresos': f'{ingresos:.2f}',
+            'ganancia': f'{ganancia:.2f}',
+            'ventas': ventas,
+            'articulos': articulos,
+        }
+        for cubeta, (ingresos, ganancia, ventas, articulos) in serie
+    ]
@@ -0,0 +1,135 @@
+# backend/tienda/archivo.py
+"""
+Archivo de ventas viejas. Las ventas de los turnos cerrados hace más de
+ARCHIVO_HORIZONTE_DIAS pasan de Venta/DetalleVenta a VentaArchivada, una
+fila por venta con los detalles compactados, y las tablas que se consultan
+a diario quedan chicas.
+
+Un turno solo se archiva si ya tiene su resumen (tienda.resumenes) y si
+sus ventas ya están en los agregados (tienda.analitica): los reportes de
+turnos y los gráficos no vuelven a leer las ventas. La exportación las
+lee del archivo cuando se pide.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, Max, OuterRef, Sum
+from django.utils import timezone
+
+from core.routers import alias_lectura
+
+from .analitica import CLAVE_MARCA
+from .fechas import filtrar_rango
+from .models import (DetalleVenta, MarcaAgregados, MovimientoInventario, Producto,
+                     ResumenPagoTurno, Turno, Venta, VentaArchivada)
+
+SIN_RESUMEN = 'sin resumen; ejecute resumir_turnos'
+SIN_AGREGAR = 'ventas sin agregar; ejecute agregar_ventas'
+RESUMEN_DISTINTO = 'el resumen no coincide con las ventas'
+# Ventas archivadas por lectura al exportar
+TAMANO_BLOQUE = 500
+
+
+class ArchivoInvalido(Exception):
+    """El turno no se puede archivar todavía; el mensaje dice por qué."""
+
+
+def turnos_archivables(dias=None):
+    """Ids de los turnos cerrados antes del horizonte que todavía tienen ventas."""
+    if dias is None:
+        dias = settings.ARCHIVO_HORIZONTE_DIAS
+    horizonte = timezone.now() - timedelta(days=dias)
+    return (Turno.objects.filter(activo=False, fin__lt=horizonte)
+            .filter(Exists(Venta.objects.filter(turno=OuterRef('pk'))))
+            .order_by('id').values_list('id', flat=True))
+
+
+def verificar(turno_id, bloquear=False):
+    """Lanza ArchivoInvalido si falta el resumen o los agregados del turno."""
+    if not ResumenPagoTurno.objects.filter(turno_id=turno_id).exists():
+        raise ArchivoInvalido(SIN_RESUMEN)
+    marcas = MarcaAgregados.objects.filter(clave=CLAVE_MARCA)
+    if bloquear:
+        # Hasta el final de la transacción: analitica.reconstruir() no borra
+        # los agregados mientras estas ventas pasan al archivo
+        marcas = marcas.select_for_update()
+    marca = marcas.values_list('venta_id', flat=True).first() or 0
+    ultima = Venta.objects.filter(turno_id=turno_id).aggregate(ultima=Max('id'))['ultima']
+    if ultima is not None and ultima > marca:
+        raise ArchivoInvalido(SIN_AGREGAR)
+
+
+def archivar_turno(turno_id):
+    """Mueve las ventas del turno al archivo. Devuelve cuántas."""
+    with transaction.atomic():
+        verificar(turno_id, bloquear=True)
+        ventas = list(Venta.objects.filter(turno_id=turno_id).order_by('id'))
+        detalles = {}
+        for detalle in DetalleVenta.objects.filter(
+                venta__turno_id=turno_id).order_by('id'):
+            detalles.setdefault(detalle.venta_id, []).append(detalle)
+
+        archivadas = [
+            VentaArchivada(
+                id=venta.id, turno_id=venta.turno_id, vendedor_id=venta.vendedor_id,
+                pyme_id=venta.pyme_id, fecha=venta.fecha, total=venta.total,
+                ganancia=sum((d.ganancia for d in detalles.get(venta.id, ())), Decimal('0')),
+                metodo_pago=venta.metodo_pago,
+                codigo_transferencia=venta.codigo_transferencia,
+                telefono_cliente=venta.telefono_cliente,
+                clave_idempotencia=venta.clave_idempotencia,
+                detalles=[
+                    [d.producto_id, d.cantidad, str(d.precio_unitario), str(d.costo_unitario)]
+                    for d in detalles.get(venta.id, ())
+                ])
+            for venta in ventas
+        ]
+        resumido = ResumenPagoTurno.objects.filter(
+            turno_id=turno_id).aggregate(total=Sum('total'))['total']
+        if resumido != sum((v.total for v in archivadas), Decimal('0')):
+            raise ArchivoInvalido(RESUMEN_DISTINTO)
+
+        VentaArchivada.objects.bulk_create(archivadas, batch_size=500)
+        # El libro de inventario conserva sus movimientos: la referencia pasa
+        # a la venta archivada antes de que el borrado vacíe `venta`. Los
+        # detalles se borran en cascada
+        MovimientoInventario.objects.filter(venta__turno_id=turno_id).update(
+            venta_archivada_id=F('venta_id'))
+        Venta.objects.filter(turno_id=turno_id).delete()
+        return len(archivadas)
+
+
+def ventas_archivadas(pyme_id, inicio, fin):
+    """
+    Ventas archivadas de la PYME en [inicio, fin) con la misma forma que
+    usa la exportación: (venta, [(producto_id, nombre, cantidad,
+    precio_unitario, costo_unitario)]), con `vendedor` ya cargado.
+    """
+    # El alias se toma ahora: se lee al enviar la respuesta, cuando la
+    # petición ya no fija la réplica
+    alias = alias_lectura()
+    ventas = filtrar_rango(
+        VentaArchivada.objects.using(alias).filter(pyme_id=pyme_id), 'fecha', inicio, fin
+    ).select_related('vendedor').only(
+        'id', 'fecha', 'turno_id', 'metodo_pago', 'codigo_transferencia',
+        'total', 'detalles', 'vendedor__username'
+    ).order_by('id')
+    return _con_nombres(ventas.iterator(chunk_size=TAMANO_BLOQUE), alias)
+
+
+def _con_nombres(ventas, alias):
+    # Los nombres se buscan por bloque. Un producto con ventas archivadas no
+    # se puede borrar: su resumen lo protege
+    for bloque in iter(lambda: list(islice(ventas, TAMANO_BLOQUE)), []):
+        nombres = dict(Producto.objects.using(alias).filter(
+            id__in={d[0] for venta in bloque for d in venta.detalles}
+        ).values_list('id', 'nombre'))
+        for venta in bloque:
+            yield venta, [
+                (producto_id, nombres.get(producto_id, ''), cantidad,
+                 Decimal(precio_unitario), Decimal(costo_unitario))
+                for producto_id, cantidad, precio_unitario, costo_unitario in venta.detalles
+            ]
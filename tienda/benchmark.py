@@ -0,0 +1,616 @@
+# backend/tienda/benchmark.py
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing, contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import Usuario
+from core.renderers import JSONRapidoRenderer
+from . import acceso, lectura
+from .models import PYME, DetalleVenta, MovimientoInventario, Producto, Turno, Venta
+from .serializers import PYMESerializer, ProductoSerializer, TurnoSerializer
+from .ventas import VentaInvalida, registrar_venta
+
+LOTE = 1000
+CLAVE_BENCHMARK = 'benchmark'
+
+
+def sembrar(prefijo='bench', pymes=5, empleados=10, productos=1000, turnos=30,
+            ventas=40, lineas=5, semilla=42, salida=None):
+    """
+    Genera datos sintéticos con inserciones masivas. Los conteos de
+    empleados, productos y turnos son por PYME; los de ventas, por turno.
+    """
+    aleatorio = random.Random(semilla)
+    ahora = timezone.now()
+    clave = make_password(CLAVE_BENCHMARK)
+
+    def informar(mensaje):
+        if salida:
+            salida(mensaje)
+
+    with transaction.atomic():
+        usuarios = [
+            Usuario(username=f'{prefijo}_{rol}_{p}_{i}', password=clave)
+            for p in range(pymes)
+            for rol, cantidad in (('propietario', 1), ('admin', 1), ('empleado', empleados))
+            for i in range(cantidad)
+        ]
+        Usuario.objects.bulk_create(usuarios, batch_size=LOTE)
+        por_nombre = {
+            u.username: u for u in Usuario.objects.filter(
+                username__startswith=f'{prefijo}_')}
+        informar(f'{len(usuarios)} usuarios')
+
+        lista_pymes = [
+            PYME(nombre=f'{prefijo} PYME {p}', direccion=f'Calle {p}',
+                 propietario=por_nombre[f'{prefijo}_propietario_{p}_0'],
+                 administrador=por_nombre[f'{prefijo}_admin_{p}_0'])
+            for p in range(pymes)
+        ]
+        PYME.objects.bulk_create(lista_pymes)
+        empleados_por_pyme = {
+            pyme.id: [por_nombre[f'{prefijo}_empleado_{p}_{i}'] for i in range(empleados)]
+            for p, pyme in enumerate(lista_pymes)
+        }
+        PYME.empleados.through.objects.bulk_create([
+            PYME.empleados.through(pyme_id=pyme_id, usuario_id=u.id)
+            for pyme_id, lista in empleados_por_pyme.items() for u in lista
+        ], batch_size=LOTE)
+        informar(f'{len(lista_pymes)} PYMEs')
+
+        catalogo = {}
+        for p, pyme in enumerate(lista_pymes):
+            nuevos = []
+            for i in range(productos):
+                compra = Decimal(aleatorio.randint(50, 5000)) / 100
+                nuevos.append(Producto(
+                    nombre=f'Producto {i:05d} {aleatorio.choice("ABCDEFGH")}',
+                    codigo=f'{prefijo}-{p}-{i:06d}', tienda=pyme,
+                    precio_compra=compra,
+                    precio_venta=(compra * Decimal('1.3')).quantize(Decimal('0.01'))))
+            catalogo[pyme.id] = Producto.objects.bulk_create(nuevos, batch_size=LOTE)
+        informar(f'{productos * pymes} productos')
+
+        # auto_now_add pisa inicio/fecha en bulk_create: se guardan aparte y
+        # se restauran con bulk_update
+        lista_turnos, inicios = [], []
+        for pyme in lista_pymes:
+            for t in range(turnos):
+                dias_atras = turnos - t - 1
+                inicios.append(ahora - timedelta(days=dias_atras, hours=8))
+                lista_turnos.append(Turno(
+                    pyme=pyme, abierto_por=pyme.propietario,
+                    activo=dias_atras == 0,
+                    fin=None if dias_atras == 0 else inicios[-1] + timedelta(hours=8)))
+        Turno.objects.bulk_create(lista_turnos, batch_size=LOTE)
+        for turno, inicio in zip(lista_turnos, inicios):
+            turno.inicio = inicio
+        Turno.empleados.through.objects.bulk_create([
+            Turno.empleados.through(turno_id=turno.id, usuario_id=u.id)
+            for turno in lista_turnos
+            for u in empleados_por_pyme[turno.pyme_id][:3]
+        ], batch_size=LOTE)
+
+        lista_ventas, detalles_por_venta = [], []
+        for turno in lista_turnos:
+            productos_pyme = catalogo[turno.pyme_id]
+            vendedores = empleados_por_pyme[turno.pyme_id][:3]
+            for v in range(ventas):
+                detalles = []
+                for producto in aleatorio.sample(productos_pyme, min(lineas, len(productos_pyme))):
+                    detalles.append(DetalleVenta(
+                        producto=producto, cantidad=aleatorio.randint(1, 4),
+                        precio_unitario=producto.precio_venta,
+                        costo_unitario=producto.precio_compra))
+                total = sum(d.precio_unitario * d.cantidad for d in detalles)
+                ganancia = sum(d.ganancia for d in detalles)
+                turno.total_ventas += total
+                turno.ganancia_bruta += ganancia
+                lista_ventas.append(Venta(
+                    turno=turno, pyme_id=turno.pyme_id,
+                    vendedor=aleatorio.choice(vendedores), total=total,
+                    metodo_pago=aleatorio.choice(('efectivo', 'transferencia')),
+                    fecha=turno.inicio + timedelta(minutes=v * 480 // max(ventas, 1))))
+                detalles_por_venta.append(detalles)
+
+        Turno.objects.bulk_update(
+            lista_turnos, ['inicio', 'total_ventas', 'ganancia_bruta'], batch_size=LOTE)
+        fechas = [venta.fecha for venta in lista_ventas]
+        Venta.objects.bulk_create(lista_ventas, batch_size=LOTE)
+        for venta, fecha in zip(lista_ventas, fechas):
+            venta.fecha = fecha
+        Venta.objects.bulk_update(lista_ventas, ['fecha'], batch_size=LOTE)
+        informar(f'{len(lista_turnos)} turnos, {len(lista_ventas)} ventas')
+
+        todos = []
+        for venta, detalles in zip(lista_ventas, detalles_por_venta):
+            for detalle in detalles:
+                detalle.venta = venta
+            todos.extend(detalles)
+        DetalleVenta.objects.bulk_create(todos, batch_size=LOTE)
+        informar(f'{len(todos)} detalles de venta')
+
+    return {
+        'usuarios': len(usuarios), 'pymes': len(lista_pymes),
+        'productos': productos * pymes, 'turnos': len(lista_turnos),
+        'ventas': len(lista_ventas), 'detalles': len(todos),
+    }
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    posicion = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[posicion]
+
+
+def medir(cliente, metodo, url, datos=None, repeticiones=50, calentamiento=3):
+    """Latencias, consultas y bytes de `repeticiones` peticiones iguales."""
+    def pedir():
+        respuesta = getattr(cliente, metodo)(url, datos, format='json')
+        if respuesta.streaming:
+            return respuesta, sum(len(parte) for parte in respuesta.streaming_content)
+        return respuesta, len(respuesta.content)
+
+    for _ in range(calentamiento):
+        pedir()
+
+    latencias, consultas, tamanos, estados = [], [], [], set()
+    inicio_total = time.perf_counter()
+    for _ in range(repeticiones):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta, tamano = pedir()
+            latencias.append(time.perf_counter() - inicio)
+        consultas.append(len(capturadas))
+        tamanos.append(tamano)
+        estados.add(respuesta.status_code)
+    total = time.perf_counter() - inicio_total
+
+    return {
+        'estados': sorted(estados),
+        'p50_ms': round(_percentil(latencias, 50) * 1000, 3),
+        'p95_ms': round(_percentil(latencias, 95) * 1000, 3),
+        'media_ms': round(statistics.mean(latencias) * 1000, 3),
+        'peticiones_por_segundo': round(repeticiones / total, 1),
+        'consultas_por_peticion': round(statistics.mean(consultas), 2),
+        'bytes_por_respuesta': round(statistics.mean(tamanos)),
+    }
+
+
+def escenarios(propietario, vendedor):
+    """(nombre, usuario, método, url, datos) de cada endpoint medido."""
+    pyme = PYME.objects.filter(propietario=propietario).order_by('id').first()
+    turno = Turno.objects.filter(pyme=pyme, activo=True).order_by('-inicio').first()
+    producto = Producto.objects.filter(tienda=pyme).order_by('id').first()
+    cesta = [{'producto': p.id, 'cantidad': 1}
+             for p in Producto.objects.filter(tienda=pyme).order_by('id')[:5]]
+    return [
+        ('listar_pymes', propietario, 'get', reverse('listar_pymes'), None),
+        ('detalle_pyme', propietario, 'get', reverse('detalle_pyme', args=[pyme.id]), None),
+        ('listar_productos', propietario, 'get', reverse('listar_productos'), None),
+        ('listar_productos_pagina', propietario, 'get', reverse('listar_productos') + '?limite=50', None),
+        ('buscar_productos', vendedor, 'get', reverse('buscar_productos'),
+         {'pyme': pyme.id, 'q': producto.nombre[:10]}),
+        ('listar_turnos', propietario, 'get', reverse('listar_turnos'), None),
+        ('listar_turnos_activos', propietario, 'get', reverse('listar_turnos') + '?activo=true', None),
+        ('me', propietario, 'get', reverse('me'), None),
+        ('listar_usuarios', propietario, 'get', reverse('listar_usuarios'), None),
+        ('exportar_ventas', propietario, 'get', reverse('exportar_ventas') + f'?pyme={pyme.id}', None),
+        ('registrar_venta', vendedor, 'post', reverse('registrar_venta'),
+         {'turno': turno.id, 'productos': cesta, 'metodo_pago': 'efectivo'}),
+    ]
+
+
+def listados(usuario):
+    """
+    (nombre, serialización con ModelSerializer, serialización de
+    tienda.lectura) de cada listado; ambas devuelven los bytes de la
+    respuesta, consultas incluidas.
+    """
+    roles = acceso.roles_usuario(usuario)
+    ids = list(roles)
+    drf, rapido = JSONRenderer(), JSONRapidoRenderer()
+
+    # Querysets nuevos en cada llamada para no medir la caché del queryset
+    def pymes():
+        return PYME.objects.filter(id__in=ids)
+
+    def productos():
+        return Producto.objects.filter(tienda_id__in=ids)
+
+    def turnos():
+        return Turno.objects.filter(pyme_id__in=ids).order_by('-inicio', 'id')
+
+    return [
+        ('pymes',
+         lambda: drf.render(PYMESerializer(pymes(), many=True).data),
+         lambda: rapido.render(lectura.pymes(lectura.filas_pymes(pymes())))),
+        ('productos',
+         lambda: drf.render(ProductoSerializer(
+             productos().select_related('tienda'), many=True,
+             context={'roles': roles}).data),
+         lambda: rapido.render(lectura.formatear_productos(
+             lectura.filas_productos(productos()), roles))),
+        ('turnos',
+         lambda: drf.render(TurnoSerializer(turnos(), many=True).data),
+         lambda: rapido.render(lectura.turnos(lectura.filas_turnos(turnos())))),
+    ]
+
+
+def comparar_serializacion(usuario, repeticiones=10):
+    """
+    Tiempo por listado de ModelSerializer + JSONRenderer frente a
+    tienda.lectura + JSONRapidoRenderer, comprobando que los bytes coinciden.
+    """
+    resultados = {}
+    for nombre, antes, despues in listados(usuario):
+        iguales = antes() == despues()
+        tiempos = {}
+        for clave, funcion in (('model_serializer', antes), ('lectura', despues)):
+            latencias = []
+            for _ in range(repeticiones):
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    contenido = funcion()
+                    latencias.append(time.perf_counter() - inicio)
+            tiempos[clave] = {
+                'media_ms': round(statistics.mean(latencias) * 1000, 3),
+                'consultas': len(capturadas),
+                'bytes': len(contenido),
+            }
+        resultados[nombre] = {
+            **tiempos,
+            'aceleracion': round(
+                tiempos['model_serializer']['media_ms'] / tiempos['lectura']['media_ms'], 2),
+            'bytes_iguales': iguales,
+        }
+    return resultados
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(propietario, vendedor, repeticiones=50, solo=None):
+    resultados = {}
+    # El cliente de pruebas usa el host "testserver"
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for nombre, usuario, metodo, url, datos in escenarios(propietario, vendedor):
+            if solo and nombre not in solo:
+                continue
+            cliente = APIClient()
+            cliente.force_authenticate(usuario)
+            resultados[nombre] = medir(cliente, metodo, url, datos, repeticiones)
+    return {
+        'commit': commit_actual(),
+        'fecha': timezone.now().isoformat(),
+        'base_de_datos': connection.vendor,
+        'repeticiones': repeticiones,
+        'endpoints': resultados,
+    }
+
+
+# Concurrencia WSGI frente a ASGI con servidores reales
+
+SERVIDORES = {
+    # Workers síncronos: una conexión a la vez por proceso
+    'wsgi': (['core.wsgi:application', '--worker-class', 'sync'], '/api/'),
+    'asgi': (['core.asgi:application', '-c', 'python:core.gunicorn_asgi'], '/api/async/'),
+}
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def _servidor(argumentos, workers, entorno=None):
+    """Levanta gunicorn en un puerto libre; devuelve (puerto, pid)."""
+    puerto = _puerto_libre()
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *argumentos,
+         '--bind', f'127.0.0.1:{puerto}', '--workers', str(workers)],
+        cwd=settings.BASE_DIR, env={**os.environ, 'DEBUG': 'False', **(entorno or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', puerto), 0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield puerto, servidor.pid
+    finally:
+        servidor.terminate()
+        servidor.wait(10)
+
+
+def _rss_kb(pid):
+    """RSS del proceso y de todos sus hijos, en KB (Linux, /proc)."""
+    total, pendientes = 0, [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with open(f'/proc/{actual}/status') as archivo:
+                for linea in archivo:
+                    if linea.startswith('VmRSS:'):
+                        total += int(linea.split()[1])
+            for tarea in os.listdir(f'/proc/{actual}/task'):
+                with open(f'/proc/{actual}/task/{tarea}/children') as archivo:
+                    pendientes.extend(int(hijo) for hijo in archivo.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+async def _peticion(puerto, ruta, token, limite, cuerpo=None):
+    """
+    (estado, segundos) de un GET, o de un POST con `cuerpo` como JSON, o
+    (None, limite) si no hubo respuesta.
+    """
+    inicio = time.perf_counter()
+    metodo, cabeceras, datos = 'GET', '', b''
+    if cuerpo is not None:
+        datos = json.dumps(cuerpo).encode()
+        metodo = 'POST'
+        cabeceras = f'Content-Type: application/json\r\nContent-Length: {len(datos)}\r\n'
+
+    async def pedir():
+        lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+        escritor.write(
+            f'{metodo} {ruta} HTTP/1.1\r\nHost: localhost\r\n{cabeceras}'
+            f'Authorization: Bearer {token}\r\nConnection: close\r\n\r\n'.encode() + datos)
+        await escritor.drain()
+        respuesta = await lector.read()
+        escritor.close()
+        return int(respuesta.split(b' ', 2)[1])
+
+    try:
+        estado = await asyncio.wait_for(pedir(), limite)
+    except (asyncio.TimeoutError, OSError, IndexError, ValueError):
+        return None, limite
+    return estado, time.perf_counter() - inicio
+
+
+async def _cliente_lento(puerto, ruta, parar):
+    """Mantiene la conexión abierta enviando una cabecera por segundo."""
+    try:
+        lector, escritor = await asyncio.open_connection('127.0.0.1', puerto)
+        escritor.write(f'GET {ruta} HTTP/1.1\r\nHost: localhost\r\n'.encode())
+        while not parar.is_set():
+            escritor.write(b'X-Lento: 1\r\n')
+            await escritor.drain()
+            try:
+                await asyncio.wait_for(parar.wait(), 1)
+            except asyncio.TimeoutError:
+                pass
+        escritor.close()
+    except OSError:
+        pass
+
+
+async def _calentar(puerto, ruta, token, cantidad, limite):
+    await asyncio.gather(*(_peticion(puerto, ruta, token, limite) for _ in range(cantidad)))
+
+
+async def _carga(puerto, ruta, token, lentos, peticiones, limite, pid):
+    parar = asyncio.Event()
+    reposo = _rss_kb(pid)
+    tareas_lentas = [asyncio.create_task(_cliente_lento(puerto, ruta, parar))
+                     for _ in range(lentos)]
+    await asyncio.sleep(2)
+    con_lentos = _rss_kb(pid)
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(
+        _peticion(puerto, ruta, token, limite) for _ in range(peticiones)))
+    total = time.perf_counter() - inicio
+    pico = _rss_kb(pid)
+
+    parar.set()
+    await asyncio.gather(*tareas_lentas)
+
+    latencias = [segundos for estado, segundos in resultados if estado == 200]
+    return {
+        'respondidas': len(latencias),
+        'sin_respuesta': sum(1 for estado, _ in resultados if estado is None),
+        'otros_estados': sorted({e for e, _ in resultados if e not in (None, 200)}),
+        'p50_ms': round(_percentil(latencias, 50) * 1000, 1) if latencias else None,
+        'p95_ms': round(_percentil(latencias, 95) * 1000, 1) if latencias else None,
+        'peticiones_por_segundo': round(len(latencias) / total, 1),
+        'rss_reposo_mb': round(reposo / 1024, 1),
+        'rss_carga_mb': round(pico / 1024, 1),
+        'kb_por_conexion_lenta': round((con_lentos - reposo) / lentos, 1) if lentos else None,
+    }
+
+
+def comparar_concurrencia(usuario, ruta='productos/?limite=50', workers=2,
+                          lentos=20, peticiones=100, limite=10, modos=('wsgi', 'asgi')):
+    """
+    Levanta cada servidor (gunicorn síncrono y el perfil ASGI) con `workers`
+    procesos, abre `lentos` conexiones que nunca terminan de enviar la
+    petición y, con ellas abiertas, lanza `peticiones` GET concurrentes a
+    `ruta` (relativa a api/ o api/async/). Una petición sin respuesta en
+    `limite` segundos cuenta como perdida.
+    """
+    from accounts.authentication import tokens_para
+    _, token = tokens_para(usuario)
+
+    resultados = {}
+    for modo in modos:
+        argumentos, prefijo = SERVIDORES[modo]
+        with _servidor(argumentos, workers) as (puerto, pid):
+            # Calentar todos los workers antes de medir
+            asyncio.run(_calentar(puerto, prefijo + ruta, str(token), workers * 4, limite))
+            resultados[modo] = asyncio.run(_carga(
+                puerto, prefijo + ruta, str(token), lentos, peticiones, limite, pid))
+    return {
+        'commit': commit_actual(),
+        'ruta': ruta, 'workers': workers, 'conexiones_lentas': lentos,
+        'peticiones': peticiones, 'limite_s': limite,
+        'servidores': resultados,
+    }
+
+
+# Ventas concurrentes en SQLite
+
+PERFILES_SQLITE = {
+    # Lo que hace Django sin OPTIONS: diario clásico y BEGIN diferido
+    'simple': ({'SQLITE_OPTIMIZADO': 'False'}, 'DELETE'),
+    'optimizado': ({'SQLITE_OPTIMIZADO': 'True'}, 'WAL'),
+}
+
+
+def _modo_diario(ruta, modo):
+    # journal_mode=WAL queda guardado en el archivo: hay que deshacerlo a mano
+    with closing(sqlite3.connect(ruta)) as conexion:
+        conexion.execute(f'PRAGMA journal_mode={modo}')
+
+
+async def _ventas_concurrentes(puerto, token, cuerpo, peticiones, limite):
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(
+        _peticion(puerto, '/api/ventas/registrar/', token, limite, cuerpo)
+        for _ in range(peticiones)))
+    total = time.perf_counter() - inicio
+
+    latencias = [segundos for estado, segundos in resultados if estado == 201]
+    return {
+        'registradas': len(latencias),
+        'errores_500': sum(1 for estado, _ in resultados if estado == 500),
+        'sin_respuesta': sum(1 for estado, _ in resultados if estado is None),
+        'otros_estados': sorted({e for e, _ in resultados if e not in (None, 201, 500)}),
+        'p50_ms': round(_percentil(latencias, 50) * 1000, 1) if latencias else None,
+        'p95_ms': round(_percentil(latencias, 95) * 1000, 1) if latencias else None,
+        'ventas_por_segundo': round(len(latencias) / total, 1),
+    }
+
+
+def comparar_sqlite(vendedor, turno, cesta, workers=4, peticiones=200, limite=30,
+                    perfiles=('simple', 'optimizado')):
+    """
+    Registra `peticiones` ventas a la vez contra gunicorn con `workers`
+    procesos síncronos, primero con SQLite como lo configura Django y luego
+    con SQLITE_OPCIONES. Los "database is locked" llegan al cliente como 500.
+    Escribe en la base configurada, que debe ser un archivo SQLite.
+    """
+    from accounts.authentication import tokens_para
+    _, token = tokens_para(vendedor)
+    cuerpo = {'turno': turno.id, 'productos': cesta, 'metodo_pago': 'efectivo'}
+    ruta = settings.DATABASES['default']['NAME']
+    # Cambiar el modo del diario requiere que nadie más tenga la base abierta
+    connection.close()
+
+    resultados = {}
+    for perfil in perfiles:
+        entorno, diario = PERFILES_SQLITE[perfil]
+        _modo_diario(ruta, diario)
+        with _servidor(['core.wsgi:application', '--worker-class', 'sync'],
+                       workers, entorno) as (puerto, _):
+            asyncio.run(_calentar(puerto, '/api/auth/me/', str(token), workers * 4, limite))
+            resultados[perfil] = asyncio.run(_ventas_concurrentes(
+                puerto, str(token), cuerpo, peticiones, limite))
+    return {
+        'commit': commit_actual(),
+        'workers': workers, 'peticiones': peticiones, 'lineas_por_venta': len(cesta),
+        'perfiles': resultados,
+    }
+
+
+# Inventario con varias cajas a la vez
+
+def estres_inventario(turno, vendedor, productos, cajas=8, ventas=25, limite=60):
+    """
+    `cajas` hilos, cada uno con su conexión, registran `ventas` ventas de
+    una unidad de cada producto de `productos` (el primero es el producto
+    caliente), con las líneas en orden aleatorio. Comprueba que el stock
+    final sea el inicial menos lo vendido, que el libro de movimientos lo
+    explique y que ningún hilo quede esperando más de `limite` segundos.
+    """
+    ids = [producto.id for producto in productos]
+    inicial = dict(Producto.objects.filter(pk__in=ids).values_list('pk', 'stock'))
+    movimientos_antes = dict(_suma_movimientos(ids))
+    barrera = threading.Barrier(cajas)
+    resultados = []
+    candado = threading.Lock()
+
+    def caja(numero):
+        aleatorio = random.Random(numero)
+        propias = {'registradas': 0, 'sin_stock': 0, 'errores': []}
+        try:
+            barrera.wait(limite)
+            for _ in range(ventas):
+                cesta = [{'producto': producto_id, 'cantidad': 1} for producto_id in ids]
+                aleatorio.shuffle(cesta)
+                try:
+                    registrar_venta(turno, vendedor, cesta, 'efectivo')
+                    propias['registradas'] += 1
+                except VentaInvalida:
+                    propias['sin_stock'] += 1
+        except Exception as e:
+            propias['errores'].append(repr(e))
+        finally:
+            connection.close()
+            with candado:
+                resultados.append(propias)
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=caja, args=(n,), daemon=True) for n in range(cajas)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(max(limite - (time.perf_counter() - inicio), 0))
+    total = time.perf_counter() - inicio
+
+    registradas = sum(r['registradas'] for r in resultados)
+    final = dict(Producto.objects.filter(pk__in=ids).values_list('pk', 'stock'))
+    movimientos = {
+        producto_id: suma - movimientos_antes.get(producto_id, 0)
+        for producto_id, suma in _suma_movimientos(ids)}
+    return {
+        'cajas': cajas, 'ventas_por_caja': ventas,
+        'registradas': registradas,
+        'sin_stock': sum(r['sin_stock'] for r in resultados),
+        'errores': [e for r in resultados for e in r['errores']],
+        'colgadas': sum(1 for hilo in hilos if hilo.is_alive()),
+        'stock_inicial': inicial, 'stock_final': final,
+        'sin_actualizaciones_perdidas': all(
+            final[p] == inicial[p] - registradas for p in ids),
+        'libro_cuadra': all(
+            movimientos.get(p, 0) == final[p] - inicial[p] for p in ids),
+        'ventas_por_segundo': round(registradas / total, 1),
+    }
+
+
+def _suma_movimientos(ids):
+    return (MovimientoInventario.objects.filter(producto_id__in=ids)
+            .values('producto_id').annotate(suma=Sum('cantidad'))
+            .values_list('producto_id', 'suma'))
@@ -0,0 +1,155 @@
+# backend/tienda/busqueda.py
+import bisect
+import re
+import threading
+import unicodedata
+
+from django.db import transaction
+
+from .models import PYME, Producto
+from .serializers import ProductoSerializer
+
+# Índices por PYME cargados en este proceso: {pyme_id: IndiceProductos}
+_indices = {}
+_lock = threading.Lock()
+
+
+def normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def tokens(texto):
+    return re.findall(r'[a-z0-9]+', normalizar(texto))
+
+
+class IndiceProductos:
+    """
+    Catálogo de una PYME en memoria: mapa exacto por código de barras y una
+    lista ordenada de (token, id) del nombre normalizado para buscar por
+    prefijo con bisect.
+
+    Una vez en _indices no se modifica: los cambios se hacen sobre una copia
+    que lo reemplaza, así las búsquedas leen sin tomar el lock.
+    """
+
+    def __init__(self, version, productos):
+        self.version = version
+        self.por_id = {}
+        self.por_codigo = {}
+        self.tokens = []
+        for datos in productos:
+            self._registrar(datos)
+            self.tokens.extend((t, datos['id']) for t in tokens(datos['nombre']))
+        self.tokens.sort()
+
+    def copia(self):
+        nuevo = IndiceProductos.__new__(IndiceProductos)
+        nuevo.version = self.version
+        nuevo.por_id = dict(self.por_id)
+        nuevo.por_codigo = dict(self.por_codigo)
+        nuevo.tokens = list(self.tokens)
+        return nuevo
+
+    def _registrar(self, datos):
+        self.por_id[datos['id']] = datos
+        if datos['codigo']:
+            self.por_codigo[datos['codigo']] = datos
+
+    def agregar(self, datos):
+        self.quitar(datos['id'])
+        self._registrar(datos)
+        for token in tokens(datos['nombre']):
+            bisect.insort(self.tokens, (token, datos['id']))
+
+    def quitar(self, producto_id):
+        datos = self.por_id.pop(producto_id, None)
+        if datos is None:
+            return
+        if datos['codigo'] and self.por_codigo.get(datos['codigo']) is datos:
+            del self.por_codigo[datos['codigo']]
+        for token in tokens(datos['nombre']):
+            posicion = bisect.bisect_left(self.tokens, (token, producto_id))
+            if posicion < len(self.tokens) and self.tokens[posicion] == (token, producto_id):
+                del self.tokens[posicion]
+
+    def buscar_codigo(self, codigo):
+        datos = self.por_codigo.get(codigo)
+        return [datos] if datos else []
+
+    def buscar(self, texto, limite):
+        """Productos cuyo nombre tiene una palabra que empieza por cada término."""
+        ids = None
+        for termino in tokens(texto):
+            encontrados = set()
+            posicion = bisect.bisect_left(self.tokens, (termino,))
+            while posicion < len(self.tokens) and self.tokens[posicion][0].startswith(termino):
+                encontrados.add(self.tokens[posicion][1])
+                posicion += 1
+            ids = encontrados if ids is None else ids & encontrados
+            if not ids:
+                return []
+        if ids is None:
+            return []
+        resultados = sorted(
+            (self.por_id[i] for i in ids), key=lambda d: (d['nombre'], d['id']))
+        return resultados[:limite]
+
+
+def _cargar(pyme_id):
+    productos = Producto.objects.filter(tienda_id=pyme_id).select_related('tienda')
+    return ProductoSerializer(productos, many=True).data
+
+
+def indice(pyme_id):
+    """
+    Devuelve el índice de la PYME, reconstruyéndolo si su versión ya no
+    coincide con PYME.version (cambios hechos por otros procesos o por
+    escrituras masivas que no disparan señales).
+    """
+    version = PYME.objects.filter(pk=pyme_id).values_list(
+        'version', flat=True).first()
+    actual = _indices.get(pyme_id)
+    if actual is not None and actual.version == version:
+        return actual
+
+    nuevo = IndiceProductos(version, _cargar(pyme_id))
+    with _lock:
+        _indices[pyme_id] = nuevo
+    return nuevo
+
+
+def registrar_cambio(producto, pymes_ids, eliminado):
+    """
+    Aplica un cambio de producto a los índices cargados cuando la transacción
+    se confirma. Cada PYME afectada subió exactamente una versión
+    (tienda.versiones.incrementar), así que el índice avanza una también: si
+    ya estaba desactualizado sigue sin coincidir y se reconstruye.
+    """
+    producto_id = producto.id
+
+    def aplicar():
+        cargados = [pyme_id for pyme_id in pymes_ids if pyme_id in _indices]
+        if not cargados:
+            return
+        datos = None if eliminado else ProductoSerializer(producto).data
+        with _lock:
+            for pyme_id in cargados:
+                actual = _indices.get(pyme_id)
+                if actual is None:
+                    continue
+                # Una sola asignación publica el índice nuevo; quien busca
+                # en el anterior lo termina de leer entero
+                nuevo = actual.copia()
+                nuevo.quitar(producto_id)
+                if datos is not None and datos['tienda'] == pyme_id:
+                    nuevo.agregar(datos)
+                nuevo.version += 1
+                _indices[pyme_id] = nuevo
+
+    transaction.on_commit(aplicar)
+
+
+def limpiar():
+    with _lock:
+        _indices.clear()
@@ -0,0 +1,180 @@
+# backend/tienda/eventos.py
+"""
+Eventos en vivo de los turnos (ventas y totales) para los suscriptores SSE
+de tienda.views_async.
+
+El broker se elige con EVENTOS_BROKER. BrokerLocal reparte los eventos
+dentro del proceso: con varios procesos, un suscriptor solo ve las ventas
+registradas en el suyo, así que en ese caso hay que configurar un broker
+compartido con la misma interfaz (suscribir, publicar, tiene_suscriptores).
+"""
+import asyncio
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from core.renderers import JSONRapidoRenderer
+from .models import Turno
+from .serializers import VentaSerializer
+
+VENTA = 'venta'
+TOTALES = 'totales'
+CERRADO = 'cerrado'
+
+# `texto` es el evento ya en formato SSE: se arma una vez por publicación
+Evento = namedtuple('Evento', 'tipo texto')
+
+_renderer = JSONRapidoRenderer()
+
+
+def formatear(tipo, datos, id=None):
+    lineas = [f'event: {tipo}']
+    if id is not None:
+        lineas.append(f'id: {id}')
+    lineas.append('data: ' + _renderer.render(datos).decode())
+    return Evento(tipo, '\n'.join(lineas) + '\n\n')
+
+
+def canal_turno(turno_id):
+    return f'turno:{turno_id}'
+
+
+class Suscripcion:
+    """Cola de eventos de un suscriptor; se crea dentro del bucle de eventos."""
+
+    def __init__(self, broker, canal, maximo):
+        self.broker = broker
+        self.canal = canal
+        self.cola = asyncio.Queue(maximo)
+        self.loop = asyncio.get_running_loop()
+
+    def entregar(self, evento):
+        # Se llama desde el hilo que registró la venta
+        self.loop.call_soon_threadsafe(self._poner, evento)
+
+    def _poner(self, evento):
+        # Un suscriptor lento pierde los eventos más viejos, no bloquea a nadie
+        if self.cola.full():
+            self.cola.get_nowait()
+        self.cola.put_nowait(evento)
+
+    async def recibir(self):
+        return await self.cola.get()
+
+    def cerrar(self):
+        self.broker.quitar(self)
+
+
+class BrokerLocal:
+    """Pub/sub en memoria del proceso."""
+    MAXIMO_PENDIENTES = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._canales = {}
+
+    def suscribir(self, canal):
+        suscripcion = Suscripcion(self, canal, self.MAXIMO_PENDIENTES)
+        with self._lock:
+            self._canales.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def quitar(self, suscripcion):
+        with self._lock:
+            suscripciones = self._canales.get(suscripcion.canal)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._canales[suscripcion.canal]
+
+    def tiene_suscriptores(self, canal):
+        return bool(self._canales.get(canal))
+
+    def publicar(self, canal, evento):
+        with self._lock:
+            suscripciones = list(self._canales.get(canal, ()))
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.entregar(evento)
+            except RuntimeError:
+                # El bucle del suscriptor ya terminó
+                self.quitar(suscripcion)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTOS_BROKER)()
+    return _broker
+
+
+def reiniciar():
+    """Descarta el broker actual (pruebas o cambio de EVENTOS_BROKER)."""
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+def totales(turno_id):
+    """Evento con los totales acumulados del turno, o None si no existe."""
+    fila = Turno.objects.filter(pk=turno_id).values(
+        'id', 'total_ventas', 'ganancia_bruta', 'activo').first()
+    return fila and evento_totales(fila)
+
+
+def evento_totales(fila):
+    return formatear(TOTALES, {
+        'turno': fila['id'],
+        'total_ventas': f"{fila['total_ventas']:.2f}",
+        'ganancia_bruta': f"{fila['ganancia_bruta']:.2f}",
+        'activo': fila['activo'],
+    })
+
+
+def ventas_registradas(turno_id, ventas):
+    """
+    Publica las ventas y los nuevos totales cuando se confirme la
+    transacción en curso. Sin suscriptores no hace ninguna consulta.
+    """
+    canal = canal_turno(turno_id)
+
+    def publicar():
+        destino = broker()
+        if not destino.tiene_suscriptores(canal):
+            return
+        from .ventas import precargar_detalles
+        precargar_detalles(ventas)
+        for venta in ventas:
+            destino.publicar(canal, formatear(
+                VENTA, VentaSerializer(venta).data, id=venta.id))
+        evento = totales(turno_id)
+        if evento:
+            destino.publicar(canal, evento)
+
+    transaction.on_commit(publicar)
+
+
+def turno_cerrado(turno):
+    canal = canal_turno(turno.id)
+
+    def publicar():
+        destino = broker()
+        if destino.tiene_suscriptores(canal):
+            destino.publicar(canal, formatear(CERRADO, {
+                'turno': turno.id,
+                'total_ventas': f'{turno.total_ventas:.2f}',
+                'ganancia_bruta': f'{turno.ganancia_bruta:.2f}',
+                'fin': serializers.DateTimeField().to_representation(turno.fin),
+            }))
+
+    transaction.on_commit(publicar)
@@ -0,0 +1,131 @@
+# backend/tienda/exportacion.py
+import csv
+import json
+from itertools import chain
+
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
+from core.routers import alias_lectura
+
+from .archivo import ventas_archivadas
+from .fechas import filtrar_rango
+from .importacion import CAMPOS
+from .models import DetalleVenta, Producto, Venta
+
+TAMANO_BLOQUE = 2000
+TAMANO_BLOQUE_VENTAS = 500
+
+TIPOS_CONTENIDO = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class _Eco:
+    # csv.writer escribe en este objeto y devolvemos la línea tal cual
+    def write(self, valor):
+        return valor
+
+
+def lineas_csv(cabecera, filas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(cabecera)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def lineas_ndjson(objetos):
+    for objeto in objetos:
+        yield json.dumps(objeto, ensure_ascii=False) + '\n'
+
+
+def respuesta_streaming(lineas, formato, nombre):
+    respuesta = StreamingHttpResponse(
+        lineas, content_type=TIPOS_CONTENIDO[formato])
+    respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return respuesta
+
+
+def exportar_productos(pyme_id, formato):
+    """Líneas del catálogo en el mismo formato que acepta la importación."""
+    # Se lee al enviar la respuesta, cuando la petición ya no fija la réplica
+    filas = Producto.objects.using(alias_lectura()).filter(tienda_id=pyme_id).order_by(
+        'nombre', 'id').values_list(*CAMPOS).iterator(chunk_size=TAMANO_BLOQUE)
+    if formato == 'csv':
+        return lineas_csv(CAMPOS, (
+            (codigo or '', nombre, precio_compra, precio_venta)
+            for codigo, nombre, precio_compra, precio_venta in filas
+        ))
+    return lineas_ndjson(
+        {'codigo': codigo, 'nombre': nombre,
+         'precio_compra': str(precio_compra), 'precio_venta': str(precio_venta)}
+        for codigo, nombre, precio_compra, precio_venta in filas
+    )
+
+
+CAMPOS_VENTA = (
+    'venta', 'fecha', 'turno', 'vendedor', 'metodo_pago',
+    'codigo_transferencia', 'total',
+    'producto', 'producto_nombre', 'cantidad', 'precio_unitario', 'costo_unitario',
+)
+
+
+def _ventas(pyme_id, inicio, fin):
+    detalles = DetalleVenta.objects.select_related('producto').only(
+        'id', 'venta_id', 'cantidad', 'precio_unitario', 'costo_unitario',
+        'producto__nombre'
+    ).order_by('id')
+    ventas = Venta.objects.using(alias_lectura()).filter(pyme_id=pyme_id).select_related('vendedor').only(
+        'id', 'fecha', 'turno_id', 'metodo_pago', 'codigo_transferencia',
+        'total', 'vendedor__username'
+    ).prefetch_related(Prefetch('detalles', queryset=detalles)).order_by('id')
+    # iterator() con chunk_size resuelve el prefetch bloque a bloque, así
+    # la memoria no crece con el tamaño del rango
+    return filtrar_rango(ventas, 'fecha', inicio, fin).iterator(
+        chunk_size=TAMANO_BLOQUE_VENTAS)
+
+
+def _con_detalles(ventas):
+    for venta in ventas:
+        yield venta, [
+            (d.producto_id, d.producto.nombre, d.cantidad,
+             d.precio_unitario, d.costo_unitario)
+            for d in venta.detalles.all()
+        ]
+
+
+def exportar_ventas(pyme_id, inicio, fin, formato, archivadas=False):
+    """
+    Ventas de la PYME en [inicio, fin): en CSV una fila por línea de venta, en
+    NDJSON un objeto por venta con sus detalles. Con `archivadas` agrega al
+    final las que están en el archivo (tienda.archivo).
+    """
+    ventas = _con_detalles(_ventas(pyme_id, inicio, fin))
+    if archivadas:
+        ventas = chain(ventas, ventas_archivadas(pyme_id, inicio, fin))
+    if formato == 'csv':
+        return lineas_csv(CAMPOS_VENTA, (
+            (venta.id, venta.fecha.isoformat(), venta.turno_id,
+             venta.vendedor.username, venta.metodo_pago,
+             venta.codigo_transferencia or '', venta.total,
+             producto_id, nombre, cantidad, precio_unitario, costo_unitario)
+            for venta, detalles in ventas
+            for producto_id, nombre, cantidad, precio_unitario, costo_unitario in detalles
+        ))
+    return lineas_ndjson({
+        'venta': venta.id,
+        'fecha': venta.fecha.isoformat(),
+        'turno': venta.turno_id,
+        'vendedor': venta.vendedor.username,
+        'metodo_pago': venta.metodo_pago,
+        'codigo_transferencia': venta.codigo_transferencia,
+        'total': str(venta.total),
+        'detalles': [{
+            'producto': producto_id,
+            'producto_nombre': nombre,
+            'cantidad': cantidad,
+            'precio_unitario': str(precio_unitario),
+            'costo_unitario': str(costo_unitario),
+        } for producto_id, nombre, cantidad, precio_unitario, costo_unitario in detalles],
+    } for venta, detalles in ventas)
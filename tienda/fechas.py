@@ -0,0 +1,47 @@
+# backend/tienda/fechas.py
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+class FechaInvalida(Exception):
+    pass
+
+
+def _limite(valor, fin):
+    try:
+        fecha_hora = parse_datetime(valor)
+        if fecha_hora is None:
+            fecha = parse_date(valor)
+            if fecha is None:
+                raise ValueError
+            fecha_hora = datetime.combine(fecha, time.min)
+            # Una fecha sin hora como límite final incluye todo ese día
+            if fin:
+                fecha_hora += timedelta(days=1)
+    except ValueError:
+        raise FechaInvalida(f'Fecha inválida: {valor}')
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+def rango_fechas(desde, hasta):
+    """
+    Convierte los parámetros `desde`/`hasta` (fecha o fecha y hora ISO) en un
+    intervalo [inicio, fin). Cualquiera de los dos puede faltar (None).
+    """
+    inicio = _limite(desde, fin=False) if desde else None
+    fin = _limite(hasta, fin=True) if hasta else None
+    if inicio and fin and inicio >= fin:
+        raise FechaInvalida('La fecha inicial debe ser anterior a la final')
+    return inicio, fin
+
+
+def filtrar_rango(queryset, campo, inicio, fin):
+    if inicio:
+        queryset = queryset.filter(**{f'{campo}__gte': inicio})
+    if fin:
+        queryset = queryset.filter(**{f'{campo}__lt': fin})
+    return queryset
@@ -0,0 +1,150 @@
+# backend/tienda/importacion.py
+import codecs
+import csv
+import json
+import tempfile
+
+from django.db import transaction
+
+from . import versiones
+from .models import Producto
+from .serializers import ProductoImportacionSerializer
+
+CAMPOS = ('codigo', 'nombre', 'precio_compra', 'precio_venta')
+FORMATOS = ('csv', 'ndjson')
+TAMANO_LOTE = 500
+MAXIMO_ERRORES = 1000
+# Caracteres del archivo decodificado que se guardan en memoria; el resto
+# va a disco
+MAXIMO_EN_MEMORIA = 5 * 1024 * 1024
+
+
+def texto_utf8(binario):
+    """
+    Decodifica el archivo entero a un temporal y lo devuelve listo para leer.
+    Un error de codificación se lanza (UnicodeDecodeError) antes de guardar
+    el primer lote: los lotes anteriores no se deshacen.
+    """
+    texto = tempfile.SpooledTemporaryFile(
+        max_size=MAXIMO_EN_MEMORIA, mode='w+', encoding='utf-8', newline='')
+    try:
+        for parte in codecs.iterdecode(binario, 'utf-8-sig'):
+            texto.write(parte)
+    except UnicodeDecodeError:
+        texto.close()
+        raise
+    texto.seek(0)
+    return texto
+
+
+def leer_filas(lineas, formato):
+    """Genera (número de línea, datos o None, error) sin cargar todo el archivo."""
+    if formato == 'csv':
+        lector = csv.DictReader(lineas)
+        for fila in lector:
+            yield lector.line_num, fila, None
+        return
+
+    for numero, linea in enumerate(lineas, start=1):
+        if not linea.strip():
+            continue
+        try:
+            datos = json.loads(linea)
+        except ValueError:
+            yield numero, None, 'JSON inválido'
+            continue
+        if not isinstance(datos, dict):
+            yield numero, None, 'Se esperaba un objeto JSON'
+            continue
+        yield numero, datos, None
+
+
+class Importacion:
+    """Importa productos a una PYME por lotes, actualizando por código."""
+
+    def __init__(self, pyme_id):
+        self.pyme_id = pyme_id
+        self.creados = 0
+        self.actualizados = 0
+        self.con_error = 0
+        self.errores = []
+        self._codigos_vistos = set()
+
+    def error(self, fila, mensaje):
+        self.con_error += 1
+        if len(self.errores) < MAXIMO_ERRORES:
+            self.errores.append({'fila': fila, 'error': mensaje})
+
+    def procesar(self, lineas, formato):
+        lote = []
+        for numero, datos, error in leer_filas(lineas, formato):
+            if error:
+                self.error(numero, error)
+                continue
+            serializer = ProductoImportacionSerializer(data=datos)
+            if not serializer.is_valid():
+                self.error(numero, serializer.errors)
+                continue
+            codigo = serializer.validated_data.get('codigo')
+            if codigo in self._codigos_vistos:
+                self.error(numero, 'Código repetido en el archivo')
+                continue
+            if codigo:
+                self._codigos_vistos.add(codigo)
+            lote.append((numero, serializer.validated_data))
+            if len(lote) >= TAMANO_LOTE:
+                self._guardar(lote)
+                lote = []
+        if lote:
+            self._guardar(lote)
+        return self.resumen()
+
+    def _guardar(self, lote):
+        codigos = [d['codigo'] for _, d in lote if d.get('codigo')]
+        with transaction.atomic():
+            existentes = dict(Producto.objects.filter(
+                codigo__in=codigos).values_list('codigo', 'tienda_id'))
+
+            nuevos, con_codigo = [], []
+            for numero, datos in lote:
+                codigo = datos.get('codigo')
+                tienda_id = existentes.get(codigo)
+                if tienda_id is not None and tienda_id != self.pyme_id:
+                    self.error(numero, 'El código pertenece a otra tienda')
+                    continue
+                producto = Producto(tienda_id=self.pyme_id, **datos)
+                if codigo:
+                    con_codigo.append(producto)
+                    if tienda_id is None:
+                        self.creados += 1
+                    else:
+                        self.actualizados += 1
+                else:
+                    nuevos.append(producto)
+                    self.creados += 1
+
+            if con_codigo:
+                Producto.objects.bulk_create(
+                    con_codigo,
+                    update_conflicts=True,
+                    unique_fields=['codigo'],
+                    update_fields=['nombre', 'precio_compra',
+                                   'precio_venta', 'actualizado_en']
+                )
+            if nuevos:
+                Producto.objects.bulk_create(nuevos)
+            # bulk_create no dispara señales: se invalidan ETags e índices aquí
+            if con_codigo or nuevos:
+                versiones.incrementar(self.pyme_id)
+
+    def resumen(self):
+        return {
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'con_error': self.con_error,
+            'errores': self.errores,
+        }
+
+
+def importar_productos(pyme_id, lineas, formato):
+    return Importacion(pyme_id).procesar(lineas, formato)
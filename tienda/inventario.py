@@ -0,0 +1,108 @@
+# backend/tienda/inventario.py
+"""
+Stock de los productos y su libro de movimientos.
+
+Producto.stock en NULL es un producto sin control de inventario. El stock
+solo cambia con UPDATE condicionales sobre F('stock'), nunca leyendo el
+valor y guardándolo: dos cajas que venden el mismo producto a la vez no se
+pisan, y la que llega sin stock falla en vez de dejarlo negativo.
+
+Las filas se bloquean en orden de id y, en las ventas, antes que el turno:
+dos transacciones con productos en común nunca se esperan en círculo.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+
+from .models import MovimientoInventario, Producto
+
+# Condiciones por UPDATE: SQLite limita la profundidad de las expresiones
+LOTE_UPDATE = 200
+
+
+class StockInvalido(Exception):
+    """Error de un ajuste de stock; el mensaje se devuelve al cliente."""
+
+
+def cantidades_con_stock(detalles):
+    """{producto_id: unidades} de los detalles cuyo producto lleva inventario."""
+    cantidades = Counter()
+    for detalle in detalles:
+        if detalle.producto.stock is not None:
+            cantidades[detalle.producto_id] += detalle.cantidad
+    return cantidades
+
+
+def bloquear(producto_ids):
+    """
+    {producto_id: stock} de los que llevan inventario, con sus filas
+    bloqueadas hasta el final de la transacción.
+    """
+    return dict(
+        Producto.objects.select_for_update()
+        .filter(pk__in=producto_ids, stock__isnull=False)
+        .order_by('pk')
+        .values_list('pk', 'stock')
+    )
+
+
+def descontar(cantidades):
+    """
+    Resta {producto_id: unidades} con UPDATE condicionales. Devuelve False
+    si a alguno le faltó stock: lo ya restado queda en la transacción, que
+    quien llama debe revertir.
+    """
+    pendientes = sorted(cantidades.items())
+    for inicio in range(0, len(pendientes), LOTE_UPDATE):
+        lote = pendientes[inicio:inicio + LOTE_UPDATE]
+        condicion = Q()
+        for producto_id, cantidad in lote:
+            condicion |= Q(pk=producto_id, stock__gte=cantidad)
+        actualizados = Producto.objects.filter(condicion).update(stock=Case(*(
+            When(pk=producto_id, then=F('stock') - cantidad)
+            for producto_id, cantidad in lote
+        )))
+        if actualizados != len(lote):
+            return False
+    return True
+
+
+def movimientos_de_venta(venta, cantidades):
+    return [
+        MovimientoInventario(
+            producto_id=producto_id, tipo=MovimientoInventario.VENTA,
+            cantidad=-cantidad, venta=venta, usuario_id=venta.vendedor_id)
+        for producto_id, cantidad in sorted(cantidades.items())
+    ]
+
+
+def ajustar(producto_id, usuario, cantidad=None, stock=None, nota=''):
+    """
+    Suma `cantidad` (entrada si es positiva, ajuste si es negativa) o fija
+    el `stock` contado, lo que además activa el inventario del producto.
+    Devuelve el stock resultante.
+    """
+    with transaction.atomic():
+        if stock is not None:
+            actual = bloquear([producto_id]).get(producto_id, 0)
+            cantidad = stock - actual
+            Producto.objects.filter(pk=producto_id).update(stock=stock)
+            tipo = MovimientoInventario.AJUSTE
+        else:
+            actualizados = Producto.objects.filter(
+                pk=producto_id, stock__isnull=False, stock__gte=-cantidad
+            ).update(stock=F('stock') + cantidad)
+            if not actualizados:
+                if Producto.objects.filter(pk=producto_id, stock__isnull=True).exists():
+                    raise StockInvalido(
+                        'El producto no lleva inventario; fije primero su stock')
+                raise StockInvalido('Stock insuficiente')
+            tipo = (MovimientoInventario.ENTRADA if cantidad > 0
+                    else MovimientoInventario.AJUSTE)
+
+        MovimientoInventario.objects.create(
+            producto_id=producto_id, tipo=tipo, cantidad=cantidad,
+            usuario=usuario, nota=nota)
+        return Producto.objects.filter(pk=producto_id).values_list(
+            'stock', flat=True).get()
@@ -0,0 +1,280 @@
+# backend/tienda/lectura.py
+"""
+Serialización rápida de los listados. Lee con .values() y arma dicts a
+mano con las mismas claves, en el mismo orden y con el mismo formato que
+PYMESerializer, ProductoSerializer y TurnoSerializer, sin crear campos DRF
+por instancia ni consultar las relaciones de a una.
+
+Las consultas (filas_*, consulta_empleados_*) y el formateo (formatear_*)
+van por separado: tienda.views_async las ejecuta con el ORM async y
+reutiliza el mismo formateo.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import acceso
+from .fechas import filtrar_rango, rango_fechas
+from .models import PYME, Turno
+
+# Mismo formato que los campos que genera ModelSerializer
+_decimal_10 = serializers.DecimalField(
+    max_digits=10, decimal_places=2).to_representation
+_decimal_12 = serializers.DecimalField(
+    max_digits=12, decimal_places=2).to_representation
+
+
+def _formato_fecha():
+    """
+    DateTimeField de DRF con la zona horaria ya resuelta: sin ella la busca
+    en cada valor, que es lo más caro de un listado grande.
+    """
+    zona = timezone.get_current_timezone() if settings.USE_TZ else None
+    return serializers.DateTimeField(default_timezone=zona).to_representation
+
+
+def _consulta_usuarios(through, campo, ids):
+    """(id del padre, usuario_id, username) de todos los padres en una consulta."""
+    if not ids:
+        return through.objects.none()
+    return (through.objects
+            .filter(**{f'{campo}__in': ids})
+            .order_by(campo, 'usuario_id')
+            .values_list(campo, 'usuario_id', 'usuario__username'))
+
+
+def agrupar_usuarios(filas):
+    """{id del padre: [(usuario_id, username), ...]}"""
+    resultado = defaultdict(list)
+    for padre_id, usuario_id, username in filas:
+        resultado[padre_id].append((usuario_id, username))
+    return resultado
+
+
+# PYMEs
+
+CAMPOS_PYME = (
+    'id', 'propietario__username', 'administrador_id',
+    'administrador__username', 'nombre', 'descripcion', 'direccion',
+    'creado_en', 'actualizado_en',
+)
+
+
+def filas_pymes(queryset):
+    return queryset.values(*CAMPOS_PYME)
+
+
+def consulta_empleados_pymes(ids):
+    return _consulta_usuarios(PYME.empleados.through, 'pyme_id', ids)
+
+
+def empleados_pymes(ids):
+    return agrupar_usuarios(consulta_empleados_pymes(ids))
+
+
+def formatear_pymes(filas, empleados):
+    fecha = _formato_fecha()
+    resultado = []
+    for fila in filas:
+        lista = empleados.get(fila['id'], ())
+        pyme = {
+            'id': fila['id'],
+            'propietario': fila['propietario__username'],
+            'administrador': fila['administrador__username'],
+        }
+        # PYMESerializer omite administrador_id cuando no hay administrador
+        if fila['administrador_id'] is not None:
+            pyme['administrador_id'] = fila['administrador_id']
+        pyme['empleados'] = [username for _, username in lista]
+        pyme['empleados_ids'] = [usuario_id for usuario_id, _ in lista]
+        pyme['nombre'] = fila['nombre']
+        pyme['descripcion'] = fila['descripcion']
+        pyme['direccion'] = fila['direccion']
+        pyme['creado_en'] = fecha(fila['creado_en'])
+        pyme['actualizado_en'] = fecha(fila['actualizado_en'])
+        resultado.append(pyme)
+    return resultado
+
+
+def pymes(filas):
+    """Formatea filas de filas_pymes() trayendo sus empleados."""
+    filas = list(filas)
+    return formatear_pymes(filas, empleados_pymes([f['id'] for f in filas]))
+
+
+# Cada PYME formateada se guarda en el cache con su versión en la clave:
+# todo lo que cambia sus datos (la PYME, sus empleados o el nombre de uno de
+# sus usuarios, ver tienda.signals) sube la versión y la copia vieja ya no
+# se lee. Las PYMEs faltantes se arman juntas en las mismas dos consultas.
+
+def _clave_pyme(pyme_id, version):
+    return f'pyme:datos:{pyme_id}:{version}'
+
+
+def _claves_pymes(versiones):
+    return {pyme_id: _clave_pyme(pyme_id, version)
+            for pyme_id, version in versiones.items()}
+
+
+def _ordenar_pymes(claves, guardadas):
+    return [guardadas[claves[pyme_id]] for pyme_id in sorted(claves)
+            if claves[pyme_id] in guardadas]
+
+
+def pymes_cacheadas(versiones):
+    """
+    PYMEs formateadas, por id, a partir de {pyme_id: version} (como
+    versiones.versiones). Lee el cache con un solo get_many.
+    """
+    claves = _claves_pymes(versiones)
+    guardadas = cache.get_many(claves.values())
+    faltan = [pyme_id for pyme_id, clave in claves.items() if clave not in guardadas]
+    if faltan:
+        nuevas = {claves[pyme['id']]: pyme for pyme in pymes(
+            filas_pymes(PYME.objects.filter(id__in=faltan)))}
+        cache.set_many(nuevas, settings.PYMES_CACHE_TTL)
+        guardadas.update(nuevas)
+    return _ordenar_pymes(claves, guardadas)
+
+
+async def apymes_cacheadas(versiones):
+    claves = _claves_pymes(versiones)
+    guardadas = await cache.aget_many(claves.values())
+    faltan = [pyme_id for pyme_id, clave in claves.items() if clave not in guardadas]
+    if faltan:
+        filas = [fila async for fila in filas_pymes(PYME.objects.filter(id__in=faltan))]
+        empleados = agrupar_usuarios(
+            [fila async for fila in consulta_empleados_pymes(faltan)])
+        nuevas = {claves[pyme['id']]: pyme for pyme in formatear_pymes(filas, empleados)}
+        await cache.aset_many(nuevas, settings.PYMES_CACHE_TTL)
+        guardadas.update(nuevas)
+    return _ordenar_pymes(claves, guardadas)
+
+
+# Productos
+
+CAMPOS_PRODUCTO = (
+    'id', 'tienda__nombre', 'nombre', 'codigo', 'precio_compra',
+    'precio_venta', 'creado_en', 'actualizado_en', 'tienda_id',
+)
+
+
+def filas_productos(queryset):
+    return queryset.values(*CAMPOS_PRODUCTO)
+
+
+def formatear_productos(filas, roles):
+    """`roles` es {pyme_id: rol} del usuario, como en acceso.roles_usuario."""
+    fecha = _formato_fecha()
+    gestion = {pyme_id for pyme_id, rol in roles.items()
+               if rol in acceso.ROLES_GESTION}
+    return [
+        {
+            'id': fila['id'],
+            'tienda_nombre': fila['tienda__nombre'],
+            'puede_editar': fila['tienda_id'] in gestion,
+            'nombre': fila['nombre'],
+            'codigo': fila['codigo'],
+            'precio_compra': _decimal_10(fila['precio_compra']),
+            'precio_venta': _decimal_10(fila['precio_venta']),
+            'creado_en': fecha(fila['creado_en']),
+            'actualizado_en': fecha(fila['actualizado_en']),
+            'tienda': fila['tienda_id'],
+        }
+        for fila in filas
+    ]
+
+
+# Turnos
+
+CAMPOS_TURNO = (
+    'id', 'abierto_por__username', 'inicio', 'fin', 'activo',
+    'total_ventas', 'ganancia_bruta', 'salario_empleados', 'salario_admin',
+    'gastos', 'notas_gastos', 'pyme_id', 'abierto_por_id', 'cerrado_por_id',
+)
+
+
+def filas_turnos(queryset):
+    return queryset.values(*CAMPOS_TURNO)
+
+
+def turnos_visibles(usuario_id, pymes_gestion, pyme_id=None, activo=False,
+                    inicio=None, fin=None):
+    """
+    Turnos que ve el usuario: todos los de las PYMEs que gestiona y aquellos
+    a los que está asignado. Un solo WHERE, sin JOIN con los empleados ni
+    DISTINCT: cada rama del OR usa su índice y los filtros van a columnas
+    de turno_pyme_activo_inicio_idx y turno_pyme_inicio_idx.
+    """
+    asignados = Turno.empleados.through.objects.filter(
+        usuario_id=usuario_id).values('turno_id')
+    turnos = Turno.objects.filter(Q(pyme_id__in=pymes_gestion) | Q(id__in=asignados))
+    if pyme_id is not None:
+        turnos = turnos.filter(pyme_id=pyme_id)
+    if activo:
+        turnos = turnos.filter(activo=True)
+    return filtrar_rango(turnos, 'inicio', inicio, fin).order_by('-inicio', 'id')
+
+
+def filtros_turnos(parametros):
+    """
+    Argumentos de turnos_visibles desde la query string (pyme, activo,
+    desde y hasta sobre el inicio). Lanza FechaInvalida.
+    """
+    inicio, fin = rango_fechas(parametros.get('desde'), parametros.get('hasta'))
+    pyme_id = parametros.get('pyme') or None
+    if pyme_id is not None:
+        try:
+            pyme_id = int(pyme_id)
+        except ValueError:
+            # Un id que no es un número no coincide con ningún turno
+            pyme_id = 0
+    return {
+        'pyme_id': pyme_id,
+        'activo': parametros.get('activo') == 'true',
+        'inicio': inicio, 'fin': fin,
+    }
+
+
+def consulta_empleados_turnos(ids):
+    return _consulta_usuarios(Turno.empleados.through, 'turno_id', ids)
+
+
+def empleados_turnos(ids):
+    return agrupar_usuarios(consulta_empleados_turnos(ids))
+
+
+def formatear_turnos(filas, empleados):
+    fecha = _formato_fecha()
+    resultado = []
+    for fila in filas:
+        lista = empleados.get(fila['id'], ())
+        resultado.append({
+            'id': fila['id'],
+            'empleados_nombres': [username for _, username in lista],
+            'abierto_por_nombre': fila['abierto_por__username'],
+            'inicio': fecha(fila['inicio']),
+            'fin': fecha(fila['fin']),
+            'activo': fila['activo'],
+            'total_ventas': _decimal_12(fila['total_ventas']),
+            'ganancia_bruta': _decimal_12(fila['ganancia_bruta']),
+            'salario_empleados': _decimal_10(fila['salario_empleados']),
+            'salario_admin': _decimal_10(fila['salario_admin']),
+            'gastos': _decimal_10(fila['gastos']),
+            'notas_gastos': fila['notas_gastos'],
+            'pyme': fila['pyme_id'],
+            'abierto_por': fila['abierto_por_id'],
+            'cerrado_por': fila['cerrado_por_id'],
+            'empleados': [usuario_id for usuario_id, _ in lista],
+        })
+    return resultado
+
+
+def turnos(filas):
+    """Formatea filas de filas_turnos() trayendo sus empleados."""
+    filas = list(filas)
+    return formatear_turnos(filas, empleados_turnos([f['id'] for f in filas]))
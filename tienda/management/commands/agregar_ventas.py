@@ -0,0 +1,24 @@
+# backend/tienda/management/commands/agregar_ventas.py
+from django.core.management.base import BaseCommand
+
+from tienda import analitica
+
+
+class Command(BaseCommand):
+    help = ('Suma las ventas nuevas a los agregados por hora y día de cada '
+            'PYME. Pensado para ejecutarse cada minuto (cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--margen', type=int,
+            help='Segundos que debe tener una venta para sumarse '
+                 '(por defecto ANALITICA_MARGEN_SEGUNDOS).')
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help='Borrar los agregados y volver a sumar todas las ventas.')
+
+    def handle(self, *args, **options):
+        if options['reconstruir']:
+            analitica.reconstruir()
+        sumadas = analitica.ponerse_al_dia(options['margen'])
+        self.stdout.write(self.style.SUCCESS(f'{sumadas} venta(s) agregadas.'))
@@ -0,0 +1,41 @@
+# backend/tienda/management/commands/archivar_ventas.py
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda import archivo
+
+
+class Command(BaseCommand):
+    help = ('Mueve a VentaArchivada las ventas de los turnos cerrados hace más '
+            'de ARCHIVO_HORIZONTE_DIAS días, un turno por transacción. Solo '
+            'archiva los turnos con resumen y con sus ventas ya agregadas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int,
+            help='Horizonte en días (por defecto ARCHIVO_HORIZONTE_DIAS).')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo verificar; termina con error si algún turno no se puede archivar.')
+
+    def handle(self, *args, **options):
+        archivados = ventas = 0
+        pendientes = []
+        for turno_id in list(archivo.turnos_archivables(options['dias'])):
+            try:
+                if options['check']:
+                    archivo.verificar(turno_id)
+                else:
+                    ventas += archivo.archivar_turno(turno_id)
+                    archivados += 1
+            except archivo.ArchivoInvalido as e:
+                pendientes.append(turno_id)
+                self.stdout.write(f'Turno {turno_id}: {e}')
+
+        if options['check']:
+            if pendientes:
+                raise CommandError(f'{len(pendientes)} turno(s) no se pueden archivar.')
+            self.stdout.write(self.style.SUCCESS('Todos los turnos se pueden archivar.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'{ventas} venta(s) de {archivados} turno(s) archivadas; '
+            f'{len(pendientes)} turno(s) pendientes.'))
@@ -0,0 +1,50 @@
+# backend/tienda/management/commands/benchmark_api.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Usuario
+from tienda.benchmark import commit_actual, comparar_serializacion, ejecutar
+
+
+class Command(BaseCommand):
+    help = ('Mide p50/p95, peticiones por segundo y consultas por petición de '
+            'cada endpoint con el cliente de pruebas y lo imprime en JSON. '
+            'Usar sobre datos de seed_benchmark; registrar_venta escribe ventas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default='bench',
+                            help='Prefijo usado en seed_benchmark.')
+        parser.add_argument('--repeticiones', type=int, default=50)
+        parser.add_argument('--solo', nargs='*',
+                            help='Medir solo estos escenarios.')
+        parser.add_argument('--salida', help='Guardar el JSON en este archivo.')
+        parser.add_argument('--serializacion', action='store_true',
+                            help='Comparar solo la serialización de los listados '
+                                 '(ModelSerializer frente a tienda.lectura).')
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        try:
+            propietario = Usuario.objects.get(username=f'{prefijo}_propietario_0_0')
+            vendedor = Usuario.objects.get(username=f'{prefijo}_empleado_0_0')
+        except Usuario.DoesNotExist:
+            raise CommandError(
+                f'No hay datos con el prefijo "{prefijo}"; ejecute seed_benchmark.')
+
+        if options['serializacion']:
+            resultado = {
+                'commit': commit_actual(),
+                'repeticiones': options['repeticiones'],
+                'listados': comparar_serializacion(
+                    propietario, options['repeticiones']),
+            }
+        else:
+            resultado = ejecutar(
+                propietario, vendedor, options['repeticiones'], options['solo'])
+
+        texto = json.dumps(resultado, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                archivo.write(texto + '\n')
+        self.stdout.write(texto)
@@ -0,0 +1,47 @@
+# backend/tienda/management/commands/benchmark_asgi.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Usuario
+from tienda.benchmark import SERVIDORES, comparar_concurrencia
+
+
+class Command(BaseCommand):
+    help = ('Compara gunicorn con workers síncronos (api/) y el perfil ASGI '
+            '(api/async/) con conexiones lentas abiertas: peticiones '
+            'respondidas, latencias y memoria. Requiere gunicorn, uvicorn y '
+            'datos de seed_benchmark; solo Linux (lee /proc).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default='bench',
+                            help='Prefijo usado en seed_benchmark.')
+        parser.add_argument('--ruta', default='productos/?limite=50',
+                            help='Ruta relativa a api/ y api/async/.')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--lentos', type=int, default=20,
+                            help='Conexiones que no terminan de enviar la petición.')
+        parser.add_argument('--peticiones', type=int, default=100)
+        parser.add_argument('--limite', type=float, default=10,
+                            help='Segundos para dar una petición por perdida.')
+        parser.add_argument('--modos', nargs='*', choices=sorted(SERVIDORES),
+                            default=['wsgi', 'asgi'])
+        parser.add_argument('--salida', help='Guardar el JSON en este archivo.')
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        try:
+            usuario = Usuario.objects.get(username=f'{prefijo}_propietario_0_0')
+        except Usuario.DoesNotExist:
+            raise CommandError(
+                f'No hay datos con el prefijo "{prefijo}"; ejecute seed_benchmark.')
+
+        resultado = comparar_concurrencia(
+            usuario, options['ruta'], options['workers'], options['lentos'],
+            options['peticiones'], options['limite'], options['modos'])
+
+        texto = json.dumps(resultado, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                archivo.write(texto + '\n')
+        self.stdout.write(texto)
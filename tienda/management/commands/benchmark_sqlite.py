@@ -0,0 +1,55 @@
+# backend/tienda/management/commands/benchmark_sqlite.py
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda.benchmark import PERFILES_SQLITE, comparar_sqlite
+from tienda.models import Producto, Turno
+
+
+class Command(BaseCommand):
+    help = ('Registra ventas concurrentes con SQLite sin ajustes y con el '
+            'perfil de producción (WAL, BEGIN IMMEDIATE): ventas por segundo, '
+            'latencias y errores. Escribe ventas en la base configurada, que '
+            'debe ser un archivo SQLite con datos de seed_benchmark.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default='bench',
+                            help='Prefijo usado en seed_benchmark.')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--peticiones', type=int, default=200)
+        parser.add_argument('--lineas', type=int, default=5,
+                            help='Productos por venta.')
+        parser.add_argument('--limite', type=float, default=30,
+                            help='Segundos para dar una petición por perdida.')
+        parser.add_argument('--perfiles', nargs='*', choices=sorted(PERFILES_SQLITE),
+                            default=['simple', 'optimizado'])
+        parser.add_argument('--salida', help='Guardar el JSON en este archivo.')
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('La base configurada no es SQLite.')
+
+        prefijo = options['prefijo']
+        turno = Turno.objects.filter(
+            pyme__propietario__username=f'{prefijo}_propietario_0_0',
+            activo=True).order_by('-inicio').first()
+        if turno is None:
+            raise CommandError(
+                f'No hay datos con el prefijo "{prefijo}"; ejecute seed_benchmark.')
+        vendedor = turno.empleados.order_by('id').first()
+        cesta = [{'producto': producto_id, 'cantidad': 1}
+                 for producto_id in Producto.objects.filter(
+                     tienda_id=turno.pyme_id).order_by('id').values_list(
+                         'id', flat=True)[:options['lineas']]]
+
+        resultado = comparar_sqlite(
+            vendedor, turno, cesta, options['workers'], options['peticiones'],
+            options['limite'], options['perfiles'])
+
+        texto = json.dumps(resultado, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                archivo.write(texto + '\n')
+        self.stdout.write(texto)
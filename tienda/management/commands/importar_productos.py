@@ -0,0 +1,37 @@
+# backend/tienda/management/commands/importar_productos.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tienda.importacion import FORMATOS, importar_productos, texto_utf8
+from tienda.models import PYME
+
+
+class Command(BaseCommand):
+    help = ('Importa productos a una PYME desde un archivo CSV o NDJSON, '
+            'actualizando los existentes por código.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('pyme', type=int, help='ID de la PYME destino.')
+        parser.add_argument('archivo', help='Ruta del archivo a importar.')
+        parser.add_argument(
+            '--formato', choices=FORMATOS,
+            help='Formato del archivo (por defecto, según la extensión).')
+
+    def handle(self, *args, **options):
+        if not PYME.objects.filter(id=options['pyme']).exists():
+            raise CommandError(f"La PYME {options['pyme']} no existe.")
+
+        formato = options['formato'] or (
+            'ndjson' if options['archivo'].endswith(('.ndjson', '.jsonl')) else 'csv')
+        with open(options['archivo'], 'rb') as binario:
+            try:
+                archivo = texto_utf8(binario)
+            except UnicodeDecodeError:
+                raise CommandError('El archivo debe estar en UTF-8.')
+        with archivo:
+            resumen = importar_productos(options['pyme'], archivo, formato)
+
+        self.stdout.write(json.dumps(resumen, ensure_ascii=False, indent=2))
+        if resumen['con_error']:
+            self.stderr.write(f"{resumen['con_error']} fila(s) con errores.")
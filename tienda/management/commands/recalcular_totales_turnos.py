@@ -0,0 +1,66 @@
+# backend/tienda/management/commands/recalcular_totales_turnos.py
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+
+from tienda.agregados import ganancia_bruta_turno, total_ventas_turno
+from tienda.models import Turno, VentaArchivada
+
+CENTAVO = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = ('Verifica y reconstruye Turno.total_ventas y Turno.ganancia_bruta '
+            'a partir de las ventas registradas.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--turno', type=int, action='append', dest='turnos',
+            help='Limitar a este turno (se puede repetir).')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Solo verificar; termina con error si hay diferencias.')
+
+    def handle(self, *args, **options):
+        # Los turnos archivados ya no tienen sus ventas en Venta; sus totales
+        # quedaron fijos al cerrarse
+        turnos = Turno.objects.exclude(
+            Exists(VentaArchivada.objects.filter(turno=OuterRef('pk'))))
+        if options['turnos']:
+            turnos = turnos.filter(id__in=options['turnos'])
+
+        filas = turnos.annotate(
+            total_real=total_ventas_turno(),
+            ganancia_real=ganancia_bruta_turno()
+        ).values_list(
+            'id', 'total_ventas', 'ganancia_bruta', 'total_real', 'ganancia_real'
+        ).order_by('id')
+
+        diferencias = []
+        for turno_id, total, ganancia, total_real, ganancia_real in filas.iterator():
+            total_real = total_real.quantize(CENTAVO)
+            ganancia_real = ganancia_real.quantize(CENTAVO)
+            if total != total_real or ganancia != ganancia_real:
+                diferencias.append(turno_id)
+                self.stdout.write(
+                    f'Turno {turno_id}: total {total} -> {total_real}, '
+                    f'ganancia {ganancia} -> {ganancia_real}')
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS(
+                'Los totales de los turnos están al día.'))
+            return
+
+        if options['check']:
+            raise CommandError(
+                f'{len(diferencias)} turno(s) con totales desactualizados.')
+
+        # Se recalcula dentro del propio UPDATE para no pisar ventas que
+        # entren mientras corre el comando
+        Turno.objects.filter(id__in=diferencias).update(
+            total_ventas=total_ventas_turno(),
+            ganancia_bruta=ganancia_bruta_turno()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(diferencias)} turno(s) actualizados.'))
@@ -0,0 +1,35 @@
+# backend/tienda/management/commands/resumir_turnos.py
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from tienda import resumenes
+from tienda.models import ResumenPagoTurno, Turno, Venta
+
+
+class Command(BaseCommand):
+    help = ('Guarda el resumen por producto y por método de pago de los '
+            'turnos cerrados que tienen ventas y todavía no lo tienen '
+            '(cerrados antes de existir el resumen).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--turno', type=int, action='append', dest='turnos',
+            help='Limitar a este turno (se puede repetir).')
+        parser.add_argument(
+            '--todos', action='store_true',
+            help='Recalcular también los turnos que ya tienen resumen.')
+
+    def handle(self, *args, **options):
+        turnos = Turno.objects.filter(activo=False).filter(
+            Exists(Venta.objects.filter(turno=OuterRef('pk'))))
+        if options['turnos']:
+            turnos = turnos.filter(id__in=options['turnos'])
+        if not options['todos']:
+            turnos = turnos.exclude(
+                Exists(ResumenPagoTurno.objects.filter(turno=OuterRef('pk'))))
+
+        cantidad = 0
+        for turno_id in turnos.order_by('id').values_list('id', flat=True).iterator():
+            resumenes.guardar(turno_id)
+            cantidad += 1
+        self.stdout.write(self.style.SUCCESS(f'{cantidad} turno(s) resumidos.'))
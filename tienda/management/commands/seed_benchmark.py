@@ -0,0 +1,49 @@
+# backend/tienda/management/commands/seed_benchmark.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Usuario
+from tienda.benchmark import CLAVE_BENCHMARK, sembrar
+
+
+class Command(BaseCommand):
+    help = ('Genera usuarios, PYMEs, productos, turnos y ventas sintéticos '
+            'con inserciones masivas para medir rendimiento.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default='bench',
+                            help='Prefijo de los nombres de usuario generados.')
+        parser.add_argument('--pymes', type=int, default=5)
+        parser.add_argument('--empleados', type=int, default=10,
+                            help='Empleados por PYME.')
+        parser.add_argument('--productos', type=int, default=1000,
+                            help='Productos por PYME.')
+        parser.add_argument('--turnos', type=int, default=30,
+                            help='Turnos por PYME (el último queda abierto).')
+        parser.add_argument('--ventas', type=int, default=40,
+                            help='Ventas por turno.')
+        parser.add_argument('--lineas', type=int, default=5,
+                            help='Productos por venta.')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        prefijo = options['prefijo']
+        if Usuario.objects.filter(username__startswith=f'{prefijo}_').exists():
+            raise CommandError(
+                f'Ya existen datos con el prefijo "{prefijo}"; use otro --prefijo.')
+
+        resumen = sembrar(
+            prefijo=prefijo,
+            pymes=options['pymes'],
+            empleados=options['empleados'],
+            productos=options['productos'],
+            turnos=options['turnos'],
+            ventas=options['ventas'],
+            lineas=options['lineas'],
+            semilla=options['semilla'],
+            salida=self.stdout.write,
+        )
+        self.stdout.write(json.dumps(resumen, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo. Contraseña de los usuarios generados: {CLAVE_BENCHMARK}'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0004_venta_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pyme',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0005_pyme_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['tienda', 'nombre', 'id'], name='producto_tienda_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='turno',
+            index=models.Index(fields=['pyme', 'activo', '-inicio'], name='turno_pyme_activo_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['pyme', 'fecha'], name='venta_pyme_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['turno', 'fecha'], name='venta_turno_fecha_idx'),
+        ),
+    ]
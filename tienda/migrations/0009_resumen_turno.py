@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0008_turno_pyme_inicio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenPagoTurno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metodo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia')], max_length=15)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('ganancia', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('turno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_pagos', to='tienda.turno')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('turno', 'metodo_pago'), name='resumen_pago_turno_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenProductoTurno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('ingresos', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('costo', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='tienda.producto')),
+                ('turno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_productos', to='tienda.turno')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('turno', 'producto'), name='resumen_producto_turno_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0009_resumen_turno'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaAgregados',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=30, unique=True)),
+                ('venta_id', models.BigIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AgregadoVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidad', models.CharField(choices=[('hora', 'Hora'), ('dia', 'Día')], max_length=4)),
+                ('inicio', models.DateTimeField()),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ganancia', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ventas', models.PositiveIntegerField(default=0)),
+                ('articulos', models.PositiveIntegerField(default=0)),
+                ('pyme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='agregados_ventas', to='tienda.pyme')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('pyme', 'granularidad', 'inicio'), name='agregado_ventas_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tienda', '0010_agregados_ventas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('ganancia', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('metodo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia')], max_length=15)),
+                ('codigo_transferencia', models.CharField(blank=True, max_length=100, null=True)),
+                ('telefono_cliente', models.CharField(blank=True, max_length=17, null=True)),
+                ('clave_idempotencia', models.CharField(blank=True, max_length=64, null=True)),
+                ('detalles', models.JSONField()),
+                ('archivada_en', models.DateTimeField(auto_now_add=True)),
+                ('pyme', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_archivadas', to='tienda.pyme')),
+                ('turno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_archivadas', to='tienda.turno')),
+                ('vendedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_archivadas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['pyme', 'fecha'], name='archivada_pyme_fecha_idx')],
+            },
+        ),
+    ]
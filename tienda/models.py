@@ -26,6 +26,18 @@ class PYME(models.Model):
     )
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
+    # Sube con cada cambio de la PYME o de sus productos (ver tienda.versiones)
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    def save(self, *args, **kwargs):
+        # La versión solo sube en la base (tienda.signals): la leída al
+        # cargar la instancia la haría retroceder
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'version'
+            ]
+        super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = 'PyME'
@@ -43,9 +55,28 @@ class Producto(models.Model):
         PYME, on_delete=models.CASCADE, related_name='productos')
     precio_compra = models.DecimalField(max_digits=10, decimal_places=2)
     precio_venta = models.DecimalField(max_digits=10, decimal_places=2)
+    # NULL: sin control de inventario. Solo cambia con tienda.inventario
+    stock = models.PositiveIntegerField(null=True, blank=True, editable=False)
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Para saber si un guardado mueve el producto a otra tienda
+        instancia._tienda_id_original = instancia.__dict__.get('tienda_id')
+        return instancia
+
+    def save(self, *args, **kwargs):
+        # Un guardado completo escribiría el stock leído al cargar la
+        # instancia y pisaría lo que vendieron otras cajas mientras tanto
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name != 'stock'
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.nombre
 
@@ -53,6 +84,11 @@ class Producto(models.Model):
         ordering = ['nombre']
         verbose_name = 'Producto'
         verbose_name_plural = 'Productos'
+        indexes = [
+            # Catálogo por tienda en el orden de listado/paginación
+            models.Index(fields=['tienda', 'nombre', 'id'],
+                         name='producto_tienda_nombre_idx'),
+        ]
 
 
 class Turno(models.Model):
@@ -89,6 +125,16 @@ class Turno(models.Model):
     gastos = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     notas_gastos = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # Turnos de una PYME, abiertos o no, del más reciente al más viejo
+            models.Index(fields=['pyme', 'activo', '-inicio'],
+                         name='turno_pyme_activo_inicio_idx'),
+            # Listado con rango de fechas: la rama de la PYME filtra el
+            # inicio en el índice
+            models.Index(fields=['pyme', '-inicio'], name='turno_pyme_inicio_idx'),
+        ]
+
     def __str__(self):
         return f"Turno {self.id} - {self.pyme.nombre}"
 
@@ -108,6 +154,23 @@ class Venta(models.Model):
     codigo_transferencia = models.CharField(
         max_length=100, blank=True, null=True)
     telefono_cliente = models.CharField(max_length=17, blank=True, null=True)
+    # Clave generada por el terminal para que los reintentos no dupliquen ventas
+    clave_idempotencia = models.CharField(
+        max_length=64, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['turno', 'clave_idempotencia'],
+                name='venta_clave_idempotencia_unica'
+            ),
+        ]
+        indexes = [
+            # Ventas de una PYME por rango de fechas (exportación, reportes)
+            models.Index(fields=['pyme', 'fecha'], name='venta_pyme_fecha_idx'),
+            # Ventas de un turno en orden cronológico
+            models.Index(fields=['turno', 'fecha'], name='venta_turno_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"Venta {self.id} - {self.total}"
@@ -129,3 +192,156 @@ class DetalleVenta(models.Model):
 
     def __str__(self):
         return f"{self.cantidad} x {self.producto.nombre}"
+
+
+class VentaArchivada(models.Model):
+    """
+    Venta de un turno viejo sacada de Venta/DetalleVenta (tienda.archivo).
+    Conserva el id original; los detalles van compactados en `detalles`
+    como [producto_id, cantidad, precio_unitario, costo_unitario].
+    """
+    id = models.BigIntegerField(primary_key=True)
+    turno = models.ForeignKey(
+        Turno, on_delete=models.CASCADE, related_name='ventas_archivadas')
+    vendedor = models.ForeignKey(
+        Usuario, on_delete=models.CASCADE, related_name='ventas_archivadas')
+    pyme = models.ForeignKey(
+        PYME, on_delete=models.CASCADE, related_name='ventas_archivadas')
+    fecha = models.DateTimeField()
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    ganancia = models.DecimalField(max_digits=12, decimal_places=2)
+    metodo_pago = models.CharField(max_length=15, choices=Venta.METODO_PAGO)
+    codigo_transferencia = models.CharField(
+        max_length=100, blank=True, null=True)
+    telefono_cliente = models.CharField(max_length=17, blank=True, null=True)
+    clave_idempotencia = models.CharField(
+        max_length=64, blank=True, null=True)
+    detalles = models.JSONField()
+    archivada_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['pyme', 'fecha'], name='archivada_pyme_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Venta archivada {self.id} - {self.total}"
+
+
+class ResumenProductoTurno(models.Model):
+    """Lo vendido de un producto en un turno cerrado (tienda.resumenes)."""
+    turno = models.ForeignKey(
+        Turno, on_delete=models.CASCADE, related_name='resumen_productos')
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT)
+    cantidad = models.PositiveIntegerField()
+    ingresos = models.DecimalField(max_digits=12, decimal_places=2)
+    costo = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['turno', 'producto'], name='resumen_producto_turno_unico'),
+        ]
+
+    def __str__(self):
+        return f"Turno {self.turno_id}: {self.cantidad} x producto {self.producto_id}"
+
+
+class ResumenPagoTurno(models.Model):
+    """Lo cobrado con un método de pago en un turno cerrado."""
+    turno = models.ForeignKey(
+        Turno, on_delete=models.CASCADE, related_name='resumen_pagos')
+    metodo_pago = models.CharField(max_length=15, choices=Venta.METODO_PAGO)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    ganancia = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['turno', 'metodo_pago'], name='resumen_pago_turno_unico'),
+        ]
+
+    def __str__(self):
+        return f"Turno {self.turno_id}: {self.metodo_pago} {self.total}"
+
+
+class AgregadoVentas(models.Model):
+    """
+    Ventas de una PYME en una hora o en un día (tienda.analitica). Lo
+    mantiene el comando agregar_ventas a partir de MarcaAgregados.
+    """
+    HORA = 'hora'
+    DIA = 'dia'
+    GRANULARIDADES = [
+        (HORA, 'Hora'),
+        (DIA, 'Día'),
+    ]
+
+    pyme = models.ForeignKey(
+        PYME, on_delete=models.CASCADE, related_name='agregados_ventas')
+    granularidad = models.CharField(max_length=4, choices=GRANULARIDADES)
+    inicio = models.DateTimeField()
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ganancia = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ventas = models.PositiveIntegerField(default=0)
+    articulos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # También es el índice de las consultas por rango de fechas
+            models.UniqueConstraint(
+                fields=['pyme', 'granularidad', 'inicio'], name='agregado_ventas_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.pyme_id} {self.granularidad} {self.inicio}: {self.ingresos}"
+
+
+class MarcaAgregados(models.Model):
+    """Última venta (por id) ya sumada en AgregadoVentas."""
+    clave = models.CharField(max_length=30, unique=True)
+    venta_id = models.BigIntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.clave}: {self.venta_id}"
+
+
+class MovimientoInventario(models.Model):
+    VENTA = 'venta'
+    ENTRADA = 'entrada'
+    AJUSTE = 'ajuste'
+    TIPOS = [
+        (VENTA, 'Venta'),
+        (ENTRADA, 'Entrada'),
+        (AJUSTE, 'Ajuste'),
+    ]
+
+    producto = models.ForeignKey(
+        Producto, on_delete=models.CASCADE, related_name='movimientos')
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    # Positiva si entra mercancía, negativa si sale
+    cantidad = models.IntegerField()
+    venta = models.ForeignKey(
+        Venta, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='movimientos_inventario')
+    # La misma venta una vez archivada (tienda.archivo): `venta` queda vacía
+    venta_archivada = models.ForeignKey(
+        VentaArchivada, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='movimientos_inventario')
+    usuario = models.ForeignKey(
+        Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    nota = models.CharField(max_length=250, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Movimiento de inventario'
+        verbose_name_plural = 'Movimientos de inventario'
+        indexes = [
+            # Historial de un producto, del más reciente al más viejo
+            models.Index(fields=['producto', '-fecha'],
+                         name='movimiento_producto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.cantidad:+d} - {self.producto_id}"
@@ -0,0 +1,105 @@
+# backend/tienda/resumenes.py
+"""
+Resumen de cada turno al cerrarse: una fila por producto vendido y una
+por método de pago, calculadas con una sola consulta agrupada sobre los
+detalles. Los reportes de turnos cerrados leen estas filas en vez de
+recorrer todas las líneas de venta.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F, Sum
+
+from .agregados import IMPORTE
+from .models import DetalleVenta, Producto, ResumenPagoTurno, ResumenProductoTurno
+
+CENTAVO = Decimal('0.01')
+
+
+def _importe(precio):
+    return ExpressionWrapper(F(precio) * F('cantidad'), output_field=IMPORTE)
+
+
+def calcular(turno_id):
+    """
+    (filas por producto, filas por método de pago) del turno, sin guardar.
+    Agrupa por producto y método a la vez: ambos resúmenes salen de la
+    misma consulta.
+    """
+    filas = (DetalleVenta.objects.filter(venta__turno_id=turno_id)
+             .order_by()
+             .values('producto_id', 'venta__metodo_pago')
+             .annotate(unidades=Sum('cantidad'),
+                       ingresos=Sum(_importe('precio_unitario')),
+                       costo=Sum(_importe('costo_unitario'))))
+
+    productos = defaultdict(lambda: [0, Decimal('0'), Decimal('0')])
+    pagos = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for fila in filas:
+        producto = productos[fila['producto_id']]
+        producto[0] += fila['unidades']
+        producto[1] += fila['ingresos']
+        producto[2] += fila['costo']
+        pago = pagos[fila['venta__metodo_pago']]
+        pago[0] += fila['ingresos']
+        pago[1] += fila['ingresos'] - fila['costo']
+
+    return (
+        [ResumenProductoTurno(
+            turno_id=turno_id, producto_id=producto_id, cantidad=cantidad,
+            ingresos=ingresos.quantize(CENTAVO), costo=costo.quantize(CENTAVO))
+         for producto_id, (cantidad, ingresos, costo) in sorted(productos.items())],
+        [ResumenPagoTurno(
+            turno_id=turno_id, metodo_pago=metodo, total=total.quantize(CENTAVO),
+            ganancia=ganancia.quantize(CENTAVO))
+         for metodo, (total, ganancia) in sorted(pagos.items())],
+    )
+
+
+def guardar(turno_id):
+    """Calcula y reemplaza el resumen guardado del turno."""
+    productos, pagos = calcular(turno_id)
+    with transaction.atomic():
+        ResumenProductoTurno.objects.filter(turno_id=turno_id).delete()
+        ResumenPagoTurno.objects.filter(turno_id=turno_id).delete()
+        ResumenProductoTurno.objects.bulk_create(productos)
+        ResumenPagoTurno.objects.bulk_create(pagos)
+
+
+def resumen(turno):
+    """
+    Resumen para la API: el guardado si el turno está cerrado o, mientras
+    sigue abierto, calculado en el momento.
+    """
+    if turno.activo:
+        productos, pagos = calcular(turno.id)
+    else:
+        productos = list(ResumenProductoTurno.objects.filter(turno_id=turno.id))
+        pagos = list(ResumenPagoTurno.objects.filter(turno_id=turno.id))
+
+    nombres = dict(Producto.objects.filter(
+        id__in=[p.producto_id for p in productos]).values_list('id', 'nombre'))
+    return {
+        'turno': turno.id,
+        'activo': turno.activo,
+        'productos': [
+            {
+                'producto': p.producto_id,
+                'nombre': nombres.get(p.producto_id),
+                'cantidad': p.cantidad,
+                'ingresos': f'{p.ingresos:.2f}',
+                'costo': f'{p.costo:.2f}',
+                'ganancia': f'{p.ingresos - p.costo:.2f}',
+            }
+            for p in sorted(productos, key=lambda p: (-p.ingresos, p.producto_id))
+        ],
+        'pagos': [
+            {
+                'metodo_pago': p.metodo_pago,
+                'total': f'{p.total:.2f}',
+                'ganancia': f'{p.ganancia:.2f}',
+            }
+            for p in sorted(pagos, key=lambda p: p.metodo_pago)
+        ],
+    }
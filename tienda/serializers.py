@@ -1,6 +1,8 @@
 # backend/tienda/serializers.py
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from accounts.authentication import obtener_usuario
+from . import acceso
 from .models import PYME, DetalleVenta, Producto, Turno, Venta
 
 Usuario = get_user_model()
@@ -30,7 +32,7 @@ class PYMECreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         empleados = validated_data.pop('empleados', [])
         pyme = PYME.objects.create(
-            propietario=self.context['request'].user,
+            propietario=obtener_usuario(self.context['request']),
             **validated_data
         )
         pyme.empleados.set(empleados)
@@ -47,7 +49,7 @@ class PYMESerializer(serializers.ModelSerializer):
         many=True, read_only=True, source='empleados')
     class Meta:
         model = PYME
-        fields = '__all__'
+        exclude = ['version']
 
 
 class ProductoSerializer(serializers.ModelSerializer):
@@ -58,15 +60,32 @@ class ProductoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Producto
-        fields = '__all__'
+        # El stock va aparte (productos/stock/): cambia con cada venta y el
+        # catálogo se cachea por la versión de la PYME
+        exclude = ['stock']
 
     def get_puede_editar(self, obj):
+        # Las vistas de listado pasan 'roles' ({pyme_id: rol}) ya calculado
+        roles = self.context.get('roles')
+        if roles is not None:
+            return roles.get(obj.tienda_id) in acceso.ROLES_GESTION
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            pyme = obj.tienda
-            return pyme.propietario == request.user or pyme.administrador == request.user
+            return acceso.puede_gestionar(request.user, obj.tienda_id)
         return False
 
+class ProductoImportacionSerializer(serializers.Serializer):
+    # Valida una fila de importación sin consultar la base de datos
+    codigo = serializers.CharField(
+        max_length=100, required=False, allow_blank=True, allow_null=True)
+    nombre = serializers.CharField(max_length=50)
+    precio_compra = serializers.DecimalField(max_digits=10, decimal_places=2)
+    precio_venta = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def validate_codigo(self, value):
+        return (value or "").strip() or None
+
+
 class DetalleVentaSerializer(serializers.ModelSerializer):
     producto_nombre = serializers.CharField(
         source='producto.nombre', read_only=True)
@@ -0,0 +1,119 @@
+# backend/tienda/signals.py
+from django.db.models import F, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import Usuario
+from . import acceso, busqueda, versiones
+from .models import PYME, Producto
+
+
+@receiver(pre_save, sender=PYME)
+def recordar_responsables_pyme(sender, instance, **kwargs):
+    # Si cambia el propietario o el administrador, el anterior también
+    # pierde acceso
+    instance._responsables_anteriores = ()
+    if instance.pk:
+        anteriores = PYME.objects.filter(pk=instance.pk).values_list(
+            'propietario_id', 'administrador_id').first()
+        instance._responsables_anteriores = anteriores or ()
+
+
+@receiver(post_save, sender=PYME)
+def incrementar_version_pyme(sender, instance, created, **kwargs):
+    # En la base, también con update_fields; la instancia conserva su valor,
+    # que PYME.save() no vuelve a escribir
+    if not created:
+        versiones.incrementar(instance.pk)
+
+
+@receiver(post_save, sender=PYME)
+def invalidar_acceso_pyme(sender, instance, **kwargs):
+    acceso.invalidar(
+        instance.propietario_id,
+        instance.administrador_id,
+        *getattr(instance, '_responsables_anteriores', ())
+    )
+
+
+@receiver(pre_delete, sender=PYME)
+def recordar_empleados_pyme(sender, instance, **kwargs):
+    instance._empleados_anteriores = list(
+        instance.empleados.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=PYME)
+def invalidar_acceso_pyme_eliminada(sender, instance, **kwargs):
+    acceso.invalidar(
+        instance.propietario_id,
+        instance.administrador_id,
+        *getattr(instance, '_empleados_anteriores', ())
+    )
+
+
+@receiver(m2m_changed, sender=PYME.empleados.through)
+def invalidar_acceso_empleados(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # usuario.pymes_empleado.add(...): cambia el acceso de ese usuario
+        if action.startswith('post_'):
+            acceso.invalidar(instance.pk)
+        return
+
+    if action == 'pre_clear':
+        instance._empleados_anteriores = list(
+            instance.empleados.values_list('id', flat=True))
+    elif action == 'post_clear':
+        acceso.invalidar(*getattr(instance, '_empleados_anteriores', ()))
+    elif action in ('post_add', 'post_remove'):
+        acceso.invalidar(*pk_set)
+
+
+@receiver(m2m_changed, sender=PYME.empleados.through)
+def incrementar_version_empleados(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            versiones.incrementar(instance.pk)
+        return
+
+    if action == 'pre_clear':
+        instance._pymes_empleado_anteriores = list(
+            instance.pymes_empleado.values_list('id', flat=True))
+    elif action == 'post_clear':
+        versiones.incrementar(
+            *getattr(instance, '_pymes_empleado_anteriores', ()))
+    elif action in ('post_add', 'post_remove'):
+        versiones.incrementar(*pk_set)
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def producto_modificado(sender, instance, signal, **kwargs):
+    pymes_ids = {instance.tienda_id, getattr(
+        instance, '_tienda_id_original', None)} - {None}
+    versiones.incrementar(*pymes_ids)
+    busqueda.registrar_cambio(
+        instance, pymes_ids, eliminado=signal is post_delete)
+    instance._tienda_id_original = instance.tienda_id
+
+
+def _pymes_del_usuario(usuario_id):
+    return PYME.objects.filter(
+        Q(propietario_id=usuario_id) |
+        Q(administrador_id=usuario_id) |
+        Q(id__in=PYME.empleados.through.objects.filter(
+            usuario_id=usuario_id).values('pyme_id'))
+    )
+
+
+@receiver(post_save, sender=Usuario)
+def incrementar_version_por_usuario(sender, instance, created, update_fields, **kwargs):
+    # Las PYMEs muestran el nombre de su propietario, administrador y empleados
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    _pymes_del_usuario(instance.pk).update(version=F('version') + 1)
+
+
+@receiver(pre_delete, sender=Usuario)
+def incrementar_version_por_usuario_eliminado(sender, instance, **kwargs):
+    # El borrado en cascada de sus asignaciones no envía m2m_changed
+    _pymes_del_usuario(instance.pk).update(version=F('version') + 1)
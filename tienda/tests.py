@@ -1,3 +1,1425 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from accounts.authentication import tokens_para
+from accounts.models import Usuario
+from core import metricas, routers
+from core.asincrono import liberar_hilo
+from core.checks import cache_para_replicas
+from core.renderers import JSONRapidoRenderer, orjson
+from . import acceso, archivo, benchmark, busqueda, eventos, lectura, resumenes
+from .models import (PYME, AgregadoVentas, DetalleVenta, MovimientoInventario,
+                     Producto, ResumenPagoTurno, ResumenProductoTurno, Turno,
+                     Venta, VentaArchivada)
+from .serializers import PYMESerializer, ProductoSerializer, TurnoSerializer
+from .ventas import registrar_venta
+
+
+class TiendaTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        acceso.limpiar_cache_local()
+        self.propietario = Usuario.objects.create_user(username='propietario')
+        self.empleado = Usuario.objects.create_user(username='empleado')
+        self.pyme = PYME.objects.create(
+            nombre='Bodega', propietario=self.propietario, direccion='Calle 1')
+        self.pyme.empleados.add(self.empleado)
+        self.productos = [
+            Producto.objects.create(
+                nombre=f'Producto {i:02d}',
+                codigo=f'P{i:04d}',
+                tienda=self.pyme,
+                precio_compra=Decimal('1.50'),
+                precio_venta=Decimal('2.25')
+            )
+            for i in range(30)
+        ]
+        self.turno = Turno.objects.create(
+            pyme=self.pyme, abierto_por=self.propietario)
+        self.turno.empleados.add(self.empleado)
+
+    def cesta(self, lineas):
+        return [{'producto': p.id, 'cantidad': 2} for p in self.productos[:lineas]]
+
+
+class RegistrarVentaTests(TiendaTestCase):
+    url = reverse('registrar_venta')
+
+    def vender(self, productos, **extra):
+        datos = {'turno': self.turno.id, 'productos': productos,
+                 'metodo_pago': 'efectivo', **extra}
+        return self.client.post(self.url, datos, format='json')
+
+    def test_registra_venta_con_total_y_detalles(self):
+        self.client.force_authenticate(self.empleado)
+        respuesta = self.vender(self.cesta(3))
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data['total'], '13.50')
+        self.assertEqual(len(respuesta.data['detalles']), 3)
+        self.assertEqual(DetalleVenta.objects.count(), 3)
+
+    def test_consultas_constantes_por_tamano_de_cesta(self):
+        self.client.force_authenticate(self.empleado)
+        with CaptureQueriesContext(connection) as una_linea:
+            self.assertEqual(self.vender(self.cesta(1)).status_code, 201)
+        with CaptureQueriesContext(connection) as treinta_lineas:
+            self.assertEqual(self.vender(self.cesta(30)).status_code, 201)
+
+        self.assertEqual(len(una_linea), len(treinta_lineas))
+
+    def test_producto_ajeno_no_deja_venta_a_medias(self):
+        otra = PYME.objects.create(
+            nombre='Otra', propietario=self.propietario, direccion='Calle 2')
+        ajeno = Producto.objects.create(
+            nombre='Ajeno', tienda=otra,
+            precio_compra=Decimal('1'), precio_venta=Decimal('2'))
+        self.client.force_authenticate(self.empleado)
+
+        respuesta = self.vender(
+            self.cesta(2) + [{'producto': ajeno.id, 'cantidad': 1}])
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(DetalleVenta.objects.exists())
+
+    def test_cantidades_que_no_son_enteras(self):
+        self.client.force_authenticate(self.empleado)
+        producto = self.productos[0].id
+        for linea in ({'producto': producto, 'cantidad': 1.9},
+                      {'producto': producto, 'cantidad': True},
+                      {'producto': producto, 'cantidad': '1.5'},
+                      {'producto': producto, 'cantidad': [1]},
+                      {'producto': producto + 0.5, 'cantidad': 1},
+                      {'producto': str(producto), 'cantidad': 'dos'}):
+            self.assertEqual(self.vender([linea]).status_code, 400, linea)
+        self.assertFalse(Venta.objects.exists())
+
+        self.assertEqual(self.vender([{'producto': str(producto), 'cantidad': 2.0}]).status_code, 201)
+
+    def test_transferencia_requiere_codigo_y_telefono(self):
+        self.client.force_authenticate(self.empleado)
+        respuesta = self.vender(self.cesta(1), metodo_pago='transferencia')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_vendedor_no_asignado(self):
+        self.client.force_authenticate(self.propietario)
+        self.assertEqual(self.vender(self.cesta(1)).status_code, 403)
+
+
+class SincronizarVentasTests(TiendaTestCase):
+    url = reverse('sincronizar_ventas')
+
+    def sincronizar(self, ventas):
+        return self.client.post(
+            self.url, {'turno': self.turno.id, 'ventas': ventas}, format='json')
+
+    def venta(self, clave, lineas=2):
+        return {'clave': clave, 'metodo_pago': 'efectivo',
+                'productos': self.cesta(lineas)}
+
+    def test_lote_con_resultado_por_venta(self):
+        self.client.force_authenticate(self.empleado)
+        respuesta = self.sincronizar([
+            self.venta('a'),
+            {'clave': 'b', 'metodo_pago': 'efectivo',
+             'productos': [{'producto': 0, 'cantidad': 1}]},
+            self.venta('c', lineas=5),
+        ])
+
+        self.assertEqual(respuesta.status_code, 200)
+        estados = [r['estado'] for r in respuesta.data['resultados']]
+        self.assertEqual(estados, ['creada', 'error', 'creada'])
+        self.assertEqual(Venta.objects.count(), 2)
+        self.assertEqual(DetalleVenta.objects.count(), 7)
+
+    def test_reintento_no_duplica(self):
+        self.client.force_authenticate(self.empleado)
+        primera = self.sincronizar([self.venta('a'), self.venta('b')])
+        reintento = self.sincronizar([self.venta('a'), self.venta('b')])
+
+        self.assertEqual(
+            [r['estado'] for r in reintento.data['resultados']],
+            ['duplicada', 'duplicada'])
+        self.assertEqual(
+            [r['venta'] for r in primera.data['resultados']],
+            [r['venta'] for r in reintento.data['resultados']])
+        self.assertEqual(Venta.objects.count(), 2)
+
+    def test_consultas_constantes_por_tamano_de_lote(self):
+        self.client.force_authenticate(self.empleado)
+        with CaptureQueriesContext(connection) as una_venta:
+            self.sincronizar([self.venta('a')])
+        with CaptureQueriesContext(connection) as veinte_ventas:
+            self.sincronizar([self.venta(f'b{i}') for i in range(20)])
+
+        self.assertEqual(len(una_venta), len(veinte_ventas))
+
+
+class InventarioTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        # Los dos primeros llevan inventario, el resto no
+        Producto.objects.filter(pk__in=[p.id for p in self.productos[:2]]).update(stock=5)
+
+    def vender(self, lineas, cantidad=2):
+        self.client.force_authenticate(self.empleado)
+        productos = [{'producto': p.id, 'cantidad': cantidad}
+                     for p in self.productos[:lineas]]
+        return self.client.post(reverse('registrar_venta'), {
+            'turno': self.turno.id, 'productos': productos,
+            'metodo_pago': 'efectivo'}, format='json')
+
+    def stock(self, indice):
+        return Producto.objects.values_list('stock', flat=True).get(
+            pk=self.productos[indice].id)
+
+    def test_venta_descuenta_y_registra_movimientos(self):
+        self.assertEqual(self.vender(3).status_code, 201)
+
+        self.assertEqual([self.stock(0), self.stock(1), self.stock(2)], [3, 3, None])
+        self.assertEqual(sorted(MovimientoInventario.objects.values_list(
+            'producto_id', 'cantidad', 'tipo')), [
+            (self.productos[0].id, -2, MovimientoInventario.VENTA),
+            (self.productos[1].id, -2, MovimientoInventario.VENTA)])
+
+    def test_sin_stock_no_registra_nada(self):
+        respuesta = self.vender(2, cantidad=6)
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('Stock insuficiente', respuesta.data['error'])
+        self.assertEqual([self.stock(0), self.stock(1)], [5, 5])
+        self.assertFalse(Venta.objects.exists())
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.total_ventas, 0)
+
+    def test_lote_reparte_el_stock_entre_sus_ventas(self):
+        self.client.force_authenticate(self.empleado)
+        respuesta = self.client.post(reverse('sincronizar_ventas'), {
+            'turno': self.turno.id, 'ventas': [
+                {'clave': clave, 'metodo_pago': 'efectivo',
+                 'productos': [{'producto': self.productos[0].id, 'cantidad': 2}]}
+                for clave in 'abc']}, format='json')
+
+        self.assertEqual(
+            [r['estado'] for r in respuesta.data['resultados']],
+            ['creada', 'creada', 'error'])
+        self.assertEqual(self.stock(0), 1)
+        self.assertEqual(MovimientoInventario.objects.count(), 2)
+
+    def test_guardar_producto_no_pisa_el_stock(self):
+        producto = Producto.objects.get(pk=self.productos[0].id)
+        self.vender(1)
+        producto.nombre = 'Renombrado'
+        producto.save()
+        self.assertEqual(self.stock(0), 3)
+
+    def test_ajustar_stock(self):
+        url = reverse('ajustar_stock', args=[self.productos[2].id])
+        self.client.force_authenticate(self.empleado)
+        self.assertEqual(self.client.post(url, {'stock': 10}, format='json').status_code, 403)
+
+        self.client.force_authenticate(self.propietario)
+        self.assertEqual(self.client.post(url, {'cantidad': 3}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'stock': 10}, format='json').data['stock'], 10)
+        self.assertEqual(self.client.post(url, {'cantidad': -4}, format='json').data['stock'], 6)
+        self.assertEqual(self.client.post(url, {'cantidad': -7}, format='json').status_code, 400)
+        for datos in ({'cantidad': 1.7}, {'stock': 2.5}, {'cantidad': True}, {'stock': '3.0'}):
+            self.assertEqual(self.client.post(url, datos, format='json').status_code, 400, datos)
+        self.assertEqual(
+            list(MovimientoInventario.objects.order_by('id').values_list('tipo', 'cantidad')),
+            [(MovimientoInventario.AJUSTE, 10), (MovimientoInventario.AJUSTE, -4)])
+
+        respuesta = self.client.get(reverse('stock_productos'), {'pyme': self.pyme.id})
+        self.assertEqual([p['stock'] for p in respuesta.data], [5, 5, 6])
+
+    def test_consultas_constantes_con_inventario(self):
+        with CaptureQueriesContext(connection) as una_linea:
+            self.assertEqual(self.vender(1, cantidad=1).status_code, 201)
+        Producto.objects.filter(pk__in=[p.id for p in self.productos]).update(stock=5)
+        with CaptureQueriesContext(connection) as veinte_lineas:
+            self.assertEqual(self.vender(20, cantidad=1).status_code, 201)
+        self.assertEqual(len(una_linea), len(veinte_lineas))
+
+
+class EstresInventarioTests(TransactionTestCase):
+    def setUp(self):
+        # La base de prueba existe recién aquí, no al importar el módulo
+        if connection.is_in_memory_db():
+            self.skipTest('Requiere una base en archivo (DATABASE_TEST_NAME en settings)')
+        if connection.vendor == 'sqlite' and not settings.SQLITE_OPTIMIZADO:
+            self.skipTest('Con SQLite requiere el perfil de producción (BEGIN IMMEDIATE)')
+
+    def test_cajas_concurrentes_sin_perdidas_ni_bloqueos(self):
+        propietario = Usuario.objects.create_user(username='propietario')
+        pyme = PYME.objects.create(nombre='Bodega', propietario=propietario, direccion='x')
+        productos = [
+            Producto.objects.create(
+                nombre=f'Producto {i}', tienda=pyme, stock=150,
+                precio_compra=Decimal('1.00'), precio_venta=Decimal('2.00'))
+            for i in range(3)
+        ]
+        turno = Turno.objects.create(pyme=pyme, abierto_por=propietario)
+
+        # 8 cajas x 25 ventas piden 200 unidades de cada uno: 50 se rechazan
+        resultado = benchmark.estres_inventario(
+            turno, propietario, productos, cajas=8, ventas=25)
+
+        self.assertEqual(resultado['errores'], [])
+        self.assertEqual(resultado['colgadas'], 0)
+        self.assertEqual(resultado['registradas'], 150)
+        self.assertEqual(resultado['sin_stock'], 50)
+        self.assertTrue(resultado['sin_actualizaciones_perdidas'])
+        self.assertTrue(resultado['libro_cuadra'])
+        turno.refresh_from_db()
+        self.assertEqual(turno.total_ventas, Decimal('900.00'))
+
+
+class TotalesTurnoTests(TiendaTestCase):
+    def vender(self, lineas):
+        self.client.force_authenticate(self.empleado)
+        return self.client.post(reverse('registrar_venta'), {
+            'turno': self.turno.id, 'productos': self.cesta(lineas),
+            'metodo_pago': 'efectivo'}, format='json')
+
+    def test_venta_acumula_totales_y_cierre_los_lee(self):
+        self.vender(2)
+        self.vender(3)
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.total_ventas, Decimal('22.50'))
+        self.assertEqual(self.turno.ganancia_bruta, Decimal('7.50'))
+
+        self.client.force_authenticate(self.propietario)
+        respuesta = self.client.post(
+            reverse('cerrar_turno', args=[self.turno.id]), format='json')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['total_ventas'], '22.50')
+        self.assertEqual(respuesta.data['ganancia_bruta'], '7.50')
+        self.assertFalse(respuesta.data['activo'])
+
+    def test_no_se_vende_en_turno_cerrado(self):
+        Turno.objects.filter(pk=self.turno.pk).update(activo=False)
+        self.assertEqual(self.vender(1).status_code, 404)
+
+    def test_comando_reconstruye_totales(self):
+        self.vender(2)
+        Turno.objects.filter(pk=self.turno.pk).update(
+            total_ventas=0, ganancia_bruta=0)
+
+        with self.assertRaises(CommandError):
+            call_command('recalcular_totales_turnos', '--check', stdout=StringIO())
+        call_command('recalcular_totales_turnos', stdout=StringIO())
+
+        self.turno.refresh_from_db()
+        self.assertEqual(self.turno.total_ventas, Decimal('9.00'))
+        self.assertEqual(self.turno.ganancia_bruta, Decimal('3.00'))
+        call_command('recalcular_totales_turnos', '--check', stdout=StringIO())
+
+
+class ResumenTurnoTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        # Precio 2.25 y costo 1.50 por unidad
+        registrar_venta(self.turno, self.empleado, self.cesta(2), 'efectivo')
+        registrar_venta(self.turno, self.empleado, self.cesta(1), 'transferencia',
+                        codigo_transferencia='T1', telefono_cliente='5550000')
+        self.url = reverse('resumen_turno', args=[self.turno.id])
+
+    def cerrar(self):
+        self.client.force_authenticate(self.propietario)
+        self.client.post(reverse('cerrar_turno', args=[self.turno.id]))
+
+    def test_cierre_guarda_resumen_con_una_consulta(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resumenes.calcular(self.turno.id)
+        self.assertEqual(len(consultas), 1)
+
+        self.cerrar()
+        self.assertEqual(
+            list(ResumenProductoTurno.objects.order_by('producto_id').values_list(
+                'producto_id', 'cantidad', 'ingresos', 'costo')),
+            [(self.productos[0].id, 4, Decimal('9.00'), Decimal('6.00')),
+             (self.productos[1].id, 2, Decimal('4.50'), Decimal('3.00'))])
+        self.assertEqual(
+            list(ResumenPagoTurno.objects.order_by('metodo_pago').values_list(
+                'metodo_pago', 'total', 'ganancia')),
+            [('efectivo', Decimal('9.00'), Decimal('3.00')),
+             ('transferencia', Decimal('4.50'), Decimal('1.50'))])
+
+    def test_endpoint_lee_el_resumen_guardado(self):
+        self.client.force_authenticate(self.empleado)
+        abierto = self.client.get(self.url).data
+        self.assertTrue(abierto['activo'])
+
+        self.cerrar()
+        # Ya no se recorren los detalles
+        DetalleVenta.objects.all().delete()
+        self.client.force_authenticate(self.empleado)
+        # Turno, asignación, las dos tablas del resumen y los nombres
+        with self.assertNumQueries(5):
+            cerrado = self.client.get(self.url).data
+
+        self.assertFalse(cerrado['activo'])
+        self.assertEqual(cerrado['productos'], abierto['productos'])
+        self.assertEqual(cerrado['pagos'], abierto['pagos'])
+        self.assertEqual(cerrado['productos'][0], {
+            'producto': self.productos[0].id, 'nombre': 'Producto 00', 'cantidad': 4,
+            'ingresos': '9.00', 'costo': '6.00', 'ganancia': '3.00'})
+
+    def test_acceso(self):
+        extrano = Usuario.objects.create_user(username='extrano')
+        self.client.force_authenticate(extrano)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        respuesta = self.client.get(reverse('resumen_turno', args=[0]))
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_comando_resume_turnos_cerrados_sin_resumen(self):
+        self.cerrar()
+        ResumenProductoTurno.objects.all().delete()
+        ResumenPagoTurno.objects.all().delete()
+
+        salida = StringIO()
+        call_command('resumir_turnos', stdout=salida)
+        self.assertIn('1 turno(s)', salida.getvalue())
+        self.assertEqual(ResumenProductoTurno.objects.count(), 2)
+        self.assertEqual(ResumenPagoTurno.objects.count(), 2)
+
+        salida = StringIO()
+        call_command('resumir_turnos', stdout=salida)
+        self.assertIn('0 turno(s)', salida.getvalue())
+        call_command('resumir_turnos', '--todos', stdout=salida)
+        self.assertEqual(ResumenProductoTurno.objects.count(), 2)
+
+
+class AnaliticaVentasTests(TiendaTestCase):
+    url = reverse('analitica_ventas')
+
+    def vender(self, lineas, hace):
+        venta = registrar_venta(self.turno, self.empleado, self.cesta(lineas), 'efectivo')
+        Venta.objects.filter(pk=venta.pk).update(fecha=self.ahora - hace)
+
+    def setUp(self):
+        super().setUp()
+        self.ahora = timezone.now().replace(minute=30, second=0, microsecond=0)
+        # Dos ventas hace tres horas y una hace una hora (2.25 x 2 por línea)
+        self.vender(1, timedelta(hours=3))
+        self.vender(2, timedelta(hours=3))
+        self.vender(1, timedelta(hours=1))
+        self.client.force_authenticate(self.propietario)
+
+    def pedir(self, **parametros):
+        respuesta = self.client.get(self.url, {'pyme': self.pyme.id, **parametros})
+        self.assertEqual(respuesta.status_code, 200)
+        return [(r['inicio'], r['ingresos'], r['ventas'], r['articulos'])
+                for r in respuesta.data['resultados']]
+
+    def hora(self, hace):
+        return (self.ahora - hace).replace(minute=0).isoformat().replace('+00:00', 'Z')
+
+    def test_comando_agrega_sin_duplicar(self):
+        call_command('agregar_ventas', '--margen', '0', stdout=StringIO())
+        por_hora = AgregadoVentas.objects.filter(granularidad=AgregadoVentas.HORA)
+        self.assertEqual(
+            sorted(por_hora.values_list('ventas', 'articulos', 'ingresos')),
+            [(1, 2, Decimal('4.50')), (2, 6, Decimal('13.50'))])
+
+        self.vender(1, timedelta(hours=1))
+        salida = StringIO()
+        call_command('agregar_ventas', '--margen', '0', stdout=salida)
+        self.assertIn('1 venta(s)', salida.getvalue())
+        self.assertEqual(
+            sorted(por_hora.values_list('ventas', 'articulos', 'ingresos')),
+            [(2, 4, Decimal('9.00')), (2, 6, Decimal('13.50'))])
+
+        call_command('agregar_ventas', '--reconstruir', '--margen', '0', stdout=StringIO())
+        self.assertEqual(sum(por_hora.values_list('ventas', flat=True)), 4)
+
+    def test_serie_incluye_ventas_aun_no_agregadas(self):
+        esperado = [
+            (self.hora(timedelta(hours=3)), '13.50', 2, 6),
+            (self.hora(timedelta(hours=1)), '4.50', 1, 2),
+        ]
+        self.assertEqual(self.pedir(granularidad='hora'), esperado)
+
+        # Con margen, la venta más reciente queda para después
+        call_command('agregar_ventas', '--margen', '7200', stdout=StringIO())
+        self.assertEqual(AgregadoVentas.objects.filter(
+            granularidad=AgregadoVentas.HORA).count(), 1)
+        self.assertEqual(self.pedir(granularidad='hora'), esperado)
+
+        desde = (self.ahora - timedelta(hours=2)).isoformat()
+        self.assertEqual(self.pedir(granularidad='hora', desde=desde), esperado[1:])
+
+    def test_por_dia_con_consultas_constantes(self):
+        call_command('agregar_ventas', '--margen', '0', stdout=StringIO())
+        acceso.roles_usuario(self.propietario)
+        # Marca, agregados y ventas pendientes
+        with self.assertNumQueries(3):
+            dias = self.pedir()
+        self.assertEqual(sum(ventas for _, _, ventas, _ in dias), 3)
+
+    def test_validacion_y_acceso(self):
+        respuesta = self.client.get(self.url, {'pyme': self.pyme.id, 'granularidad': 'mes'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.client.force_authenticate(self.empleado)
+        respuesta = self.client.get(self.url, {'pyme': self.pyme.id})
+        self.assertEqual(respuesta.status_code, 403)
+
+
+class ArchivoVentasTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        Producto.objects.filter(pk=self.productos[0].pk).update(stock=100)
+        for lineas in (1, 3):
+            registrar_venta(self.turno, self.empleado, self.cesta(lineas), 'efectivo')
+        self.client.force_authenticate(self.propietario)
+        self.client.post(reverse('cerrar_turno', args=[self.turno.id]))
+        Turno.objects.filter(pk=self.turno.pk).update(
+            fin=timezone.now() - timedelta(days=400))
+
+    def archivar(self, *argumentos):
+        salida = StringIO()
+        call_command('archivar_ventas', *argumentos, stdout=salida)
+        return salida.getvalue()
+
+    def exportar(self, **params):
+        respuesta = self.client.get(reverse('exportar_ventas'), {
+            'pyme': self.pyme.id, 'formato': 'ndjson', **params})
+        return [json.loads(l) for l in b''.join(respuesta.streaming_content).splitlines()]
+
+    def leer(self):
+        resumen = self.client.get(reverse('resumen_turno', args=[self.turno.id])).data
+        serie = self.client.get(reverse('analitica_ventas'), {'pyme': self.pyme.id}).data
+        return resumen, serie, self.exportar()
+
+    def test_requiere_resumen_y_agregados(self):
+        with self.assertRaises(CommandError):
+            self.archivar('--check')
+        self.assertIn(archivo.SIN_AGREGAR, self.archivar())
+        self.assertEqual(Venta.objects.count(), 2)
+
+        call_command('agregar_ventas', '--margen', '0', stdout=StringIO())
+        ResumenPagoTurno.objects.all().delete()
+        self.assertIn(archivo.SIN_RESUMEN, self.archivar())
+        self.assertEqual(Venta.objects.count(), 2)
+
+    def test_archiva_sin_cambiar_lo_que_se_lee(self):
+        call_command('agregar_ventas', '--margen', '0', stdout=StringIO())
+        antes = self.leer()
+        self.assertIn('2 venta(s) de 1 turno(s)', self.archivar())
+
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(DetalleVenta.objects.exists())
+        self.assertEqual(VentaArchivada.objects.get(
+            pk=antes[2][1]['venta']).detalles[0],
+            [self.productos[0].id, 2, '2.25', '1.50'])
+        self.assertEqual(
+            sorted(MovimientoInventario.objects.values_list('venta', 'venta_archivada')),
+            [(None, venta_id) for venta_id in
+             VentaArchivada.objects.order_by('id').values_list('id', flat=True)])
+
+        resumen, serie, exportadas = self.leer()
+        self.assertEqual((resumen, serie), antes[:2])
+        self.assertEqual(exportadas, [])
+        self.assertEqual(self.exportar(archivadas='true'), antes[2])
+        call_command('recalcular_totales_turnos', '--check', stdout=StringIO())
+
+    def test_reconstruir_conserva_las_archivadas(self):
+        call_command('agregar_ventas', '--margen', '0', stdout=StringIO())
+        self.archivar()
+        serie = self.leer()[1]
+
+        call_command('agregar_ventas', '--reconstruir', stdout=StringIO())
+        self.assertEqual(self.leer()[1], serie)
+        self.assertTrue(serie)
+
+    def test_respeta_el_horizonte(self):
+        call_command('agregar_ventas', '--margen', '0', stdout=StringIO())
+        self.assertIn('0 venta(s)', self.archivar('--dias', '500'))
+        self.assertEqual(Venta.objects.count(), 2)
+
+
+class AccesoTests(TiendaTestCase):
+    def test_roles_por_pyme(self):
+        admin = Usuario.objects.create_user(username='admin')
+        self.pyme.administrador = admin
+        self.pyme.save()
+
+        self.assertEqual(acceso.roles_usuario(self.propietario),
+                         {self.pyme.id: acceso.PROPIETARIO})
+        self.assertEqual(acceso.roles_usuario(admin),
+                         {self.pyme.id: acceso.ADMINISTRADOR})
+        self.assertEqual(acceso.roles_usuario(self.empleado),
+                         {self.pyme.id: acceso.EMPLEADO})
+
+    def test_cache_caliente_sin_consultas(self):
+        acceso.roles_usuario(self.empleado)
+        acceso.limpiar_cache_local()
+        with self.assertNumQueries(0):
+            self.assertTrue(acceso.rol_en(self.empleado, self.pyme.id))
+            self.assertFalse(acceso.puede_gestionar(self.empleado, self.pyme.id))
+
+    def test_senales_invalidan_el_cache(self):
+        otro = Usuario.objects.create_user(username='otro')
+        self.assertEqual(acceso.roles_usuario(otro), {})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pyme.empleados.add(otro)
+            # Hasta el commit sigue el valor cacheado
+            self.assertEqual(acceso.roles_usuario(otro), {})
+        self.assertEqual(acceso.rol_en(otro, self.pyme.id), acceso.EMPLEADO)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pyme.administrador = otro
+            self.pyme.save()
+        self.assertTrue(acceso.puede_gestionar(otro, self.pyme.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pyme.administrador = None
+            self.pyme.save()
+            self.pyme.empleados.clear()
+        self.assertEqual(acceso.roles_usuario(otro), {})
+        self.assertEqual(acceso.roles_usuario(self.empleado), {})
+
+    def test_vistas_respetan_roles(self):
+        self.client.force_authenticate(self.empleado)
+        detalle = self.client.get(reverse('detalle_pyme', args=[self.pyme.id]))
+        cerrar = self.client.post(reverse('cerrar_turno', args=[self.turno.id]))
+        inexistente = self.client.get(reverse('detalle_pyme', args=[9999]))
+
+        self.assertEqual(detalle.status_code, 200)
+        self.assertEqual(cerrar.status_code, 403)
+        self.assertEqual(inexistente.status_code, 404)
+
+
+class PymesCacheTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            pyme = PYME.objects.create(
+                nombre=f'Sucursal {i}', propietario=self.propietario, direccion='x')
+            pyme.empleados.add(self.empleado)
+        self.client.force_authenticate(self.propietario)
+
+    def listar(self):
+        return self.client.get(reverse('listar_pymes')).data
+
+    def test_listado_desde_el_cache(self):
+        primera = self.listar()
+        # Solo las versiones: los datos salen de un get_many
+        with self.assertNumQueries(1):
+            self.assertEqual(self.listar(), primera)
+
+        detalle = self.client.get(reverse('detalle_pyme', args=[self.pyme.id]))
+        self.assertEqual(detalle.data, primera[0])
+        self.assertEqual(
+            detalle.data, PYMESerializer(PYME.objects.get(pk=self.pyme.pk)).data)
+
+    def test_cambios_invalidan_el_cache(self):
+        self.listar()
+        self.empleado.username = 'cajera'
+        self.empleado.save()
+        self.assertTrue(all(p['empleados'] == ['cajera'] for p in self.listar()))
+
+        nuevo = Usuario.objects.create_user(username='nuevo')
+        self.pyme.empleados.add(nuevo)
+        self.assertEqual(self.listar()[0]['empleados'], ['cajera', 'nuevo'])
+
+        nuevo.delete()
+        self.assertEqual(self.listar()[0]['empleados'], ['cajera'])
+
+        self.pyme.nombre = 'Bodega Central'
+        self.pyme.save()
+        detalle = self.client.get(reverse('detalle_pyme', args=[self.pyme.id]))
+        self.assertEqual(detalle.data['nombre'], 'Bodega Central')
+
+
+class ListarProductosTests(TiendaTestCase):
+    url = reverse('listar_productos')
+
+    def test_consultas_constantes_por_tamano_de_catalogo(self):
+        self.client.force_authenticate(self.propietario)
+        acceso.roles_usuario(self.propietario)
+        with CaptureQueriesContext(connection) as catalogo_chico:
+            self.assertEqual(len(self.client.get(self.url).data), 30)
+
+        Producto.objects.bulk_create([
+            Producto(nombre=f'Extra {i}', tienda=self.pyme,
+                     precio_compra=1, precio_venta=2)
+            for i in range(100)
+        ])
+        with CaptureQueriesContext(connection) as catalogo_grande:
+            self.assertEqual(len(self.client.get(self.url).data), 130)
+
+        self.assertEqual(len(catalogo_chico), len(catalogo_grande))
+        # Versiones de las PYMEs (ETag) y el listado
+        self.assertEqual(len(catalogo_grande), 2)
+
+    def test_puede_editar_segun_rol(self):
+        self.client.force_authenticate(self.propietario)
+        self.assertTrue(self.client.get(self.url).data[0]['puede_editar'])
+
+        self.client.force_authenticate(self.empleado)
+        producto = self.client.get(self.url).data[0]
+        self.assertFalse(producto['puede_editar'])
+        self.assertEqual(producto['tienda_nombre'], 'Bodega')
+
+
+class ListarTurnosTests(TiendaTestCase):
+    url = reverse('listar_turnos')
+
+    def setUp(self):
+        super().setUp()
+        otro = Usuario.objects.create_user(username='otro')
+        self.ajena = PYME.objects.create(nombre='Ajena', propietario=otro, direccion='x')
+        # Asignado en una PYME ajena y también en la propia, sin duplicarse
+        self.turno_ajeno = Turno.objects.create(pyme=self.ajena, abierto_por=otro)
+        self.turno_ajeno.empleados.add(self.empleado, self.propietario)
+        Turno.objects.create(pyme=self.ajena, abierto_por=otro)
+        self.turno.empleados.add(self.propietario)
+
+    def ids(self, usuario, **filtros):
+        self.client.force_authenticate(usuario)
+        respuesta = self.client.get(self.url, filtros)
+        self.assertEqual(respuesta.status_code, 200)
+        return [t['id'] for t in respuesta.data]
+
+    def test_visibles_sin_duplicados(self):
+        self.assertEqual(self.ids(self.propietario), [self.turno_ajeno.id, self.turno.id])
+        self.assertEqual(self.ids(self.empleado), [self.turno_ajeno.id, self.turno.id])
+        self.assertEqual(self.ids(self.empleado, pyme=self.pyme.id), [self.turno.id])
+        self.assertEqual(self.ids(self.empleado, pyme='x'), [])
+
+    def test_rango_de_fechas(self):
+        Turno.objects.filter(pk=self.turno.pk).update(
+            inicio=timezone.now() - timedelta(days=10))
+        ayer = (timezone.now() - timedelta(days=1)).date().isoformat()
+
+        self.assertEqual(self.ids(self.propietario, desde=ayer), [self.turno_ajeno.id])
+        self.assertEqual(self.ids(self.propietario, hasta=ayer), [self.turno.id])
+        respuesta = self.client.get(self.url, {'desde': 'ayer'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_consultas_constantes_por_cantidad_de_turnos(self):
+        self.client.force_authenticate(self.propietario)
+        acceso.roles_usuario(self.propietario)
+        with CaptureQueriesContext(connection) as pocos:
+            self.client.get(self.url)
+
+        for _ in range(20):
+            turno = Turno.objects.create(pyme=self.pyme, abierto_por=self.propietario)
+            turno.empleados.add(self.empleado, self.propietario)
+        with CaptureQueriesContext(connection) as muchos:
+            self.assertEqual(len(self.client.get(self.url).data), 22)
+
+        self.assertEqual(len(pocos), len(muchos))
+        # Los turnos y sus empleados
+        self.assertEqual(len(muchos), 2)
+
+
+class PaginacionTests(TiendaTestCase):
+    def recorrer(self, url, limite):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            params = {'limite': limite}
+            if cursor:
+                params['cursor'] = cursor
+            respuesta = self.client.get(url, params)
+            self.assertEqual(respuesta.status_code, 200)
+            vistos += [fila['id'] for fila in respuesta.data['resultados']]
+            paginas += 1
+            cursor = respuesta.data['siguiente']
+            if cursor is None:
+                return vistos, paginas
+
+    def test_productos_por_cursor(self):
+        self.client.force_authenticate(self.propietario)
+        completo = [p['id'] for p in self.client.get(
+            reverse('listar_productos')).data]
+
+        vistos, paginas = self.recorrer(reverse('listar_productos'), 7)
+
+        self.assertEqual(vistos, completo)
+        self.assertEqual(paginas, 5)
+
+    def test_turnos_con_inicio_repetido(self):
+        for _ in range(4):
+            Turno.objects.create(pyme=self.pyme, abierto_por=self.propietario)
+        Turno.objects.update(inicio=self.turno.inicio)
+        self.client.force_authenticate(self.propietario)
+
+        vistos, _ = self.recorrer(reverse('listar_turnos'), 2)
+
+        self.assertEqual(vistos, sorted(Turno.objects.values_list('id', flat=True)))
+
+    def test_cursor_invalido(self):
+        self.client.force_authenticate(self.propietario)
+        respuesta = self.client.get(
+            reverse('listar_productos'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_cursores_con_valores_invalidos(self):
+        self.client.force_authenticate(self.propietario)
+        valores = ([[1], 1], [{}, 1], [None, 1], ['x', None], ['x', 2 ** 70],
+                   [1, 'uno'])
+        for url in (reverse('listar_productos'), reverse('listar_turnos')):
+            for valor in valores:
+                cursor = base64.urlsafe_b64encode(json.dumps(valor).encode()).decode()
+                with self.subTest(url=url, cursor=valor):
+                    respuesta = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(respuesta.status_code, 400)
+
+
+class EtagTests(TiendaTestCase):
+    def pedir(self, url, etag=None):
+        cabeceras = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **cabeceras)
+
+    def test_productos_304_hasta_que_cambia_el_catalogo(self):
+        self.client.force_authenticate(self.propietario)
+        url = reverse('listar_productos')
+        etag = self.pedir(url)['ETag']
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.pedir(url, etag).status_code, 304)
+
+        producto = Producto.objects.get(pk=self.productos[0].pk)
+        producto.precio_venta = Decimal('9.99')
+        producto.save()
+        respuesta = self.pedir(url, etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_detalle_pyme_cambia_con_empleados(self):
+        self.client.force_authenticate(self.propietario)
+        url = reverse('detalle_pyme', args=[self.pyme.id])
+        etag = self.pedir(url)['ETag']
+        self.assertEqual(self.pedir(url, etag).status_code, 304)
+
+        self.pyme.empleados.add(Usuario.objects.create_user(username='nuevo'))
+        self.assertEqual(self.pedir(url, etag).status_code, 200)
+
+    def test_guardar_pyme_nunca_retrocede_la_version(self):
+        pyme = PYME.objects.get(pk=self.pyme.pk)
+        version = pyme.version
+        pyme.save()
+        pyme.save()
+        pyme.save(update_fields=['nombre'])
+        self.assertEqual(PYME.objects.get(pk=pyme.pk).version, version + 3)
+        self.assertEqual(pyme.version, version)
+
+
+class BuscarProductosTests(TiendaTestCase):
+    url = reverse('buscar_productos')
+
+    def setUp(self):
+        super().setUp()
+        busqueda.limpiar()
+        Producto.objects.create(
+            nombre='Café Molido Serrano', codigo='750100', tienda=self.pyme,
+            precio_compra=Decimal('3'), precio_venta=Decimal('5'))
+        self.client.force_authenticate(self.empleado)
+
+    def buscar(self, **params):
+        return self.client.get(self.url, {'pyme': self.pyme.id, **params})
+
+    def test_por_codigo_y_por_prefijo(self):
+        self.assertEqual(self.buscar(codigo='750100').data[0]['nombre'],
+                         'Café Molido Serrano')
+        self.assertEqual([p['codigo'] for p in self.buscar(q='cafe mol').data],
+                         ['750100'])
+        self.assertEqual(len(self.buscar(q='produ', limite=5).data), 5)
+        self.assertEqual(len(self.buscar(q='produ', limite=-5).data), 1)
+        self.assertEqual(self.buscar(q='inexistente').data, [])
+        self.assertFalse(self.buscar(codigo='750100').data[0]['puede_editar'])
+
+    def test_indice_caliente_sin_escanear_productos(self):
+        self.buscar(q='cafe')
+        with self.assertNumQueries(1):
+            self.buscar(q='serr')
+
+    def test_senales_mantienen_el_indice(self):
+        self.buscar(q='cafe')
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.create(
+                nombre='Cafetera', codigo='750200', tienda=self.pyme,
+                precio_compra=Decimal('3'), precio_venta=Decimal('5'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.get(codigo='750100').delete()
+
+        with self.assertNumQueries(1):
+            resultado = self.buscar(q='cafe').data
+        self.assertEqual([p['codigo'] for p in resultado], ['750200'])
+
+    def test_cambios_no_tocan_el_indice_en_uso(self):
+        anterior = busqueda.indice(self.pyme.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Producto.objects.create(
+                nombre='Cafetera', codigo='750200', tienda=self.pyme,
+                precio_compra=Decimal('3'), precio_venta=Decimal('5'))
+
+        self.assertEqual([p['codigo'] for p in anterior.buscar('cafe', 10)], ['750100'])
+        self.assertEqual(anterior.buscar_codigo('750200'), [])
+        actual = busqueda.indice(self.pyme.id)
+        self.assertIsNot(actual, anterior)
+        self.assertEqual(len(actual.buscar('cafe', 10)), 2)
+
+    def test_sin_acceso(self):
+        self.client.force_authenticate(Usuario.objects.create_user(username='x'))
+        self.assertEqual(self.buscar(q='cafe').status_code, 403)
+
+
+class ImportarExportarProductosTests(TiendaTestCase):
+    def importar(self, contenido, tipo='text/csv'):
+        return self.client.post(
+            reverse('importar_productos') + f'?pyme={self.pyme.id}',
+            contenido, content_type=tipo)
+
+    def test_importa_csv_actualizando_por_codigo(self):
+        self.client.force_authenticate(self.propietario)
+        respuesta = self.importar(
+            'codigo,nombre,precio_compra,precio_venta\r\n'
+            'P0000,Renombrado,1.00,3.00\r\n'
+            ',Sin código,1,2\r\n'
+            'N0001,Nuevo,1,2\r\n'
+            'N0001,Repetido,1,2\r\n'
+            'N0002,,1,2\r\n')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data['creados'], 2)
+        self.assertEqual(respuesta.data['actualizados'], 1)
+        self.assertEqual([e['fila'] for e in respuesta.data['errores']], [5, 6])
+        self.assertEqual(Producto.objects.get(codigo='P0000').nombre, 'Renombrado')
+        self.assertEqual(Producto.objects.filter(tienda=self.pyme).count(), 32)
+
+    def test_no_pisa_codigos_de_otra_tienda(self):
+        otra = PYME.objects.create(
+            nombre='Otra', propietario=self.empleado, direccion='Calle 2')
+        Producto.objects.create(nombre='Ajeno', codigo='X1', tienda=otra,
+                                precio_compra=1, precio_venta=2)
+        self.client.force_authenticate(self.propietario)
+
+        respuesta = self.importar(
+            '{"codigo": "X1", "nombre": "Robado", "precio_compra": 1, "precio_venta": 2}\n',
+            tipo='application/x-ndjson')
+
+        self.assertEqual(respuesta.data['con_error'], 1)
+        self.assertEqual(Producto.objects.get(codigo='X1').nombre, 'Ajeno')
+
+    def test_utf8_invalido_no_importa_nada(self):
+        self.client.force_authenticate(self.propietario)
+        # Más de un lote válido antes de la línea rota
+        filas = ''.join(f'N{i:04d},Nuevo {i},1,2\r\n' for i in range(600))
+        respuesta = self.importar(
+            ('codigo,nombre,precio_compra,precio_venta\r\n' + filas).encode()
+            + b'N9999,Caf\xe9,1,2\r\n')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(Producto.objects.filter(tienda=self.pyme).count(), 30)
+
+    def test_empleado_no_importa(self):
+        self.client.force_authenticate(self.empleado)
+        self.assertEqual(self.importar('codigo,nombre\r\n').status_code, 403)
+
+    def test_exportacion_reimportable(self):
+        self.client.force_authenticate(self.empleado)
+        respuesta = self.client.get(reverse('exportar_productos'), {
+            'pyme': self.pyme.id, 'formato': 'ndjson'})
+
+        self.assertTrue(respuesta.streaming)
+        lineas = b''.join(respuesta.streaming_content).decode().splitlines()
+        self.assertEqual(len(lineas), 30)
+        self.assertEqual(json.loads(lineas[0])['codigo'], 'P0000')
+
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as archivo:
+            archivo.write('\n'.join(lineas))
+            archivo.flush()
+            salida = StringIO()
+            call_command('importar_productos', self.pyme.id, archivo.name,
+                         stdout=salida)
+        self.assertEqual(json.loads(salida.getvalue())['actualizados'], 30)
+
+
+class ExportarVentasTests(TiendaTestCase):
+    url = reverse('exportar_ventas')
+
+    def setUp(self):
+        super().setUp()
+        for lineas in (1, 3, 2):
+            registrar_venta(self.turno, self.empleado,
+                            self.cesta(lineas), 'efectivo')
+        self.client.force_authenticate(self.propietario)
+
+    def exportar(self, **params):
+        respuesta = self.client.get(self.url, {'pyme': self.pyme.id, **params})
+        self.assertTrue(respuesta.streaming)
+        return b''.join(respuesta.streaming_content).decode().splitlines()
+
+    def test_csv_una_fila_por_detalle(self):
+        lineas = self.exportar()
+        self.assertEqual(lineas[0].split(',')[:2], ['venta', 'fecha'])
+        self.assertEqual(len(lineas), 1 + 6)
+
+    def test_ndjson_y_rango_de_fechas(self):
+        ventas = [json.loads(l) for l in self.exportar(formato='ndjson')]
+        self.assertEqual([len(v['detalles']) for v in ventas], [1, 3, 2])
+
+        manana = (timezone.now() + timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.exportar(desde=manana, formato='ndjson'), [])
+        self.assertEqual(len(self.exportar(hasta=manana, formato='ndjson')), 3)
+
+    def test_empleado_no_exporta(self):
+        self.client.force_authenticate(self.empleado)
+        self.assertEqual(self.client.get(
+            self.url, {'pyme': self.pyme.id}).status_code, 403)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN de SQLite')
+class PlanesConsultaTests(TiendaTestCase):
+    """
+    Ejecuta cada endpoint, toma sus SELECT y falla si el plan de SQLite
+    recorre una tabla o un índice completo (SCAN). `permitidas` lista las
+    tablas que el endpoint recorre a propósito.
+    """
+
+    def setUp(self):
+        super().setUp()
+        registrar_venta(self.turno, self.empleado, self.cesta(3), 'efectivo')
+
+    def planes(self, metodo, url, datos=None, **extra):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = getattr(self.client, metodo)(url, datos, **extra)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertLess(respuesta.status_code, 400)
+
+        planes = []
+        with connection.cursor() as cursor:
+            for consulta in consultas:
+                if not consulta['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + consulta['sql'])
+                planes.append((consulta['sql'], [fila[-1] for fila in cursor.fetchall()]))
+        return planes
+
+    def assertSinScan(self, metodo, url, datos=None, permitidas=(), **extra):
+        self.client.force_authenticate(extra.pop('usuario', self.propietario))
+        for sql, plan in self.planes(metodo, url, datos, **extra):
+            for paso in plan:
+                if not paso.startswith('SCAN '):
+                    continue
+                tabla = paso.split()[1]
+                if tabla in permitidas:
+                    continue
+                self.fail(f'{url}: recorrido completo de {tabla}\n{sql}\n{plan}')
+
+    def test_listados(self):
+        self.assertSinScan('get', reverse('listar_pymes'))
+        self.assertSinScan('get', reverse('listar_productos'))
+        self.assertSinScan('get', reverse('listar_productos'), {'limite': 5})
+        self.assertSinScan('get', reverse('listar_turnos'))
+        self.assertSinScan('get', reverse('listar_turnos'), {'activo': 'true'})
+        self.assertSinScan('get', reverse('listar_turnos'), {
+            'pyme': self.pyme.id, 'desde': '2020-01-01', 'limite': 5})
+        self.assertSinScan('get', reverse('listar_turnos'), {'activo': 'true'},
+                           usuario=self.empleado)
+        self.assertSinScan('get', reverse('detalle_pyme', args=[self.pyme.id]))
+        self.assertSinScan('get', reverse('buscar_productos'),
+                           {'pyme': self.pyme.id, 'q': 'prod'})
+
+    def test_ventas(self):
+        self.assertSinScan('post', reverse('registrar_venta'), {
+            'turno': self.turno.id, 'productos': self.cesta(3),
+            'metodo_pago': 'efectivo'}, format='json', usuario=self.empleado)
+        self.assertSinScan('post', reverse('sincronizar_ventas'), {
+            'turno': self.turno.id, 'ventas': [{
+                'clave': 'a', 'productos': self.cesta(2),
+                'metodo_pago': 'efectivo'}]}, format='json', usuario=self.empleado)
+        self.assertSinScan('get', reverse('exportar_ventas'), {
+            'pyme': self.pyme.id, 'desde': '2020-01-01', 'formato': 'ndjson'})
+        self.assertSinScan('get', reverse('exportar_productos'),
+                           {'pyme': self.pyme.id})
+        self.assertSinScan('post', reverse('cerrar_turno', args=[self.turno.id]))
+        self.assertSinScan('get', reverse('resumen_turno', args=[self.turno.id]))
+        call_command('agregar_ventas', '--margen', '0', stdout=StringIO())
+        self.assertSinScan('get', reverse('analitica_ventas'), {
+            'pyme': self.pyme.id, 'granularidad': 'hora', 'desde': '2020-01-01'})
+
+
+class MetricasTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        metricas.registro.limpiar()
+
+    def test_registra_consultas_y_latencia_por_endpoint(self):
+        self.client.force_authenticate(self.propietario)
+        with CaptureQueriesContext(connection) as capturadas:
+            self.client.get(reverse('listar_productos'))
+            self.client.get(reverse('listar_productos'))
+        # Se cuenta ya: la petición a /metricas vacía connection.queries_log
+        consultas = len(capturadas)
+
+        staff = Usuario.objects.create_user(username='staff', is_staff=True)
+        self.client.force_authenticate(staff)
+        texto = self.client.get(reverse('metricas')).content.decode()
+
+        etiquetas = 'endpoint="listar_productos",metodo="GET"'
+        self.assertIn(f'http_request_duration_seconds_count{{{etiquetas}}} 2', texto)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} 2', texto)
+        muestras = dict(linea.rsplit(' ', 1) for linea in texto.splitlines()
+                        if linea and not linea.startswith('#'))
+        self.assertGreater(consultas, 0)
+        self.assertEqual(
+            float(muestras[f'http_request_db_queries_total{{{etiquetas}}}']), consultas)
+        self.assertNotIn(f'http_response_size_bytes_total{{{etiquetas}}} 0\n', texto)
+
+    def test_solo_staff(self):
+        self.client.force_authenticate(self.propietario)
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicasTests(TiendaTestCase):
+    def leer_con(self, metodo, usuario=None, autenticado=None):
+        """Alias del que leería la vista con este método y usuario."""
+        cabeceras = {}
+        if usuario is not None:
+            cabeceras['HTTP_AUTHORIZATION'] = f'Bearer {tokens_para(usuario)[1]}'
+        request = getattr(RequestFactory(), metodo)('/api/productos/', **cabeceras)
+
+        def vista(request):
+            if autenticado is not None:
+                request.user = autenticado
+            return HttpResponse(routers.ReplicaRouter().db_for_read(Producto))
+
+        return routers.ReplicaMiddleware(vista)(request).content.decode()
+
+    def test_get_lee_de_una_replica(self):
+        self.assertIn(self.leer_con('get', self.propietario), ('replica_1', 'replica_2'))
+        self.assertIn(self.leer_con('get'), ('replica_1', 'replica_2'))
+        # Fuera de una petición, la principal
+        self.assertIsNone(routers.ReplicaRouter().db_for_read(Producto))
+
+    def test_escrituras_en_la_principal(self):
+        self.assertEqual(self.leer_con('post', self.propietario), 'None')
+        self.assertEqual(
+            routers.ReplicaRouter().db_for_write(Venta), 'default')
+        self.assertFalse(routers.ReplicaRouter().allow_migrate('replica_1', 'tienda'))
+
+    def test_lee_sus_propias_escrituras(self):
+        self.leer_con('post', self.empleado, autenticado=self.empleado)
+        self.assertEqual(self.leer_con('get', self.empleado), 'None')
+        # Los demás siguen leyendo de réplica
+        self.assertIn(self.leer_con('get', self.propietario), ('replica_1', 'replica_2'))
+
+        cache.clear()
+        self.assertIn(self.leer_con('get', self.empleado), ('replica_1', 'replica_2'))
+
+    def test_venta_fija_la_principal(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {tokens_para(self.empleado)[1]}')
+        respuesta = self.client.post(reverse('registrar_venta'), {
+            'turno': self.turno.id, 'productos': self.cesta(1),
+            'metodo_pago': 'efectivo'}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.leer_con('get', self.empleado), 'None')
+
+    def test_requiere_cache_compartida(self):
+        with override_settings(CACHE_COMPARTIDA=False):
+            self.assertEqual([e.id for e in cache_para_replicas(None)], ['core.E002'])
+        with override_settings(CACHE_COMPARTIDA=True):
+            self.assertEqual(cache_para_replicas(None), [])
+
+    def test_acceso_revocado_aunque_la_replica_atrase(self):
+        calcular = acceso._calcular_roles
+
+        def replica_atrasada(usuario_id):
+            # La réplica todavía ve al empleado en la PYME
+            if routers.alias_lectura() != 'default':
+                return {self.pyme.id: acceso.EMPLEADO}
+            return calcular(usuario_id)
+
+        def vista(request):
+            return HttpResponse(status=200 if acceso.rol_en(self.empleado, self.pyme.id) else 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pyme.empleados.remove(self.empleado)
+        request = RequestFactory().get(
+            '/api/productos/', HTTP_AUTHORIZATION=f'Bearer {tokens_para(self.empleado)[1]}')
+        with mock.patch.object(acceso, '_calcular_roles', replica_atrasada):
+            self.assertEqual(routers.ReplicaMiddleware(vista)(request).status_code, 403)
+        self.assertEqual(acceso.roles_usuario(self.empleado), {})
+
+    def test_principal_dentro_de_una_lectura(self):
+        def vista(request):
+            with routers.principal():
+                return HttpResponse(routers.alias_lectura())
+
+        request = RequestFactory().get('/api/productos/')
+        self.assertEqual(routers.ReplicaMiddleware(vista)(request).content, b'default')
+
+
+@skipUnless(connection.vendor == 'sqlite' and settings.SQLITE_OPTIMIZADO,
+            'Solo con el perfil de SQLite')
+class SQLiteTests(APITestCase):
+    def pragma(self, nombre):
+        with connection.cursor() as cursor:
+            return cursor.execute(f'PRAGMA {nombre}').fetchone()[0]
+
+    def test_perfil_de_produccion(self):
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+        # 1 = NORMAL
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_OPCIONES['timeout'] * 1000)
+        self.assertEqual(self.pragma('cache_size'), -32768)
+
+    def test_benchmark_requiere_datos(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_sqlite', stdout=StringIO())
+
+
+class LecturaTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = Usuario.objects.create_user(username='admín')
+        otra = PYME.objects.create(
+            nombre='Kiosco ñ', propietario=self.propietario, direccion='Calle 2',
+            descripcion='línea\u2028otra', administrador=admin)
+        otra.empleados.add(admin, self.empleado)
+        Producto.objects.create(nombre='Sin código', tienda=otra,
+                                precio_compra=Decimal('3'), precio_venta=Decimal('4.5'))
+        cerrado = Turno.objects.create(
+            pyme=otra, abierto_por=admin, activo=False, fin=timezone.now(),
+            cerrado_por=admin, gastos=Decimal('12.3'), notas_gastos='luz')
+        cerrado.empleados.add(self.empleado, admin)
+        self.client.force_authenticate(self.propietario)
+
+    def assertMismosBytes(self, antes, despues):
+        esperado = JSONRenderer().render(antes)
+        self.assertEqual(JSONRenderer().render(despues), esperado)
+        self.assertEqual(JSONRapidoRenderer().render(despues), esperado)
+
+    def test_pymes_igual_que_model_serializer(self):
+        pymes = PYME.objects.order_by('id')
+        self.assertMismosBytes(PYMESerializer(pymes, many=True).data,
+                               lectura.pymes(lectura.filas_pymes(pymes)))
+
+    def test_productos_igual_que_model_serializer(self):
+        roles = acceso.roles_usuario(self.empleado)
+        productos = Producto.objects.all()
+        self.assertMismosBytes(
+            ProductoSerializer(productos, many=True, context={'roles': roles}).data,
+            lectura.formatear_productos(lectura.filas_productos(productos), roles))
+
+    def test_turnos_igual_que_model_serializer(self):
+        turnos = Turno.objects.order_by('id')
+        self.assertMismosBytes(TurnoSerializer(turnos, many=True).data,
+                               lectura.turnos(lectura.filas_turnos(turnos)))
+
+    def test_listados_con_consultas_constantes(self):
+        for nombre in ('listar_pymes', 'listar_productos', 'listar_turnos'):
+            self.client.get(reverse(nombre))
+            with CaptureQueriesContext(connection) as capturadas:
+                respuesta = self.client.get(reverse(nombre))
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertLessEqual(len(capturadas), 3, nombre)
+
+    @skipUnless(orjson, 'orjson no está instalado')
+    def test_renderer_rapido_igual_que_drf(self):
+        datos = {
+            1: [Decimal('1.50'), timezone.now(), timezone.now().date(), None, True],
+            'texto': 'ñandú \u2028 \u2029 "comillas" \\',
+        }
+        # Enteros de más de 64 bits: orjson no puede y delega en DRF
+        for valor in (datos, {'grande': 2 ** 70}):
+            self.assertEqual(JSONRapidoRenderer().render(valor),
+                             JSONRenderer().render(valor))
+        self.assertEqual(JSONRapidoRenderer().render(None), b'')
+
+
+class VistasAsyncTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        _, token = tokens_para(self.propietario)
+        self.cabeceras = {'Authorization': f'Bearer {token}'}
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    async def test_misma_respuesta_que_las_vistas_sincronas(self):
+        casos = [
+            ('listar_pymes', ''),
+            ('listar_productos', ''),
+            ('listar_productos', '?limite=7'),
+            ('listar_turnos', ''),
+            ('listar_turnos', '?limite=1&activo=true'),
+        ]
+        for nombre, consulta in casos:
+            sincrona = await self.async_client.get(
+                reverse(nombre) + consulta, headers=self.cabeceras)
+            asincrona = await self.async_client.get(
+                reverse(f'{nombre}_async') + consulta, headers=self.cabeceras)
+            self.assertEqual(asincrona.status_code, 200, nombre)
+            self.assertEqual(asincrona.content, sincrona.content, nombre + consulta)
+            self.assertEqual(asincrona.get('ETag'), sincrona.get('ETag'), nombre)
+
+    async def test_etag_devuelve_304(self):
+        url = reverse('listar_productos_async')
+        primera = await self.async_client.get(url, headers=self.cabeceras)
+        segunda = await self.async_client.get(
+            url, headers={**self.cabeceras, 'If-None-Match': primera['ETag']})
+        self.assertEqual(segunda.status_code, 304)
+
+    async def test_metricas_cuentan_consultas_del_orm_async(self):
+        metricas.registro.limpiar()
+        await self.async_client.get(reverse('listar_turnos_async'), headers=self.cabeceras)
+        consultas = [
+            linea for linea in metricas.registro.prometheus().splitlines()
+            if linea.startswith('http_request_db_queries_total{endpoint="listar_turnos_async"')]
+        self.assertEqual(len(consultas), 1)
+        self.assertGreater(int(consultas[0].split()[-1]), 0)
+
+    async def test_errores_como_drf(self):
+        url_sync, url_async = reverse('listar_pymes'), reverse('listar_pymes_async')
+        for cabeceras in ({}, {'Authorization': 'Bearer no-es-un-token'}):
+            sincrona = await self.async_client.get(url_sync, headers=cabeceras)
+            asincrona = await self.async_client.get(url_async, headers=cabeceras)
+            self.assertEqual(asincrona.status_code, 401)
+            self.assertEqual(asincrona.content, sincrona.content)
+            self.assertEqual(asincrona['WWW-Authenticate'], sincrona['WWW-Authenticate'])
+
+        respuesta = await self.async_client.post(url_async, headers=self.cabeceras)
+        self.assertEqual(respuesta.status_code, 405)
+
+        respuesta = await self.async_client.get(
+            reverse('listar_productos_async') + '?limite=x', headers=self.cabeceras)
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class EventosTurnoTests(TiendaTestCase):
+    def setUp(self):
+        super().setUp()
+        eventos.reiniciar()
+        self.url = reverse('eventos_turno', args=[self.turno.id])
+
+    def cabeceras(self, usuario):
+        _, token = tokens_para(usuario)
+        return {'Authorization': f'Bearer {token}'}
+
+    async def leer(self, flujo):
+        return await asyncio.wait_for(anext(flujo), 5)
+
+    def vender(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            registrar_venta(self.turno, self.empleado, self.cesta(2), 'efectivo')
+
+    def cerrar(self):
+        self.client.force_authenticate(self.propietario)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cerrar_turno', args=[self.turno.id]), {}, format='json')
+
+    async def test_publica_ventas_y_cierre(self):
+        respuesta = await self.async_client.get(self.url, headers=self.cabeceras(self.propietario))
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        flujo = aiter(respuesta.streaming_content)
+        self.assertTrue((await self.leer(flujo)).startswith(b'retry:'))
+        self.assertIn(b'"total_ventas":"0.00"', await self.leer(flujo))
+
+        await sync_to_async(self.vender)()
+        venta = await self.leer(flujo)
+        self.assertTrue(venta.startswith(b'event: venta\nid: '))
+        datos = json.loads(venta.split(b'data: ', 1)[1])
+        self.assertEqual(datos['total'], '9.00')
+        self.assertEqual(len(datos['detalles']), 2)
+        self.assertIn(b'"total_ventas":"9.00"', await self.leer(flujo))
+
+        await sync_to_async(self.cerrar)()
+        self.assertTrue((await self.leer(flujo)).startswith(b'event: cerrado'))
+        with self.assertRaises(StopAsyncIteration):
+            await self.leer(flujo)
+        self.assertFalse(eventos.broker().tiene_suscriptores(
+            eventos.canal_turno(self.turno.id)))
+
+    async def test_heartbeat_sin_ventas(self):
+        with self.settings(EVENTOS_HEARTBEAT=0.01):
+            respuesta = await self.async_client.get(self.url, headers=self.cabeceras(self.empleado))
+            flujo = aiter(respuesta.streaming_content)
+            await self.leer(flujo)
+            await self.leer(flujo)
+            self.assertEqual(await self.leer(flujo), b': ping\n\n')
+            await flujo.aclose()
+
+    def test_liberar_hilo_termina_el_hilo_de_la_peticion(self):
+        # Usa atributos internos de asgiref: esta prueba avisa si cambian.
+        # Fuera de una prueba async, como en el servidor: ahí asgiref manda
+        # el código síncrono al hilo de la prueba y no al de la petición
+        async def peticion():
+            async with ThreadSensitiveContext():
+                hilo = await sync_to_async(threading.current_thread)()
+                await liberar_hilo()
+                return hilo, await sync_to_async(threading.current_thread)()
+
+        hilo, nuevo = asyncio.run(peticion())
+        self.assertIsNot(nuevo, hilo)
+        hilo.join(5)
+        self.assertFalse(hilo.is_alive())
+
+    def test_sin_suscriptores_no_consulta(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            registrar_venta(self.turno, self.empleado, self.cesta(2), 'efectivo')
+        with self.assertNumQueries(0):
+            for callback in callbacks:
+                callback()
+
+    async def test_sin_acceso(self):
+        extrano = await Usuario.objects.acreate(username='extraño')
+        respuesta = await self.async_client.get(self.url, headers=self.cabeceras(extrano))
+        self.assertEqual(respuesta.status_code, 403)
+        respuesta = await self.async_client.get(
+            reverse('eventos_turno', args=[0]), headers=self.cabeceras(extrano))
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class BenchmarkTests(APITestCase):
+    def test_semilla_y_benchmark(self):
+        call_command('seed_benchmark', '--pymes', '2', '--empleados', '3',
+                     '--productos', '20', '--turnos', '3', '--ventas', '4',
+                     '--lineas', '2', stdout=StringIO())
+
+        self.assertEqual(Venta.objects.count(), 2 * 3 * 4)
+        self.assertEqual(DetalleVenta.objects.count(), 2 * 3 * 4 * 2)
+        self.assertEqual(Turno.objects.filter(activo=True).count(), 2)
+        call_command('recalcular_totales_turnos', '--check', stdout=StringIO())
+
+        salida = StringIO()
+        call_command('benchmark_api', '--repeticiones', '2', stdout=salida)
+        resultado = json.loads(salida.getvalue())
+        for nombre, medicion in resultado['endpoints'].items():
+            self.assertTrue(all(e < 400 for e in medicion['estados']), nombre)
+            self.assertIn('p95_ms', medicion)
+
+        salida = StringIO()
+        call_command('benchmark_api', '--serializacion', '--repeticiones', '1',
+                     stdout=salida)
+        for nombre, medicion in json.loads(salida.getvalue())['listados'].items():
+            self.assertTrue(medicion['bytes_iguales'], nombre)
@@ -13,7 +13,16 @@ urlpatterns = [
 
     # Productos
     path('productos/', views.listar_productos_view, name='listar_productos'),
+    path('productos/buscar/', views.buscar_productos_view,
+         name='buscar_productos'),
+    path('productos/importar/', views.importar_productos_view,
+         name='importar_productos'),
+    path('productos/exportar/', views.exportar_productos_view,
+         name='exportar_productos'),
     path('productos/crear/', views.crear_producto_view, name='crear_producto'),
+    path('productos/stock/', views.stock_productos_view, name='stock_productos'),
+    path('productos/<int:producto_id>/stock/',
+         views.ajustar_stock_view, name='ajustar_stock'),
     path('productos/<int:producto_id>/actualizar/',
          views.actualizar_producto_view, name='actualizar_producto'),
     path('productos/<int:producto_id>/eliminar/',
@@ -22,7 +31,15 @@ urlpatterns = [
     # Turnos
     path('turnos/abrir/', views.abrir_turno_view, name='abrir_turno'),
     path('ventas/registrar/', views.registrar_venta_view, name='registrar_venta'),
+    path('ventas/sincronizar/', views.sincronizar_ventas_view,
+         name='sincronizar_ventas'),
+    path('ventas/exportar/', views.exportar_ventas_view,
+         name='exportar_ventas'),
+    path('ventas/analitica/', views.analitica_ventas_view,
+         name='analitica_ventas'),
     path('turnos/<int:turno_id>/cerrar/',
          views.cerrar_turno_view, name='cerrar_turno'),
+    path('turnos/<int:turno_id>/resumen/',
+         views.resumen_turno_view, name='resumen_turno'),
     path('turnos/', views.listar_turnos_view, name='listar_turnos'),
 ]
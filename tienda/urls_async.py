@@ -0,0 +1,12 @@
+# backend/tienda/urls_async.py
+from django.urls import path
+from . import views_async
+
+urlpatterns = [
+    path('pymes/', views_async.listar_pymes_view, name='listar_pymes_async'),
+    path('productos/', views_async.listar_productos_view,
+         name='listar_productos_async'),
+    path('turnos/', views_async.listar_turnos_view, name='listar_turnos_async'),
+    path('turnos/<int:turno_id>/eventos/', views_async.eventos_turno_view,
+         name='eventos_turno'),
+]
@@ -0,0 +1,304 @@
+# backend/tienda/ventas.py
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Prefetch, prefetch_related_objects
+
+from . import eventos, inventario
+from .models import DetalleVenta, MovimientoInventario, Producto, Turno, Venta
+
+
+class VentaInvalida(Exception):
+    """Error de validación de una venta; el mensaje se devuelve al cliente."""
+
+
+def validar_pago(metodo_pago, codigo_transferencia, telefono_cliente):
+    if metodo_pago not in dict(Venta.METODO_PAGO):
+        raise VentaInvalida('Método de pago inválido')
+    if metodo_pago == 'transferencia':
+        if not codigo_transferencia or not telefono_cliente:
+            raise VentaInvalida(
+                'Se requiere código de transferencia y teléfono del cliente')
+
+
+def entero(valor):
+    """
+    El número entero de un JSON o formulario. int() truncaría 1.9 y aceptaría
+    True; aquí son ValueError, como un texto que no es un número.
+    """
+    if isinstance(valor, bool):
+        raise ValueError(f'{valor!r} no es un número entero')
+    if isinstance(valor, float):
+        if not valor.is_integer():
+            raise ValueError(f'{valor!r} no es un número entero')
+        return int(valor)
+    if isinstance(valor, (int, str)):
+        return int(valor)
+    raise TypeError(f'{valor!r} no es un número entero')
+
+
+def normalizar_cesta(productos):
+    """Valida la cesta completa y la devuelve como [(producto_id, cantidad)]."""
+    if not isinstance(productos, list) or not productos:
+        raise VentaInvalida('La venta debe incluir al menos un producto')
+
+    lineas = []
+    for item in productos:
+        try:
+            producto_id = entero(item['producto'])
+            cantidad = entero(item['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            raise VentaInvalida(
+                'Cada producto requiere "producto" y "cantidad" numéricos')
+        if cantidad < 1:
+            raise VentaInvalida(
+                f'Cantidad inválida para el producto {producto_id}')
+        lineas.append((producto_id, cantidad))
+    return lineas
+
+
+def cargar_productos(pyme_id, producto_ids):
+    # Una sola consulta para todos los productos de la cesta
+    return Producto.objects.filter(tienda_id=pyme_id).in_bulk(set(producto_ids))
+
+
+def construir_venta(turno, vendedor, lineas, productos_por_id, metodo_pago,
+                    codigo_transferencia=None, telefono_cliente=None):
+    """Arma la venta y sus detalles sin guardarlos, con el total ya calculado."""
+    detalles = []
+    total = Decimal('0')
+    for producto_id, cantidad in lineas:
+        producto = productos_por_id.get(producto_id)
+        if producto is None:
+            raise VentaInvalida(
+                f'Producto {producto_id} no encontrado en esta tienda')
+        detalles.append(DetalleVenta(
+            producto=producto,
+            cantidad=cantidad,
+            precio_unitario=producto.precio_venta,
+            costo_unitario=producto.precio_compra
+        ))
+        total += producto.precio_venta * cantidad
+
+    venta = Venta(
+        turno=turno,
+        vendedor=vendedor,
+        pyme_id=turno.pyme_id,
+        total=total,
+        metodo_pago=metodo_pago,
+        codigo_transferencia=codigo_transferencia,
+        telefono_cliente=telefono_cliente
+    )
+    return venta, detalles
+
+
+def acumular_en_turno(turno, detalles):
+    """
+    Suma los detalles a los totales acumulados del turno con un UPDATE atómico.
+
+    Falla si el turno ya fue cerrado, con lo que la transacción se revierte.
+    """
+    total = sum(
+        (d.precio_unitario * d.cantidad for d in detalles), Decimal('0'))
+    ganancia = sum((d.ganancia for d in detalles), Decimal('0'))
+    actualizados = Turno.objects.filter(pk=turno.pk, activo=True).update(
+        total_ventas=F('total_ventas') + total,
+        ganancia_bruta=F('ganancia_bruta') + ganancia
+    )
+    if not actualizados:
+        raise VentaInvalida('Turno no encontrado o inactivo')
+
+
+def _sin_stock(cantidades, disponible):
+    """Mensaje para el primer producto sin stock suficiente, o None."""
+    for producto_id in sorted(cantidades):
+        if cantidades[producto_id] > disponible.get(producto_id, cantidades[producto_id]):
+            return f'Stock insuficiente para el producto {producto_id}'
+    return None
+
+
+def descontar_stock(cantidades):
+    """
+    Bloquea y descuenta el stock de una venta; lanza VentaInvalida (y la
+    transacción se revierte) si falta.
+    """
+    if not cantidades:
+        return {}
+    disponible = inventario.bloquear(cantidades)
+    error = _sin_stock(cantidades, disponible)
+    if error:
+        raise VentaInvalida(error)
+    cantidades = {producto_id: cantidades[producto_id] for producto_id in disponible}
+    if not inventario.descontar(cantidades):
+        raise VentaInvalida('Stock insuficiente')
+    return cantidades
+
+
+def precargar_detalles(ventas):
+    # Deja los detalles listos para VentaSerializer en una sola consulta
+    prefetch_related_objects(ventas, Prefetch(
+        'detalles', queryset=DetalleVenta.objects.select_related('producto')))
+
+
+def registrar_venta(turno, vendedor, productos, metodo_pago,
+                    codigo_transferencia=None, telefono_cliente=None):
+    """
+    Registra una venta completa en una única transacción.
+
+    El número de consultas no depende de la cantidad de líneas de la cesta.
+    Lanza VentaInvalida si la cesta o el pago no son válidos.
+    """
+    validar_pago(metodo_pago, codigo_transferencia, telefono_cliente)
+    lineas = normalizar_cesta(productos)
+
+    with transaction.atomic():
+        productos_por_id = cargar_productos(
+            turno.pyme_id, [producto_id for producto_id, _ in lineas])
+        venta, detalles = construir_venta(
+            turno, vendedor, lineas, productos_por_id, metodo_pago,
+            codigo_transferencia, telefono_cliente)
+        # Primero los productos y después el turno, como en el lote
+        descontadas = descontar_stock(inventario.cantidades_con_stock(detalles))
+        acumular_en_turno(turno, detalles)
+        venta.save()
+        for detalle in detalles:
+            detalle.venta = venta
+        DetalleVenta.objects.bulk_create(detalles)
+        if descontadas:
+            MovimientoInventario.objects.bulk_create(
+                inventario.movimientos_de_venta(venta, descontadas))
+        eventos.ventas_registradas(turno.id, [venta])
+
+    precargar_detalles([venta])
+    return venta
+
+
+LOTE_MAXIMO = 500
+
+
+def registrar_ventas_lote(turno, vendedor, ventas):
+    """
+    Registra un lote de ventas de un mismo turno con escrituras masivas.
+
+    Cada venta trae una `clave` de idempotencia: las claves ya registradas
+    en el turno se informan como duplicadas sin volver a insertarse.
+    Devuelve un resultado por venta, en el orden recibido.
+    """
+    if not isinstance(ventas, list) or not ventas:
+        raise VentaInvalida('Se requiere una lista de ventas')
+    if len(ventas) > LOTE_MAXIMO:
+        raise VentaInvalida(
+            f'El lote no puede superar {LOTE_MAXIMO} ventas')
+
+    resultados = [None] * len(ventas)
+    pendientes = []  # (posición, clave, datos, lineas)
+    for posicion, datos in enumerate(ventas):
+        clave = datos.get('clave') if isinstance(datos, dict) else None
+        if not isinstance(clave, str) or not clave or len(clave) > 64:
+            resultados[posicion] = {
+                'clave': clave, 'estado': 'error',
+                'error': 'Se requiere una clave de hasta 64 caracteres'}
+            continue
+        try:
+            validar_pago(datos.get('metodo_pago'), datos.get(
+                'codigo_transferencia'), datos.get('telefono_cliente'))
+            lineas = normalizar_cesta(datos.get('productos'))
+        except VentaInvalida as e:
+            resultados[posicion] = {
+                'clave': clave, 'estado': 'error', 'error': str(e)}
+            continue
+        pendientes.append((posicion, clave, datos, lineas))
+
+    with transaction.atomic():
+        # Reintentos: claves ya registradas en este turno
+        existentes = {
+            clave: (venta_id, total)
+            for clave, venta_id, total in Venta.objects.filter(
+                turno=turno,
+                clave_idempotencia__in=[clave for _, clave, _, _ in pendientes]
+            ).values_list('clave_idempotencia', 'id', 'total')
+        }
+        productos_por_id = cargar_productos(turno.pyme_id, [
+            producto_id
+            for _, _, _, lineas in pendientes
+            for producto_id, _ in lineas
+        ])
+        disponible = inventario.bloquear([
+            producto_id for producto_id, producto in productos_por_id.items()
+            if producto.stock is not None
+        ])
+        descontar = Counter()
+        descontadas = []  # (venta, {producto_id: unidades})
+
+        nuevas = []  # (posición, venta, detalles)
+        claves_del_lote = set()
+        for posicion, clave, datos, lineas in pendientes:
+            if clave in existentes:
+                venta_id, total = existentes[clave]
+                resultados[posicion] = {
+                    'clave': clave, 'estado': 'duplicada',
+                    'venta': venta_id, 'total': str(total)}
+                continue
+            if clave in claves_del_lote:
+                resultados[posicion] = {
+                    'clave': clave, 'estado': 'error',
+                    'error': 'Clave repetida dentro del lote'}
+                continue
+            try:
+                venta, detalles = construir_venta(
+                    turno, vendedor, lineas, productos_por_id,
+                    datos['metodo_pago'],
+                    datos.get('codigo_transferencia'),
+                    datos.get('telefono_cliente'))
+            except VentaInvalida as e:
+                resultados[posicion] = {
+                    'clave': clave, 'estado': 'error', 'error': str(e)}
+                continue
+            # Cada venta toma del stock que dejaron las anteriores del lote
+            cantidades = {
+                producto_id: cantidad for producto_id, cantidad in
+                inventario.cantidades_con_stock(detalles).items()
+                if producto_id in disponible
+            }
+            error = _sin_stock(cantidades, disponible)
+            if error:
+                resultados[posicion] = {
+                    'clave': clave, 'estado': 'error', 'error': error}
+                continue
+            for producto_id, cantidad in cantidades.items():
+                disponible[producto_id] -= cantidad
+            descontar.update(cantidades)
+            if cantidades:
+                descontadas.append((venta, cantidades))
+            venta.clave_idempotencia = clave
+            claves_del_lote.add(clave)
+            nuevas.append((posicion, venta, detalles))
+
+        if descontar and not inventario.descontar(descontar):
+            raise VentaInvalida('Stock insuficiente')
+        if nuevas:
+            acumular_en_turno(turno, [
+                detalle for _, _, detalles in nuevas for detalle in detalles])
+            # Requiere un backend que devuelva las PK en bulk_create
+            # (SQLite >= 3.35 y PostgreSQL lo hacen)
+            Venta.objects.bulk_create([venta for _, venta, _ in nuevas])
+            todos_los_detalles = []
+            for _, venta, detalles in nuevas:
+                for detalle in detalles:
+                    detalle.venta = venta
+                todos_los_detalles.extend(detalles)
+            DetalleVenta.objects.bulk_create(todos_los_detalles)
+            if descontadas:
+                MovimientoInventario.objects.bulk_create([
+                    movimiento for venta, cantidades in descontadas
+                    for movimiento in inventario.movimientos_de_venta(venta, cantidades)
+                ])
+            eventos.ventas_registradas(
+                turno.id, [venta for _, venta, _ in nuevas])
+
+    for posicion, venta, _ in nuevas:
+        resultados[posicion] = {
+            'clave': venta.clave_idempotencia, 'estado': 'creada',
+            'venta': venta.id, 'total': str(venta.total)}
+    return resultados
@@ -0,0 +1,56 @@
+# backend/tienda/versiones.py
+import hashlib
+
+from django.db.models import F
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import PYME
+
+
+def incrementar(*pyme_ids):
+    """Marca como modificados los datos de estas PYMEs y de sus productos."""
+    pyme_ids = {pyme_id for pyme_id in pyme_ids if pyme_id is not None}
+    if pyme_ids:
+        PYME.objects.filter(pk__in=pyme_ids).update(version=F('version') + 1)
+
+
+def versiones(pyme_ids):
+    return dict(PYME.objects.filter(pk__in=pyme_ids).values_list('id', 'version'))
+
+
+async def aversiones(pyme_ids):
+    return {
+        pyme_id: version async for pyme_id, version in
+        PYME.objects.filter(pk__in=pyme_ids).values_list('id', 'version')
+    }
+
+
+def calcular_etag(*partes):
+    crudo = '|'.join(str(parte) for parte in partes).encode()
+    return '"%s"' % hashlib.sha1(crudo).hexdigest()
+
+
+def cliente_actualizado(request, etag):
+    """True si el cliente ya tiene esta versión (If-None-Match)."""
+    cabecera = request.META.get('HTTP_IF_NONE_MATCH')
+    if not cabecera:
+        return False
+    etags = [e.removeprefix('W/') for e in parse_etags(cabecera)]
+    return etag in etags or '*' in etags
+
+
+def respuesta_no_modificada(request, etag):
+    """
+    Devuelve un 304 si el cliente ya tiene esta versión (If-None-Match) o
+    None si hay que construir la respuesta completa.
+    """
+    if cliente_actualizado(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=cabeceras_cache(etag))
+    return None
+
+
+def cabeceras_cache(etag):
+    # El cliente puede guardar la respuesta pero debe revalidarla siempre
+    return {'ETag': etag, 'Cache-Control': 'private, no-cache'}
@@ -1,26 +1,34 @@
 # backend/tienda/views.py
-from datetime import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 
+from accounts.authentication import obtener_usuario
 from accounts.models import Usuario
-from .models import PYME, DetalleVenta, Producto, Turno, Venta
+from core.paginacion import PaginacionInvalida, paginar
+from . import acceso, analitica, busqueda, eventos, inventario, lectura, resumenes, versiones
+from .models import PYME, AgregadoVentas, Producto, Turno
 from .serializers import PYMECreateSerializer, PYMESerializer, ProductoSerializer, TurnoSerializer, VentaSerializer
+from .exportacion import exportar_productos, exportar_ventas, respuesta_streaming
+from .fechas import FechaInvalida, rango_fechas
+from .importacion import FORMATOS, importar_productos, texto_utf8
+from .ventas import VentaInvalida, entero, registrar_venta, registrar_ventas_lote
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_pymes_view(request):
-    pymes = PYME.objects.filter(
-        Q(propietario=request.user) |
-        Q(administrador=request.user) |
-        Q(empleados=request.user)
-    ).distinct()
-    serializer = PYMESerializer(pymes, many=True)
-    return Response(serializer.data)
+    version_por_pyme = versiones.versiones(acceso.pymes_ids(request.user))
+    etag = versiones.calcular_etag('pymes', sorted(version_por_pyme.items()))
+    no_modificada = versiones.respuesta_no_modificada(request, etag)
+    if no_modificada:
+        return no_modificada
+
+    pymes = lectura.pymes_cacheadas(version_por_pyme)
+    return Response(pymes, headers=versiones.cabeceras_cache(etag))
 
 
 @api_view(['POST'])
@@ -37,19 +45,120 @@ def crear_pyme_view(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def listar_productos_view(request):
-    pymes_ids = PYME.objects.filter(
-        Q(propietario=request.user) |
-        Q(administrador=request.user) |
-        Q(empleados=request.user)
-    ).values_list('id', flat=True)
+    roles = acceso.roles_usuario(request.user)
+    # El ETag sale de las versiones de las PYMEs, sin leer los productos
+    etag = versiones.calcular_etag(
+        'productos',
+        sorted(
+            (pyme_id, version, roles[pyme_id] in acceso.ROLES_GESTION)
+            for pyme_id, version in versiones.versiones(roles).items()
+        ),
+        request.META.get('QUERY_STRING', '')
+    )
+    no_modificada = versiones.respuesta_no_modificada(request, etag)
+    if no_modificada:
+        return no_modificada
 
-    productos = Producto.objects.filter(
-        tienda_id__in=pymes_ids)
+    productos = lectura.filas_productos(
+        Producto.objects.filter(tienda_id__in=list(roles)))
+
+    try:
+        pagina = paginar(productos, request, ('nombre', 'id'))
+    except PaginacionInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if pagina is not None:
+        return pagina.respuesta(
+            lectura.formatear_productos(pagina.filas, roles),
+            headers=versiones.cabeceras_cache(etag))
+
+    return Response(lectura.formatear_productos(productos, roles),
+                    headers=versiones.cabeceras_cache(etag))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def buscar_productos_view(request):
+    pyme_id = request.GET.get('pyme')
+    codigo = request.GET.get('codigo')
+    texto = request.GET.get('q')
+
+    if not pyme_id or not (codigo or texto):
+        return Response({'error': 'Se requiere la PYME y un código o texto a buscar'}, status=status.HTTP_400_BAD_REQUEST)
+
+    rol = acceso.rol_en(request.user, pyme_id)
+    if rol is None:
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'PYME no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes acceso a esta PYME'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        limite = max(1, min(int(request.GET.get('limite', 20)), 50))
+    except ValueError:
+        return Response({'error': 'El límite debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+
+    indice = busqueda.indice(int(pyme_id))
+    if codigo:
+        productos = indice.buscar_codigo(codigo)
+    else:
+        productos = indice.buscar(texto, limite)
 
+    puede_editar = rol in acceso.ROLES_GESTION
+    return Response([{**datos, 'puede_editar': puede_editar} for datos in productos])
 
-    serializer = ProductoSerializer(
-        productos, many=True, context={'request': request})
-    return Response(serializer.data)
+
+def _formato(request):
+    formato = request.GET.get('formato')
+    if formato:
+        return formato if formato in FORMATOS else None
+    return 'ndjson' if 'ndjson' in request.content_type else 'csv'
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def importar_productos_view(request):
+    pyme_id = request.GET.get('pyme')
+    if not pyme_id:
+        return Response({'error': 'Se requiere el ID de la tienda'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not acceso.puede_gestionar(request.user, pyme_id):
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'Tienda no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes permiso para agregar productos a esta tienda'}, status=status.HTTP_403_FORBIDDEN)
+
+    formato = _formato(request)
+    if formato is None:
+        return Response({'error': 'Formato no soportado'}, status=status.HTTP_400_BAD_REQUEST)
+    if request.stream is None:
+        return Response({'error': 'El archivo está vacío'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Se decodifica todo antes de importar, sin cargarlo entero en memoria
+    try:
+        archivo = texto_utf8(request.stream)
+    except UnicodeDecodeError:
+        return Response({'error': 'El archivo debe estar en UTF-8'}, status=status.HTTP_400_BAD_REQUEST)
+    with archivo:
+        resumen = importar_productos(int(pyme_id), archivo, formato)
+    return Response(resumen)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exportar_productos_view(request):
+    pyme_id = request.GET.get('pyme')
+    if not pyme_id:
+        return Response({'error': 'Se requiere el ID de la tienda'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if acceso.rol_en(request.user, pyme_id) is None:
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'Tienda no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes acceso a esta tienda'}, status=status.HTTP_403_FORBIDDEN)
+
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return Response({'error': 'Formato no soportado'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return respuesta_streaming(
+        exportar_productos(int(pyme_id), formato), formato, f'productos-{pyme_id}')
 
 
 @api_view(['POST'])
@@ -60,12 +169,10 @@ def crear_producto_view(request):
     if not tienda_id:
         return Response({'error': 'Se requiere el ID de la tienda'}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        pyme = PYME.objects.get(id=tienda_id)
-        if not (pyme.propietario == request.user or pyme.administrador == request.user):
-            return Response({'error': 'No tienes permiso para agregar productos a esta tienda'}, status=status.HTTP_403_FORBIDDEN)
-    except PYME.DoesNotExist:
-        return Response({'error': 'Tienda no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    if not acceso.puede_gestionar(request.user, tienda_id):
+        if not acceso.pyme_existe(tienda_id):
+            return Response({'error': 'Tienda no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes permiso para agregar productos a esta tienda'}, status=status.HTTP_403_FORBIDDEN)
 
     serializer = ProductoSerializer(data=request.data)
     if serializer.is_valid():
@@ -74,6 +181,68 @@ def crear_producto_view(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def stock_productos_view(request):
+    pyme_id = request.GET.get('pyme')
+    if not pyme_id:
+        return Response({'error': 'Se requiere el ID de la PYME'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if acceso.rol_en(request.user, pyme_id) is None:
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'PYME no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes acceso a esta PYME'}, status=status.HTTP_403_FORBIDDEN)
+
+    # Solo los productos con inventario; sin ETag, el stock cambia con cada venta
+    productos = Producto.objects.filter(
+        tienda_id=pyme_id, stock__isnull=False).values('id', 'nombre', 'codigo', 'stock')
+    try:
+        pagina = paginar(productos, request, ('nombre', 'id'))
+    except PaginacionInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if pagina is not None:
+        return pagina.respuesta(pagina.filas)
+    return Response(list(productos.order_by('nombre', 'id')))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def ajustar_stock_view(request, producto_id):
+    """
+    {"cantidad": n} suma (o resta, si es negativa) al stock; {"stock": n}
+    fija el stock contado y activa el inventario del producto.
+    """
+    try:
+        tienda_id = Producto.objects.values_list('tienda_id', flat=True).get(id=producto_id)
+    except Producto.DoesNotExist:
+        return Response({'error': 'Producto no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not acceso.puede_gestionar(request.user, tienda_id):
+        return Response({'error': 'Solo el propietario o administrador puede ajustar el stock'}, status=status.HTTP_403_FORBIDDEN)
+
+    cantidad = request.data.get('cantidad')
+    stock = request.data.get('stock')
+    if (cantidad is None) == (stock is None):
+        return Response({'error': 'Se requiere "cantidad" o "stock", no ambos'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        valor = entero(stock if cantidad is None else cantidad)
+    except (TypeError, ValueError):
+        return Response({'error': 'La cantidad y el stock deben ser números enteros'}, status=status.HTTP_400_BAD_REQUEST)
+    if cantidad is None and valor < 0:
+        return Response({'error': 'El stock no puede ser negativo'}, status=status.HTTP_400_BAD_REQUEST)
+    if stock is None and valor == 0:
+        return Response({'error': 'La cantidad no puede ser cero'}, status=status.HTTP_400_BAD_REQUEST)
+
+    argumentos = {'stock': valor} if cantidad is None else {'cantidad': valor}
+    try:
+        nuevo = inventario.ajustar(
+            producto_id, obtener_usuario(request),
+            nota=str(request.data.get('nota') or '')[:250], **argumentos)
+    except inventario.StockInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'producto': producto_id, 'stock': nuevo})
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def abrir_turno_view(request):
@@ -83,24 +252,23 @@ def abrir_turno_view(request):
     if not pyme_id:
         return Response({'error': 'Se requiere el ID de la PYME'}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        pyme = PYME.objects.get(id=pyme_id)
-        if not (pyme.propietario == request.user or pyme.administrador == request.user):
-            return Response({'error': 'No tienes permiso para abrir turnos en esta PYME'}, status=status.HTTP_403_FORBIDDEN)
-    except PYME.DoesNotExist:
-        return Response({'error': 'PYME no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    if not acceso.puede_gestionar(request.user, pyme_id):
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'PYME no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes permiso para abrir turnos en esta PYME'}, status=status.HTTP_403_FORBIDDEN)
+    pyme_id = int(pyme_id)
 
     # Verificar que los empleados pertenezcan a la PYME
     empleados_validos = Usuario.objects.filter(
         id__in=empleados_ids,
-        pymes_empleado=pyme
+        pymes_empleado=pyme_id
     )
     if len(empleados_validos) != len(empleados_ids):
         return Response({'error': 'Algunos empleados no pertenecen a esta PYME'}, status=status.HTTP_400_BAD_REQUEST)
 
     turno = Turno.objects.create(
-        pyme=pyme,
-        abierto_por=request.user
+        pyme_id=pyme_id,
+        abierto_por=obtener_usuario(request)
     )
     turno.empleados.set(empleados_validos)
     serializer = TurnoSerializer(turno)
@@ -122,83 +290,148 @@ def registrar_venta_view(request):
     # Validar turno
     try:
         turno = Turno.objects.get(id=turno_id, activo=True)
-        if request.user not in turno.empleados.all():
+        if not turno.empleados.filter(id=request.user.id).exists():
             return Response({'error': 'No estás asignado a este turno'}, status=status.HTTP_403_FORBIDDEN)
     except Turno.DoesNotExist:
         return Response({'error': 'Turno no encontrado o inactivo'}, status=status.HTTP_404_NOT_FOUND)
 
-    # Validar método de pago
-    if metodo_pago == 'transferencia':
-        if not codigo_transferencia or not telefono_cliente:
-            return Response({'error': 'Se requiere código de transferencia y teléfono del cliente'}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Calcular total y crear venta
-    total = 0
-    venta = Venta.objects.create(
-        turno=turno,
-        vendedor=request.user,
-        pyme=turno.pyme,
-        total=0,
-        metodo_pago=metodo_pago,
-        codigo_transferencia=codigo_transferencia,
-        telefono_cliente=telefono_cliente
-    )
-
-    # Crear detalles
-    for item in productos:
-        try:
-            producto = Producto.objects.get(
-                id=item['producto'], tienda=turno.pyme)
-            cantidad = item['cantidad']
-            detalle = DetalleVenta.objects.create(
-                venta=venta,
-                producto=producto,
-                cantidad=cantidad,
-                precio_unitario=producto.precio_venta,
-                costo_unitario=producto.precio_compra
-            )
-            total += producto.precio_venta * cantidad
-        except Producto.DoesNotExist:
-            venta.delete()
-            return Response({'error': f'Producto {item["producto"]} no encontrado en esta tienda'}, status=status.HTTP_400_BAD_REQUEST)
-
-    venta.total = total
-    venta.save()
+    # Validar cesta, calcular total y crear venta con sus detalles
+    try:
+        venta = registrar_venta(
+            turno,
+            obtener_usuario(request),
+            productos,
+            metodo_pago,
+            codigo_transferencia=codigo_transferencia,
+            telefono_cliente=telefono_cliente
+        )
+    except VentaInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     serializer = VentaSerializer(venta)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def sincronizar_ventas_view(request):
+    turno_id = request.data.get('turno')
+    ventas = request.data.get('ventas', [])
+
+    if not turno_id or not ventas:
+        return Response({'error': 'Faltan datos requeridos'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # El turno y el vendedor se validan una sola vez para todo el lote
+    try:
+        turno = Turno.objects.get(id=turno_id, activo=True)
+        if not turno.empleados.filter(id=request.user.id).exists():
+            return Response({'error': 'No estás asignado a este turno'}, status=status.HTTP_403_FORBIDDEN)
+    except Turno.DoesNotExist:
+        return Response({'error': 'Turno no encontrado o inactivo'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        resultados = registrar_ventas_lote(
+            turno, obtener_usuario(request), ventas)
+    except VentaInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except IntegrityError:
+        # Otra sincronización registró las mismas claves al mismo tiempo
+        return Response({'error': 'Lote en conflicto con otra sincronización, reintente'}, status=status.HTTP_409_CONFLICT)
+
+    return Response({'resultados': resultados}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exportar_ventas_view(request):
+    pyme_id = request.GET.get('pyme')
+    if not pyme_id:
+        return Response({'error': 'Se requiere el ID de la PYME'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not acceso.puede_gestionar(request.user, pyme_id):
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'PYME no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes permiso para exportar las ventas de esta PYME'}, status=status.HTTP_403_FORBIDDEN)
+
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return Response({'error': 'Formato no soportado'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        inicio, fin = rango_fechas(
+            request.GET.get('desde'), request.GET.get('hasta'))
+    except FechaInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Las ventas de turnos viejos solo se leen del archivo si se piden
+    archivadas = request.GET.get('archivadas') == 'true'
+    return respuesta_streaming(
+        exportar_ventas(int(pyme_id), inicio, fin, formato, archivadas),
+        formato, f'ventas-{pyme_id}')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def analitica_ventas_view(request):
+    """
+    Ventas de la PYME por hora o por día (`granularidad`), de las horas o
+    días que empiezan entre `desde` y `hasta`.
+    """
+    pyme_id = request.GET.get('pyme')
+    if not pyme_id:
+        return Response({'error': 'Se requiere el ID de la PYME'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not acceso.puede_gestionar(request.user, pyme_id):
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'PYME no encontrada'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'No tienes permiso para ver las ventas de esta PYME'}, status=status.HTTP_403_FORBIDDEN)
+
+    granularidad = request.GET.get('granularidad', AgregadoVentas.DIA)
+    if granularidad not in dict(AgregadoVentas.GRANULARIDADES):
+        return Response({'error': 'Granularidad inválida'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        inicio, fin = rango_fechas(
+            request.GET.get('desde'), request.GET.get('hasta'))
+    except FechaInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serie = analitica.serie(int(pyme_id), granularidad, inicio, fin)
+    return Response({
+        'pyme': int(pyme_id),
+        'granularidad': granularidad,
+        'resultados': analitica.formatear(serie),
+    })
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def cerrar_turno_view(request, turno_id):
     try:
-        turno = Turno.objects.get(id=turno_id)
-        # Verificar permisos
-        if not (turno.pyme.propietario == request.user or turno.pyme.administrador == request.user):
-            return Response({'error': 'No tienes permiso para cerrar este turno'}, status=status.HTTP_403_FORBIDDEN)
-
-        if not turno.activo:
-            return Response({'error': 'El turno ya está cerrado'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Calcular totales
-        ventas = Venta.objects.filter(turno=turno)
-        total_ventas = sum(venta.total for venta in ventas)
-
-        detalles = DetalleVenta.objects.filter(venta__in=ventas)
-        ganancia_bruta = sum(detalle.ganancia for detalle in detalles)
-
-        # Actualizar turno con datos del cierre
-        turno.total_ventas = total_ventas
-        turno.ganancia_bruta = ganancia_bruta
-        turno.salario_empleados = request.data.get('salario_empleados', 0)
-        turno.salario_admin = request.data.get('salario_admin', 0)
-        turno.gastos = request.data.get('gastos', 0)
-        turno.notas_gastos = request.data.get('notas_gastos', '')
-        turno.cerrado_por = request.user
-        turno.fin = timezone.now()
-        turno.activo = False
-        turno.save()
+        with transaction.atomic():
+            # Bloquea el turno para que no entren ventas durante el cierre
+            turno = Turno.objects.select_for_update().get(id=turno_id)
+            # Verificar permisos
+            if not acceso.puede_gestionar(request.user, turno.pyme_id):
+                return Response({'error': 'No tienes permiso para cerrar este turno'}, status=status.HTTP_403_FORBIDDEN)
+
+            if not turno.activo:
+                return Response({'error': 'El turno ya está cerrado'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # total_ventas y ganancia_bruta se acumulan en cada venta, aquí
+            # solo se guardan los datos del cierre
+            turno.salario_empleados = request.data.get('salario_empleados', 0)
+            turno.salario_admin = request.data.get('salario_admin', 0)
+            turno.gastos = request.data.get('gastos', 0)
+            turno.notas_gastos = request.data.get('notas_gastos', '')
+            turno.cerrado_por = obtener_usuario(request)
+            turno.fin = timezone.now()
+            turno.activo = False
+            turno.save(update_fields=[
+                'salario_empleados', 'salario_admin', 'gastos', 'notas_gastos',
+                'cerrado_por', 'fin', 'activo'
+            ])
+            # Con el turno bloqueado ya no entran ventas: el resumen es final
+            resumenes.guardar(turno.id)
+            eventos.turno_cerrado(turno)
 
         serializer = TurnoSerializer(turno)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -209,56 +442,71 @@ def cerrar_turno_view(request, turno_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def listar_turnos_view(request):
-    pymes_con_acceso = PYME.objects.filter(
-        Q(propietario=request.user) | Q(administrador=request.user)
-    )
-    turnos_propietario_admin = Turno.objects.filter(pyme__in=pymes_con_acceso)
+def resumen_turno_view(request, turno_id):
+    """Lo vendido por producto y lo cobrado por método de pago en el turno."""
+    try:
+        turno = Turno.objects.only('id', 'pyme_id', 'activo').get(id=turno_id)
+    except Turno.DoesNotExist:
+        return Response({'error': 'Turno no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
-    turnos_empleado = Turno.objects.filter(empleados=request.user)
+    if not acceso.puede_gestionar(request.user, turno.pyme_id):
+        if not turno.empleados.filter(id=request.user.id).exists():
+            return Response({'error': 'No tienes acceso a este turno'}, status=status.HTTP_403_FORBIDDEN)
 
-    # Filtros opcionales
-    pyme_id = request.GET.get('pyme')
-    if pyme_id:
-        turnos_propietario_admin = turnos_propietario_admin.filter(
-            pyme_id=pyme_id)
-        turnos_empleado = turnos_empleado.filter(pyme_id=pyme_id)
+    return Response(resumenes.resumen(turno))
 
-    if request.GET.get('activo') == 'true':
-        turnos_propietario_admin = turnos_propietario_admin.filter(activo=True)
-        turnos_empleado = turnos_empleado.filter(activo=True)
 
-    turnos = (turnos_propietario_admin |
-              turnos_empleado).distinct().order_by('-inicio')
-    serializer = TurnoSerializer(turnos, many=True)
-    return Response(serializer.data)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def listar_turnos_view(request):
+    try:
+        filtros = lectura.filtros_turnos(request.GET)
+    except FechaInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    turnos = lectura.filas_turnos(lectura.turnos_visibles(
+        request.user.id, acceso.pymes_ids(request.user, roles=acceso.ROLES_GESTION),
+        **filtros))
+
+    try:
+        pagina = paginar(turnos, request, ('-inicio', 'id'))
+    except PaginacionInvalida as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if pagina is not None:
+        return pagina.respuesta(lectura.turnos(pagina.filas))
+
+    return Response(lectura.turnos(turnos))
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def detalle_pyme_view(request, pyme_id):
-    try:
-        pyme = PYME.objects.get(id=pyme_id)
-        # Verificar acceso
-        if not (
-            pyme.propietario == request.user or
-            pyme.administrador == request.user or
-            pyme.empleados.filter(id=request.user.id).exists()
-        ):
-            return Response({'error': 'No tienes acceso a esta PYME'}, status=403)
-        serializer = PYMESerializer(pyme)
-        return Response(serializer.data)
-    except PYME.DoesNotExist:
+    # Verificar acceso
+    if acceso.rol_en(request.user, pyme_id) is None:
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'PYME no encontrada'}, status=404)
+        return Response({'error': 'No tienes acceso a esta PYME'}, status=403)
+
+    version = PYME.objects.filter(id=pyme_id).values_list(
+        'version', flat=True).first()
+    etag = versiones.calcular_etag('pyme', pyme_id, version)
+    no_modificada = versiones.respuesta_no_modificada(request, etag)
+    if no_modificada:
+        return no_modificada
+    datos = lectura.pymes_cacheadas({pyme_id: version}) if version is not None else []
+    if not datos:
         return Response({'error': 'PYME no encontrada'}, status=404)
+    return Response(datos[0], headers=versiones.cabeceras_cache(etag))
 
 
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def actualizar_pyme_view(request, pyme_id):
+    if acceso.rol_en(request.user, pyme_id) != acceso.PROPIETARIO:
+        if not acceso.pyme_existe(pyme_id):
+            return Response({'error': 'PYME no encontrada'}, status=404)
+        return Response({'error': 'Solo el propietario puede editar la PYME'}, status=403)
     try:
         pyme = PYME.objects.get(id=pyme_id)
-        if pyme.propietario != request.user:
-            return Response({'error': 'Solo el propietario puede editar la PYME'}, status=403)
 
         serializer = PYMECreateSerializer(
             pyme, data=request.data, context={'request': request})
@@ -275,10 +523,9 @@ def actualizar_pyme_view(request, pyme_id):
 def actualizar_producto_view(request, producto_id):
     try:
         producto = Producto.objects.get(id=producto_id)
-        pyme = producto.tienda
 
         # Verificar permisos
-        if not (pyme.propietario == request.user or pyme.administrador == request.user):
+        if not acceso.puede_gestionar(request.user, producto.tienda_id):
             return Response({'error': 'Solo el propietario o administrador puede editar productos'}, status=403)
 
         serializer = ProductoSerializer(
@@ -296,9 +543,8 @@ def actualizar_producto_view(request, producto_id):
 def eliminar_producto_view(request, producto_id):
     try:
         producto = Producto.objects.get(id=producto_id)
-        pyme = producto.tienda
 
-        if not (pyme.propietario == request.user or pyme.administrador == request.user):
+        if not acceso.puede_gestionar(request.user, producto.tienda_id):
             return Response({'error': 'Solo el propietario o administrador puede eliminar productos'}, status=403)
 
         producto.delete()
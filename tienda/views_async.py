@@ -0,0 +1,147 @@
+# backend/tienda/views_async.py
+"""
+Listados de solo lectura como vistas async (api/async/...), con el ORM
+async y la misma salida, ETag y paginación que las de tienda.views, y el
+flujo SSE de cada turno.
+"""
+import asyncio
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+
+from core.asincrono import api_async, liberar_hilo, respuesta_json
+from core.paginacion import PaginacionInvalida, apaginar
+from . import acceso, eventos, lectura, versiones
+from .fechas import FechaInvalida
+from .models import Producto, Turno
+
+
+async def _lista(filas):
+    return [fila async for fila in filas]
+
+
+def _no_modificada(etag):
+    return HttpResponse(status=304, headers=versiones.cabeceras_cache(etag))
+
+
+@api_async(['GET'])
+async def listar_pymes_view(request):
+    roles = await acceso.aroles_usuario(request.user)
+    version_por_pyme = await versiones.aversiones(list(roles))
+    etag = versiones.calcular_etag('pymes', sorted(version_por_pyme.items()))
+    if versiones.cliente_actualizado(request, etag):
+        return _no_modificada(etag)
+
+    datos = await lectura.apymes_cacheadas(version_por_pyme)
+    return respuesta_json(datos, headers=versiones.cabeceras_cache(etag))
+
+
+@api_async(['GET'])
+async def listar_productos_view(request):
+    roles = await acceso.aroles_usuario(request.user)
+    etag = versiones.calcular_etag(
+        'productos',
+        sorted(
+            (pyme_id, version, roles[pyme_id] in acceso.ROLES_GESTION)
+            for pyme_id, version in (await versiones.aversiones(list(roles))).items()
+        ),
+        request.META.get('QUERY_STRING', '')
+    )
+    if versiones.cliente_actualizado(request, etag):
+        return _no_modificada(etag)
+
+    productos = lectura.filas_productos(
+        Producto.objects.filter(tienda_id__in=list(roles)))
+    try:
+        pagina = await apaginar(productos, request, ('nombre', 'id'))
+    except PaginacionInvalida as e:
+        return respuesta_json({'error': str(e)}, status=400)
+    if pagina is not None:
+        return respuesta_json(
+            {'resultados': lectura.formatear_productos(pagina.filas, roles),
+             'siguiente': pagina.siguiente},
+            headers=versiones.cabeceras_cache(etag))
+
+    datos = lectura.formatear_productos(await _lista(productos), roles)
+    return respuesta_json(datos, headers=versiones.cabeceras_cache(etag))
+
+
+@api_async(['GET'])
+async def listar_turnos_view(request):
+    try:
+        filtros = lectura.filtros_turnos(request.GET)
+    except FechaInvalida as e:
+        return respuesta_json({'error': str(e)}, status=400)
+    roles = await acceso.aroles_usuario(request.user)
+    pymes_con_acceso = [
+        pyme_id for pyme_id, rol in roles.items() if rol in acceso.ROLES_GESTION]
+    turnos = lectura.filas_turnos(lectura.turnos_visibles(
+        request.user.id, pymes_con_acceso, **filtros))
+
+    try:
+        pagina = await apaginar(turnos, request, ('-inicio', 'id'))
+    except PaginacionInvalida as e:
+        return respuesta_json({'error': str(e)}, status=400)
+    filas = pagina.filas if pagina is not None else await _lista(turnos)
+    empleados = await _lista(lectura.consulta_empleados_turnos([f['id'] for f in filas]))
+    datos = lectura.formatear_turnos(filas, lectura.agrupar_usuarios(empleados))
+    if pagina is not None:
+        return respuesta_json({'resultados': datos, 'siguiente': pagina.siguiente})
+    return respuesta_json(datos)
+
+
+async def _flujo_turno(turno_id):
+    # Suscribirse antes de leer los totales: ninguna venta queda en medio
+    suscripcion = eventos.broker().suscribir(eventos.canal_turno(turno_id))
+    try:
+        # Milisegundos que espera el navegador antes de reconectarse
+        yield 'retry: 3000\n\n'
+        fila = await Turno.objects.filter(pk=turno_id).values(
+            'id', 'total_ventas', 'ganancia_bruta', 'activo').afirst()
+        # De aquí en adelante solo se espera la cola: sin hilo ni conexión
+        await liberar_hilo()
+        if fila is None:
+            return
+        yield eventos.evento_totales(fila).texto
+        if not fila['activo']:
+            return
+        while True:
+            try:
+                evento = await asyncio.wait_for(
+                    suscripcion.recibir(), settings.EVENTOS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión en los proxies
+                yield ': ping\n\n'
+                continue
+            yield evento.texto
+            if evento.tipo == eventos.CERRADO:
+                return
+    finally:
+        suscripcion.cerrar()
+
+
+@api_async(['GET'])
+async def eventos_turno_view(request, turno_id):
+    """
+    Server-Sent Events de un turno: los totales al conectarse y luego cada
+    venta con los totales actualizados, hasta que el turno se cierra.
+    Solo bajo ASGI; cada conexión abierta es una corrutina, sin hilo ni
+    conexión a la base.
+    """
+    turno = await Turno.objects.filter(pk=turno_id).values('pyme_id').afirst()
+    if turno is None:
+        return respuesta_json({'error': 'Turno no encontrado'}, status=404)
+
+    roles = await acceso.aroles_usuario(request.user)
+    if roles.get(turno['pyme_id']) not in acceso.ROLES_GESTION:
+        asignado = await Turno.empleados.through.objects.filter(
+            turno_id=turno_id, usuario_id=request.user.id).aexists()
+        if not asignado:
+            return respuesta_json({'error': 'No tienes acceso a este turno'}, status=403)
+
+    respuesta = StreamingHttpResponse(
+        _flujo_turno(turno_id), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    # Evita que nginx acumule el flujo
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta